@@ -1,18 +1,28 @@
 from django.contrib import admin
+from web.admin_listas import FiltroAutocomplete, FiltroTexto, ListaGrandeMixin
 from .models import Coleta, Lead
 
 
 @admin.register(Coleta)
 class ColetaAdmin(admin.ModelAdmin):
     list_display = ('id', 'usuario', 'keyword', 'cidade', 'bairro', 'usar_raio', 'raio_km', 'status', 'criado_em')
-    list_filter = ('status', 'usar_raio')
+    list_filter = ('status', 'usar_raio', ('usuario', FiltroAutocomplete))
+    list_select_related = ('usuario',)
     search_fields = ('keyword', 'cidade', 'bairro')
     readonly_fields = ('criado_em', 'atualizado_em')
+    raw_id_fields = ('usuario',)
 
 
 @admin.register(Lead)
-class LeadAdmin(admin.ModelAdmin):
+class LeadAdmin(ListaGrandeMixin, admin.ModelAdmin):
     list_display = ('id', 'categoria', 'cidade', 'bairro', 'nome', 'telefone', 'usuario', 'coleta', 'nota', 'total_avaliacoes', 'criado_em')
-    list_filter = ('coleta', 'usuario', 'categoria', 'cidade')
+    list_filter = (
+        ('coleta', FiltroAutocomplete),
+        ('usuario', FiltroAutocomplete),
+        ('categoria', FiltroTexto),
+        ('cidade', FiltroTexto),
+    )
+    list_select_related = ('usuario', 'coleta')
     search_fields = ('nome', 'telefone', 'endereco', 'categoria', 'cidade', 'bairro')
     readonly_fields = ('criado_em',)
+    raw_id_fields = ('usuario', 'coleta')
@@ -0,0 +1 @@
+# Medições de desempenho da coleta de leads (ver coleta.py)
@@ -0,0 +1,101 @@
+"""
+Medição da coleta de leads de ponta a ponta, sem gastar cota do Google.
+
+medir_coletas(cenario) cria um assinante, sobe o simulador local das APIs do Google
+(web.servidores_stub.ServidorStub) com a latência, a paginação, a taxa de erros e o
+limite de requisições (429) do cenário, e executa run_coleta para cada coleta, como a
+thread da view faria. Mede:
+- leads/segundo (leads gravados / tempo total das coletas);
+- chamadas às APIs por lead (searchText, detalhes e geocode recebidos pelo simulador);
+- escritas no banco por lead (INSERT/UPDATE/DELETE, via connection.execute_wrapper);
+- duração de cada coleta (p50/p95/p99, web.relatorio_desempenho).
+
+As pausas da coleta ficam zeradas: a medição é do nosso lado (HTTP, ORM, cota), não
+da espera imposta pelo nextPageToken da API real. Deve rodar em um banco descartável
+(o comando medir_coleta cria um banco de teste).
+"""
+import time
+from collections import namedtuple
+from contextlib import redirect_stdout
+from io import StringIO
+
+from django.db import connection
+from django.test import override_settings
+
+from web.fabricas import criar_assinante
+from web.relatorio_desempenho import resumo_latencias
+from web.servidores_stub import TAMANHO_PAGINA_PLACES, ServidorStub
+
+from crm.models import Coleta, Lead
+from crm.services.places_collector import run_coleta
+
+Cenario = namedtuple(
+    'Cenario',
+    ['coletas', 'lugares', 'latencia_ms', 'variacao_ms', 'taxa_erros', 'limite_por_segundo',
+     'tamanho_pagina', 'usar_raio', 'semente'],
+    defaults=[10, 60, 0, 0, 0.0, None, TAMANHO_PAGINA_PLACES, False, 0],
+)
+Cenario.__doc__ = "Parâmetros de uma medição: volume das coletas e comportamento do simulador."
+
+_ESCRITAS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class ContadorEscritas:
+    """execute_wrapper que conta os comandos de escrita enviados ao banco."""
+
+    def __init__(self):
+        self.escritas = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip()[:6].upper() in _ESCRITAS:
+            self.escritas += len(params) if many else 1
+        return execute(sql, params, many, context)
+
+
+def _por_lead(total, leads):
+    return round(total / leads, 3) if leads else None
+
+
+def medir_coletas(cenario=Cenario(), username='benchmark'):
+    """Executa as coletas do cenário contra o simulador e retorna o dict de resultados."""
+    usuario = criar_assinante(username=username, leads_limite=cenario.coletas * cenario.lugares or 1)
+    coletas = Coleta.objects.bulk_create([
+        Coleta(
+            usuario=usuario, keyword=f'categoria {i}', cidade='Recife', bairro='Boa Viagem',
+            usar_raio=cenario.usar_raio, raio_km=2 if cenario.usar_raio else None,
+        )
+        for i in range(cenario.coletas)
+    ])
+
+    contador = ContadorEscritas()
+    duracoes_ms = []
+    simulador = ServidorStub(
+        lugares=cenario.lugares, latencia_ms=cenario.latencia_ms, variacao_ms=cenario.variacao_ms,
+        taxa_erros=cenario.taxa_erros, limite_por_segundo=cenario.limite_por_segundo,
+        tamanho_pagina=cenario.tamanho_pagina, semente=cenario.semente,
+    )
+    with simulador, override_settings(**simulador.configuracoes()), redirect_stdout(StringIO()):
+        with connection.execute_wrapper(contador):
+            inicio_total = time.perf_counter()
+            for coleta in coletas:
+                inicio = time.perf_counter()
+                run_coleta(coleta.pk)
+                duracoes_ms.append((time.perf_counter() - inicio) * 1000)
+            duracao_total = time.perf_counter() - inicio_total
+
+    leads = Lead.objects.filter(usuario=usuario).count()
+    chamadas = len(simulador.chamadas)
+    return {
+        'cenario': cenario._asdict(),
+        'coletas': len(coletas),
+        'coletas_com_erro': Coleta.objects.filter(usuario=usuario, status='erro').count(),
+        'leads': leads,
+        'duracao_total_s': round(duracao_total, 3),
+        'leads_por_segundo': round(leads / duracao_total, 2) if duracao_total else None,
+        'chamadas_api': chamadas,
+        'chamadas_api_por_lead': _por_lead(chamadas, leads),
+        'escritas_banco': contador.escritas,
+        'escritas_por_lead': _por_lead(contador.escritas, leads),
+        'respostas_api': {str(status): n for status, n in sorted(simulador.respostas.items())},
+        'duracao_coleta_ms': resumo_latencias(duracoes_ms),
+    }
@@ -0,0 +1,80 @@
+"""
+Mede a vazão da coleta de leads contra o simulador local das APIs do Google
+(crm.benchmark.coleta), em um banco de teste descartável, e grava o resultado em JSON
+para comparar entre commits.
+
+Exemplos:
+    python manage.py medir_coleta
+    python manage.py medir_coleta --coletas 20 --latencia-ms 80 --variacao-ms 40
+    python manage.py medir_coleta --taxa-erros 0.05 --limite-por-segundo 50
+    python manage.py medir_coleta --comparar medicoes/coleta-1a2b3c4.json
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, teardown_databases
+
+from crm.benchmark.coleta import Cenario, medir_coletas
+from web.relatorio_desempenho import carregar_resultado, comparar, salvar_resultado
+from web.servidores_stub import TAMANHO_PAGINA_PLACES
+
+
+class Command(BaseCommand):
+    help = 'Mede leads/s, chamadas de API e escritas por lead da coleta contra um simulador local'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--coletas', type=int, default=10, help='Coletas executadas (padrão: 10)')
+        parser.add_argument('--lugares', type=int, default=60,
+                            help='Lugares devolvidos pela busca do simulador (padrão: 60, o máximo da coleta)')
+        parser.add_argument('--latencia-ms', type=float, default=0, help='Latência de cada resposta do simulador')
+        parser.add_argument('--variacao-ms', type=float, default=0, help='Variação aleatória somada à latência')
+        parser.add_argument('--taxa-erros', type=float, default=0.0, help='Fração de respostas 500 (0 a 1)')
+        parser.add_argument('--limite-por-segundo', type=int, default=None,
+                            help='Requisições por segundo antes de o simulador responder 429')
+        parser.add_argument('--tamanho-pagina', type=int, default=TAMANHO_PAGINA_PLACES,
+                            help=f'Lugares por página do searchText (padrão: {TAMANHO_PAGINA_PLACES})')
+        parser.add_argument('--raio', action='store_true', help='Coletas por raio (inclui o geocode)')
+        parser.add_argument('--semente', type=int, default=0, help='Semente da sequência de erros simulados')
+        parser.add_argument('--saida', default=None,
+                            help='Arquivo JSON do resultado (padrão: medicoes/coleta-<commit>.json)')
+        parser.add_argument('--comparar', default=None, help='Resultado JSON anterior para comparar')
+        parser.add_argument('--sem-salvar', action='store_true', help='Só exibe o resultado')
+
+    def handle(self, *args, **options):
+        if options['coletas'] <= 0 or options['lugares'] < 0 or not 0 <= options['taxa_erros'] <= 1:
+            raise CommandError("--coletas deve ser positivo, --lugares não negativo e --taxa-erros entre 0 e 1.")
+        cenario = Cenario(
+            coletas=options['coletas'], lugares=options['lugares'],
+            latencia_ms=options['latencia_ms'], variacao_ms=options['variacao_ms'],
+            taxa_erros=options['taxa_erros'], limite_por_segundo=options['limite_por_segundo'],
+            tamanho_pagina=options['tamanho_pagina'], usar_raio=options['raio'], semente=options['semente'],
+        )
+        anterior = carregar_resultado(options['comparar']) if options['comparar'] else None
+
+        self.stdout.write(self.style.WARNING('Criando banco de teste...'))
+        antigos = setup_databases(verbosity=0, interactive=False)
+        try:
+            resultado = medir_coletas(cenario)
+        finally:
+            teardown_databases(antigos, verbosity=0)
+
+        duracao = resultado['duracao_coleta_ms']
+        self.stdout.write(
+            f"{resultado['leads']} leads em {resultado['coletas']} coletas "
+            f"({resultado['coletas_com_erro']} com erro), {resultado['duracao_total_s']} s\n"
+            f"  leads/s:                {resultado['leads_por_segundo']}\n"
+            f"  chamadas de API/lead:   {resultado['chamadas_api_por_lead']}\n"
+            f"  escritas no banco/lead: {resultado['escritas_por_lead']}\n"
+            f"  duração da coleta (ms): p50 {duracao.get('p50')}  p95 {duracao.get('p95')}\n"
+            f"  respostas da API:       {resultado['respostas_api']}"
+        )
+
+        if anterior:
+            self.stdout.write(f"\nComparação com {anterior.get('commit')}:")
+            for metrica, antes, agora, variacao in comparar(resultado, anterior):
+                if metrica.startswith('cenario.'):
+                    continue
+                sufixo = f"{variacao:+.1f}%" if variacao is not None else '-'
+                self.stdout.write(f"  {metrica:<28}{antes:>12}{agora:>12}{sufixo:>10}")
+
+        if not options['sem_salvar']:
+            caminho = salvar_resultado('coleta', resultado, options['saida'])
+            self.stdout.write(self.style.SUCCESS(f"[OK] Resultado gravado em {caminho}"))
@@ -0,0 +1,147 @@
+"""
+Teste de carga da camada web (web.carga): assinantes simultâneos navegando pelos leads
+e webhooks duplicados em paralelo, com requisições/s e percentis de latência por
+endpoint, gravados em JSON para comparar entre commits.
+
+Exemplos:
+    python manage.py testar_carga
+    python manage.py testar_carga --usuarios 50 --duracao 60 --rampa 10 --pensar-ms 200
+    python manage.py testar_carga --comparar medicoes/carga-1a2b3c4.json
+
+Contra um servidor já em execução (runserver, gunicorn...), com o banco dele:
+    python manage.py testar_carga --semear --massa massa_carga.json
+    python manage.py testar_carga --url http://127.0.0.1:8000 --massa massa_carga.json
+"""
+import tempfile
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import override_settings
+from django.test.utils import setup_databases, teardown_databases
+
+from web.carga.executor import ServidorLocal, executar_carga, verificar_webhooks
+from web.carga.massa import carregar_massa, salvar_massa, semear_massa
+from web.relatorio_desempenho import carregar_resultado, comparar, salvar_resultado
+from web.servidores_stub import ServidorStub
+
+
+class Command(BaseCommand):
+    help = 'Mede requisições/s e latência por endpoint com assinantes e webhooks simultâneos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=20, help='Assinantes simultâneos (padrão: 20)')
+        parser.add_argument('--duracao', type=float, default=30, help='Segundos de carga após a rampa (padrão: 30)')
+        parser.add_argument('--rampa', type=float, default=0, help='Segundos para iniciar todos os assinantes')
+        parser.add_argument('--pensar-ms', type=float, default=500,
+                            help='Pausa média entre ações de um assinante (padrão: 500)')
+        parser.add_argument('--remetentes', type=int, default=2, help='Remetentes de webhooks (padrão: 2)')
+        parser.add_argument('--duplicatas', type=int, default=3,
+                            help='Cópias simultâneas de cada webhook (padrão: 3)')
+        parser.add_argument('--leads', type=int, default=1000,
+                            help='Leads por assinante na massa, em 2 coletas (padrão: 1000)')
+        parser.add_argument('--compras', type=int, default=50, help='Compras pagas via webhook na massa')
+        parser.add_argument('--url', default=None, help='Servidor externo (http://host:porta); exige --massa')
+        parser.add_argument('--massa', default=None, help='Arquivo JSON da massa (gravado com --semear)')
+        parser.add_argument('--semear', action='store_true',
+                            help='Só cria a massa no banco configurado e grava --massa')
+        parser.add_argument('--saida', default=None,
+                            help='Arquivo JSON do resultado (padrão: medicoes/carga-<commit>.json)')
+        parser.add_argument('--comparar', default=None, help='Resultado JSON anterior para comparar')
+        parser.add_argument('--sem-salvar', action='store_true', help='Só exibe o resultado')
+
+    def handle(self, *args, **options):
+        if options['usuarios'] < 0 or options['remetentes'] < 0 or options['duplicatas'] <= 0:
+            raise CommandError('--usuarios e --remetentes não podem ser negativos; --duplicatas deve ser positivo.')
+        if (options['url'] or options['semear']) and not options['massa']:
+            raise CommandError('--url e --semear exigem --massa.')
+        parametros = {
+            'usuarios': options['usuarios'], 'duracao_s': options['duracao'], 'rampa_s': options['rampa'],
+            'pensar_s': options['pensar_ms'] / 1000, 'remetentes': options['remetentes'],
+            'duplicatas': options['duplicatas'],
+        }
+
+        if options['semear']:
+            massa = semear_massa(**self._tamanho_massa(options))
+            salvar_massa(massa, options['massa'])
+            self.stdout.write(self.style.SUCCESS(
+                f"[OK] Massa criada: {len(massa.usuarios)} assinantes, {len(massa.pagamentos)} compras "
+                f"({options['massa']})"
+            ))
+            return
+
+        anterior = carregar_resultado(options['comparar']) if options['comparar'] else None
+        if options['url']:
+            partes = urlsplit(options['url'])
+            if partes.scheme != 'http' or not partes.hostname:
+                raise CommandError('--url deve ser http://host:porta.')
+            self.stdout.write(self.style.WARNING(f"Carga contra {options['url']}..."))
+            resultado = executar_carga((partes.hostname, partes.port or 80), carregar_massa(options['massa']),
+                                       **parametros)
+        else:
+            resultado = self._executar_local(options, parametros)
+
+        resultado = {'parametros': parametros, **resultado}
+        self._exibir(resultado, anterior)
+        if not options['sem_salvar']:
+            caminho = salvar_resultado('carga', resultado, options['saida'])
+            self.stdout.write(self.style.SUCCESS(f"[OK] Resultado gravado em {caminho}"))
+
+    @staticmethod
+    def _tamanho_massa(options):
+        return {
+            'usuarios': max(options['usuarios'], 1), 'coletas_por_usuario': 2,
+            'leads_por_coleta': options['leads'] // 2, 'compras': options['compras'],
+        }
+
+    def _executar_local(self, options, parametros):
+        self.stdout.write(self.style.WARNING('Criando banco de teste e massa de dados...'))
+        with tempfile.TemporaryDirectory() as diretorio:
+            conexao = connections['default']
+            if conexao.vendor == 'sqlite':
+                # Em arquivo: as threads do servidor abrem conexões próprias, como em produção
+                conexao.settings_dict['TEST']['NAME'] = str(Path(diretorio) / 'carga.sqlite3')
+            antigos = setup_databases(verbosity=0, interactive=False)
+            try:
+                massa = semear_massa(**self._tamanho_massa(options))
+                stub = ServidorStub(pagamentos=massa.pagamentos)
+                with stub, override_settings(DEBUG=False, **stub.configuracoes()):
+                    with ServidorLocal() as servidor:
+                        self.stdout.write(self.style.WARNING(
+                            f"Carga: {parametros['usuarios']} assinantes, {parametros['remetentes']} remetentes "
+                            f"de webhooks x{parametros['duplicatas']}, {parametros['duracao_s']:.0f} s..."
+                        ))
+                        resultado = executar_carga(servidor.endereco, massa, **parametros)
+                    resultado['webhooks'] = verificar_webhooks(massa)
+            finally:
+                teardown_databases(antigos, verbosity=0)
+        return resultado
+
+    def _exibir(self, resultado, anterior):
+        self.stdout.write(f"\n{'endpoint':<22}{'req':>7}{'erros':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        linhas = list(resultado['endpoints'].items()) + [('TOTAL', resultado['total'])]
+        for nome, dados in linhas:
+            latencia = dados['latencia_ms']
+            self.stdout.write(
+                f"{nome:<22}{dados['requisicoes']:>7}{dados['erros']:>7}{dados['por_segundo'] or 0:>9}"
+                f"{latencia.get('p50', '-'):>9}{latencia.get('p95', '-'):>9}{latencia.get('p99', '-'):>9}"
+            )
+
+        webhooks = resultado.get('webhooks')
+        if webhooks:
+            mensagem = (
+                f"\nWebhooks: {webhooks['notificacoes']} notificações de {webhooks['pagamentos_distintos']} "
+                f"pagamentos; {webhooks['eventos_aplicados']} eventos aplicados, "
+                f"{webhooks['compras_pagas']} compras pagas; resultados {webhooks['resultados']}"
+            )
+            idempotente = webhooks['eventos_aplicados'] <= webhooks['pagamentos_distintos']
+            self.stdout.write(self.style.SUCCESS(mensagem) if idempotente else self.style.ERROR(mensagem))
+
+        if anterior:
+            self.stdout.write(f"\nComparação com {anterior.get('commit')}:")
+            for metrica, antes, agora, variacao in comparar(resultado, anterior):
+                if metrica.startswith('parametros.') or '.status.' in metrica:
+                    continue
+                sufixo = f"{variacao:+.1f}%" if variacao is not None else '-'
+                self.stdout.write(f"  {metrica:<48}{antes:>12}{agora:>12}{sufixo:>10}")
@@ -1,22 +1,58 @@
 """
 Serviço de coleta de leads via Google Places API (New).
 Adaptado de rascunhos/buscar_empresas_google2.py e rascunhos/raio_busca.py.
+
+As URLs base das APIs e as pausas entre chamadas vêm de settings
+(GOOGLE_PLACES_API_URL, GOOGLE_GEOCODING_API_URL, GOOGLE_PLACES_PAUSA_PAGINA,
+GOOGLE_PLACES_PAUSA_LEAD), para apontar a coleta para o servidor stub local
+(web.servidores_stub) nos testes e medições. Cada chamada passa por _requisitar, que a
+mede por host (web.instrumentacao.chamada_externa).
 """
 import time
 import logging
 import requests
 from decimal import Decimal
+from urllib.parse import urlsplit
 from django.conf import settings
-from django.utils import timezone
+
+from web.instrumentacao import chamada_externa
 
 logger = logging.getLogger(__name__)
 
+PLACES_API_URL_PADRAO = 'https://places.googleapis.com'
+GEOCODING_API_URL_PADRAO = 'https://maps.googleapis.com'
+# O nextPageToken leva alguns segundos para ficar válido na API real
+PAUSA_PAGINA_PADRAO = 2
+PAUSA_LEAD_PADRAO = 0.2
+
 
 def get_api_key():
     """Retorna a chave da API ou None se não configurada."""
     return getattr(settings, 'GOOGLE_PLACES_API_KEY', None) or ''
 
 
+def places_url(caminho):
+    """URL da Places API (New) para o caminho, ex.: '/v1/places:searchText'."""
+    base = getattr(settings, 'GOOGLE_PLACES_API_URL', '') or PLACES_API_URL_PADRAO
+    return base.rstrip('/') + caminho
+
+
+def geocoding_url():
+    base = getattr(settings, 'GOOGLE_GEOCODING_API_URL', '') or GEOCODING_API_URL_PADRAO
+    return base.rstrip('/') + '/maps/api/geocode/json'
+
+
+def _requisitar(metodo, url, **kwargs):
+    with chamada_externa(urlsplit(url).hostname):
+        return requests.request(metodo, url, **kwargs)
+
+
+def _pausar(nome, padrao):
+    segundos = getattr(settings, nome, padrao)
+    if segundos:
+        time.sleep(segundos)
+
+
 def get_coordinates(endereco):
     """
     Converte endereço em Latitude e Longitude usando Geocoding API.
@@ -27,10 +63,10 @@ def get_coordinates(endereco):
         logger.error("GOOGLE_PLACES_API_KEY não configurada")
         return None, None
 
-    url = "https://maps.googleapis.com/maps/api/geocode/json"
+    url = geocoding_url()
     params = {"address": endereco, "key": api_key}
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = _requisitar('GET', url, params=params, timeout=10)
         data = response.json()
         if data.get('status') == 'OK':
             location = data['results'][0]['geometry']['location']
@@ -50,7 +86,7 @@ def search_places_with_radius(keyword, lat, lng, radius_km):
     if not api_key:
         return []
 
-    url = "https://places.googleapis.com/v1/places:searchText"
+    url = places_url('/v1/places:searchText')
     all_places = []
     next_token = None
     radius_meters = float(radius_km * 1000)
@@ -77,7 +113,7 @@ def search_places_with_radius(keyword, lat, lng, radius_km):
             payload["pageToken"] = next_token
 
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=15)
+            response = _requisitar('POST', url, json=payload, headers=headers, timeout=15)
             data = response.json()
 
             if response.status_code != 200:
@@ -90,7 +126,7 @@ def search_places_with_radius(keyword, lat, lng, radius_km):
 
             if not next_token:
                 break
-            time.sleep(2)
+            _pausar('GOOGLE_PLACES_PAUSA_PAGINA', PAUSA_PAGINA_PADRAO)
         except Exception as e:
             logger.exception(f"Erro na busca Places: {e}")
             break
@@ -107,7 +143,7 @@ def search_places_location(keyword, bairro, cidade):
     if not api_key:
         return []
 
-    url = "https://places.googleapis.com/v1/places:searchText"
+    url = places_url('/v1/places:searchText')
     all_places = []
     next_token = None
 
@@ -130,7 +166,7 @@ def search_places_location(keyword, bairro, cidade):
             payload["pageToken"] = next_token
 
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=15)
+            response = _requisitar('POST', url, json=payload, headers=headers, timeout=15)
             data = response.json()
 
             if response.status_code != 200:
@@ -143,7 +179,7 @@ def search_places_location(keyword, bairro, cidade):
 
             if not next_token:
                 break
-            time.sleep(2)
+            _pausar('GOOGLE_PLACES_PAUSA_PAGINA', PAUSA_PAGINA_PADRAO)
         except Exception as e:
             logger.exception(f"Erro na busca Places: {e}")
             break
@@ -162,7 +198,7 @@ def get_place_details(place_id):
 
     # Algumas respostas trazem "places/ChIJ..." - a API get aceita só "ChIJ..."
     clean_id = place_id.replace("places/", "") if place_id.startswith("places/") else place_id
-    url = f"https://places.googleapis.com/v1/places/{clean_id}"
+    url = places_url(f'/v1/places/{clean_id}')
 
     headers = {
         "Content-Type": "application/json",
@@ -171,7 +207,7 @@ def get_place_details(place_id):
     }
 
     try:
-        response = requests.get(url, headers=headers, params={"languageCode": "pt-BR"}, timeout=10)
+        response = _requisitar('GET', url, headers=headers, params={"languageCode": "pt-BR"}, timeout=10)
         return response.json() if response.status_code == 200 else None
     except Exception as e:
         logger.exception(f"Erro ao obter detalhes do place {place_id}: {e}")
@@ -180,29 +216,27 @@ def get_place_details(place_id):
 
 def _ensure_acesso_mensal(usuario):
     """
-    Garante que mes_referencia está correto e reseta leads_consumidos_mes se mudou o mês.
+    Retorna o AcessoUsuario do usuário (ou None), sem gravar nada.
+    A cota é zerada pela virada de mês agendada (pagamentos.servicos.cota_mensal).
     """
-    from pagamentos.models import AcessoUsuario
-
     try:
-        acesso = usuario.acesso
+        return usuario.acesso
     except Exception:
         return None
 
-    ano_mes_atual = timezone.now().strftime('%Y-%m')
-    if acesso.mes_referencia != ano_mes_atual:
-        acesso.leads_consumidos_mes = 0
-        acesso.mes_referencia = ano_mes_atual
-        acesso.save(update_fields=['leads_consumidos_mes', 'mes_referencia'])
-    return acesso
+
+def _tamanho_lote_consumo():
+    return max(1, getattr(settings, 'LEADS_LOTE_CONSUMO', 10))
 
 
 def run_coleta(coleta_id):
     """
     Função principal executada em thread.
     Busca lugares, obtém detalhes, salva Lead, respeita limite mensal.
+    O consumo é registrado em lotes de LEADS_LOTE_CONSUMO leads (e no fim da coleta).
     """
     from crm.models import Coleta, Lead
+    from pagamentos.servicos.cota_mensal import leads_consumidos, registrar_consumo
 
     try:
         coleta = Coleta.objects.get(id=coleta_id)
@@ -225,12 +259,15 @@ def run_coleta(coleta_id):
         coleta.save(update_fields=['status', 'mensagem_erro'])
         return
 
-    if acesso.leads_consumidos_mes >= limite:
+    consumidos = leads_consumidos(acesso)
+    if consumidos >= limite:
         coleta.status = 'concluida'
         coleta.mensagem_erro = "Limite mensal de leads já atingido."
         coleta.save(update_fields=['status', 'mensagem_erro'])
         return
 
+    pendentes = 0
+    tamanho_lote = _tamanho_lote_consumo()
     try:
         if coleta.usar_raio and coleta.raio_km:
             endereco = f"{coleta.bairro}, {coleta.cidade}" if coleta.bairro else coleta.cidade
@@ -253,7 +290,7 @@ def run_coleta(coleta_id):
             )
 
         for place in places:
-            if acesso.leads_consumidos_mes >= limite:
+            if consumidos + pendentes >= limite:
                 break
 
             place_id_raw = place.get('id', '')
@@ -266,7 +303,7 @@ def run_coleta(coleta_id):
 
             details = get_place_details(place_id_raw)
             if not details:
-                time.sleep(0.2)
+                _pausar('GOOGLE_PLACES_PAUSA_LEAD', PAUSA_LEAD_PADRAO)
                 continue
 
             nome = ""
@@ -322,12 +359,15 @@ def run_coleta(coleta_id):
                     "nota": nota_decimal,
                     "total_avaliacoes": total_avaliacoes,
                 })
-                acesso.leads_consumidos_mes += 1
-                acesso.save(update_fields=['leads_consumidos_mes'])
+                pendentes += 1
             except Exception as e:
                 logger.warning(f"Erro ao salvar lead {place_id_raw}: {e}")
 
-            time.sleep(0.2)
+            if pendentes >= tamanho_lote:
+                consumidos = registrar_consumo(acesso, pendentes, coleta)
+                pendentes = 0
+
+            _pausar('GOOGLE_PLACES_PAUSA_LEAD', PAUSA_LEAD_PADRAO)
 
         coleta.status = 'concluida'
         coleta.save(update_fields=['status', 'atualizado_em'])
@@ -337,3 +377,6 @@ def run_coleta(coleta_id):
         coleta.status = 'erro'
         coleta.mensagem_erro = str(e)[:2000]
         coleta.save(update_fields=['status', 'mensagem_erro'])
+    finally:
+        # Leads já gravados contam mesmo se a coleta falhar no meio
+        registrar_consumo(acesso, pendentes, coleta)
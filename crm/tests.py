@@ -1,3 +1,92 @@
-from django.test import TestCase
+"""
+Testes do app crm.
+Cobre o orçamento de consultas e tempo das views (web.orcamento_views) e a coleta
+contra o servidor stub das APIs do Google (web.servidores_stub).
+"""
+from contextlib import redirect_stdout
+from io import StringIO
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+
+from web.fabricas import DadosAssinanteTestCase, criar_assinante
+from web.orcamento_views import OrcamentoViewsMixin
+from web.servidores_stub import ServidorStub
+from .benchmark.coleta import Cenario, medir_coletas
+from .models import Coleta
+from .services.places_collector import run_coleta
+
+
+class OrcamentoViewsCrmTest(OrcamentoViewsMixin, DadosAssinanteTestCase):
+    massa_coletas = 5
+    massa_leads_por_coleta = 200
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def test_crm(self):
+        self.assertDentroDoOrcamento('crm')
+
+    def test_coletar_leads(self):
+        self.assertDentroDoOrcamento('coletar_leads')
+
+    def test_ver_leads(self):
+        medicao = self.assertDentroDoOrcamento('ver_leads', data={'coleta': self.coletas[0].pk})
+        self.assertEqual(len(medicao.resposta.context['leads']), 500)
+
+    def test_leads_stream(self):
+        medicao = self.assertDentroDoOrcamento('leads_stream', args=[self.coletas[0].pk], data={'since_id': 0})
+        self.assertEqual(medicao.resposta.json()['total'], 200)
+
+    def test_export_leads_csv(self):
+        self.assertDentroDoOrcamento('export_leads_csv')
+
+
+class ColetaServidorStubTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = criar_assinante(leads_limite=100)
+
+    def _coletar(self, stub, **campos):
+        coleta = Coleta.objects.create(usuario=self.usuario, keyword='padaria', cidade='Recife', **campos)
+        with override_settings(**stub.configuracoes()), redirect_stdout(StringIO()):
+            run_coleta(coleta.pk)
+        coleta.refresh_from_db()
+        return coleta
+
+    def test_coleta_percorre_paginas_e_grava_detalhes(self):
+        with ServidorStub(lugares=45) as stub:
+            coleta = self._coletar(stub, bairro='Boa Viagem')
+
+        self.assertEqual(coleta.status, 'concluida')
+        self.assertEqual(coleta.leads.count(), 45)
+        self.assertEqual(stub.chamadas_para('/v1/places:searchText'), 3)
+        self.assertEqual(stub.chamadas_para('/v1/places/'), 45)
+        lead = coleta.leads.get(place_id='stub-7')
+        self.assertEqual((lead.nome, lead.telefone), ('Empresa stub 7', '(81) 3007-0000'))
+
+    def test_coleta_por_raio_geocodifica_e_respeita_limite(self):
+        self.usuario.acesso.leads_limite_mensal = 10
+        self.usuario.acesso.save()
+        with ServidorStub(lugares=30) as stub:
+            coleta = self._coletar(stub, usar_raio=True, raio_km=2)
+
+        self.assertEqual(coleta.leads.count(), 10)
+        self.assertEqual(stub.chamadas_para('/maps/api/geocode/json'), 1)
+
+
+class BenchmarkColetaTest(TestCase):
+    def test_metricas_por_lead(self):
+        resultado = medir_coletas(Cenario(coletas=2, lugares=25))
+
+        self.assertEqual(resultado['leads'], 50)
+        # Por coleta: 2 páginas do searchText (20 + 5) e 25 detalhes
+        self.assertEqual(resultado['chamadas_api'], 54)
+        self.assertEqual(resultado['chamadas_api_por_lead'], 1.08)
+        self.assertGreaterEqual(resultado['escritas_por_lead'], 1)
+        self.assertEqual(resultado['duracao_coleta_ms']['n'], 2)
+
+    def test_simulador_limita_com_429(self):
+        resultado = medir_coletas(Cenario(coletas=1, lugares=30, limite_por_segundo=10))
+
+        self.assertGreater(resultado['respostas_api'].get('429', 0), 0)
+        self.assertLess(resultado['leads'], 30)
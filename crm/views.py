@@ -10,6 +10,7 @@ from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_GET
 from pagamentos.decoradores_acesso import exigir_assinante_ativo
+from pagamentos.contexto_acesso import obter_direitos
 
 from .models import Coleta, Lead
 from .forms import ColetarLeadsForm
@@ -35,14 +36,14 @@ def crm(request):
 @exigir_assinante_ativo
 def coletar_leads(request):
     """Formulário para filtrar e iniciar coleta. POST cria Coleta e redireciona."""
-    acesso = getattr(request.user, 'acesso', None)
-    if not acesso:
+    acesso = obter_direitos(request)
+    if not acesso.tem_acesso:
         messages.error(request, "Você precisa de um plano ativo para coletar leads.")
         return redirect('planos')
 
     limite = acesso.leads_limite_mensal or 0
-    consumidos = acesso.leads_consumidos_mes or 0
-    disponiveis = max(0, limite - consumidos)
+    consumidos = acesso.leads_consumidos_no_mes()
+    disponiveis = acesso.leads_disponiveis()
 
     if limite <= 0:
         messages.warning(request, "Seu plano não inclui coleta de leads.")
@@ -1,6 +1,9 @@
 from import_export import resources
 from import_export.admin import ImportExportModelAdmin
+from import_export.instance_loaders import CachedInstanceLoader
 from django.contrib import admin
+from web.admin_listas import FiltroTexto, ListaGrandeMixin
+from web.import_export_lotes import ExportacaoStreamingMixin
 from .models import Visitor
 
 class VisitorResource(resources.ModelResource):
@@ -17,10 +20,16 @@ class VisitorResource(resources.ModelResource):
             "page_visited",
         )
         export_order = fields  # mesma ordem acima
+        # Tabela grande: importação em lotes com bulk_create e exportação em blocos
+        use_bulk = True
+        batch_size = 1000
+        skip_diff = True
+        chunk_size = 2000
+        instance_loader_class = CachedInstanceLoader
 
 @admin.register(Visitor)
-class VisitorAdmin(ImportExportModelAdmin):
+class VisitorAdmin(ListaGrandeMixin, ExportacaoStreamingMixin, ImportExportModelAdmin):
     resource_class = VisitorResource
     list_display = ('username', 'ip_address', 'machine_key', 'timestamp', 'page_visited')
-    list_filter = ('timestamp', 'username')
+    list_filter = ('timestamp', ('username', FiltroTexto))
     search_fields = ('ip_address', 'username', 'machine_key', 'page_visited')
@@ -0,0 +1,63 @@
+"""
+Management command para importar arquivos grandes (CSV/XLSX) em lotes.
+Usa o mesmo ModelResource registrado no admin, lendo o arquivo de forma incremental.
+
+Exemplo:
+    python manage.py importar_em_lotes dados_acesso.Visitor visitantes.csv --lote 2000
+"""
+from django.apps import apps
+from django.contrib import admin
+from django.core.management.base import BaseCommand, CommandError
+
+from web.import_export_lotes import TAMANHO_LOTE_PADRAO, importar_em_lotes, iterar_lotes_arquivo
+
+
+class Command(BaseCommand):
+    help = 'Importa um CSV/XLSX grande em lotes usando o resource do admin (bulk_create quando disponível)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('modelo', help='Modelo no formato app_label.Model (ex: dados_acesso.Visitor)')
+        parser.add_argument('arquivo', help='Caminho do arquivo .csv ou .xlsx')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE_PADRAO,
+                            help=f'Linhas por lote (padrão: {TAMANHO_LOTE_PADRAO})')
+        parser.add_argument('--delimitador', default=None,
+                            help='Delimitador do CSV (detectado automaticamente se omitido)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Valida o arquivo sem gravar no banco')
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options['modelo'])
+        except (LookupError, ValueError):
+            raise CommandError(f"Modelo inválido: {options['modelo']}")
+
+        model_admin = admin.site._registry.get(model)
+        if model_admin is None or not hasattr(model_admin, 'get_import_resource_classes'):
+            raise CommandError(f"{options['modelo']} não possui resource de importação registrado no admin.")
+
+        if options['lote'] <= 0:
+            raise CommandError("--lote deve ser maior que zero.")
+
+        resource = model_admin.get_import_resource_classes(None)[0]()
+        lotes = iterar_lotes_arquivo(options['arquivo'], options['lote'], options['delimitador'])
+
+        modo = ' (dry-run)' if options['dry_run'] else ''
+        self.stdout.write(self.style.WARNING(f"Importando {options['arquivo']} em {model.__name__}{modo}..."))
+
+        def progresso(processadas, totais):
+            self.stdout.write(
+                f"  {processadas} linhas | novas: {totais.get('new', 0)} | "
+                f"atualizadas: {totais.get('update', 0)} | erros: {totais.get('error', 0) + totais.get('invalid', 0)}"
+            )
+
+        totais, erros = importar_em_lotes(resource, lotes, dry_run=options['dry_run'], progresso=progresso)
+
+        for linha, mensagem in erros[:20]:
+            self.stdout.write(self.style.ERROR(f"  Linha {linha}: {mensagem}"))
+        if len(erros) > 20:
+            self.stdout.write(self.style.ERROR(f"  ... e mais {len(erros) - 20} erros."))
+
+        if erros:
+            self.stdout.write(self.style.WARNING('\n[!] Importação concluída com erros (lotes com erro foram revertidos).'))
+        else:
+            self.stdout.write(self.style.SUCCESS('\n[OK] Importação concluída!'))
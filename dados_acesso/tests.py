@@ -1,3 +1,52 @@
+"""
+Testes do app dados_acesso.
+Cobre a exportação em streaming e a importação em lotes dos visitantes.
+"""
+import csv
+import os
+import tempfile
+
 from django.test import TestCase
 
-# Create your tests here.
+from web.import_export_lotes import exportar_csv_streaming, importar_em_lotes, iterar_lotes_arquivo
+from .admin import VisitorResource
+from .models import Visitor
+
+
+class ExportacaoStreamingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Visitor.objects.bulk_create([
+            Visitor(ip_address=f'10.0.0.{i}', user_agent='ua', page_visited=f'/p/{i}')
+            for i in range(25)
+        ])
+
+    def test_csv_gera_uma_linha_por_visitante(self):
+        response = exportar_csv_streaming(VisitorResource(), Visitor.objects.order_by('pk'))
+        self.assertTrue(response.streaming)
+        conteudo = b''.join(response.streaming_content).decode('utf-8-sig')
+        linhas = list(csv.reader(conteudo.splitlines(), delimiter=';'))
+        self.assertEqual(linhas[0][:3], ['id', 'username', 'ip_address'])
+        self.assertEqual(len(linhas), 26)
+
+
+class ImportacaoLotesTest(TestCase):
+    def test_importa_arquivo_em_lotes_com_progresso(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['id', 'username', 'ip_address', 'user_agent', 'page_visited'])
+            for i in range(23):
+                writer.writerow(['', 'Visitante', f'192.168.0.{i}', 'ua', '/'])
+        self.addCleanup(os.remove, f.name)
+
+        chamadas = []
+        totais, erros = importar_em_lotes(
+            VisitorResource(),
+            iterar_lotes_arquivo(f.name, tamanho_lote=10),
+            progresso=lambda processadas, totais: chamadas.append(processadas),
+        )
+
+        self.assertEqual(erros, [])
+        self.assertEqual(totais['new'], 23)
+        self.assertEqual(chamadas, [10, 20, 23])
+        self.assertEqual(Visitor.objects.count(), 23)
@@ -1,3 +1,17 @@
+"""
+Testes do app dashboard.
+"""
 from django.test import TestCase
 
-# Create your tests here.
+from web.fabricas import criar_assinante
+from web.orcamento_views import OrcamentoViewsMixin
+
+
+class OrcamentoViewsDashboardTest(OrcamentoViewsMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = criar_assinante()
+
+    def test_dashboard(self):
+        self.client.force_login(self.usuario)
+        self.assertDentroDoOrcamento('dashboard')
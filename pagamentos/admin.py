@@ -4,7 +4,15 @@ Configuração do Django Admin para os models de pagamentos.
 from import_export import resources
 from import_export.admin import ImportExportModelAdmin
 from django.contrib import admin
-from .models import Oferta, Compra, Assinatura, AcessoUsuario, EventoMercadoPago
+from django.utils import timezone
+from web.admin_listas import FiltroAutocomplete, ListaGrandeMixin
+from web.import_export_lotes import ExportacaoStreamingMixin
+from .servicos.estados_assinatura import registrar_transicao
+from .servicos.uso_leads import maiores_consumidores, tendencia_plataforma
+from .models import (
+    Oferta, Compra, Assinatura, AcessoUsuario, EventoMercadoPago, NotificacaoWebhook,
+    ExecucaoReconciliacao, TransicaoEstado, UsoMensalLeads, LancamentoUsoLeads,
+)
 
 
 class OfertaResource(resources.ModelResource):
@@ -31,6 +39,10 @@ class AssinaturaResource(resources.ModelResource):
         model = Assinatura
         fields = ("id", "usuario", "oferta", "status", "mercadopago_preapproval_id", "criado_em", "atualizado_em")
         export_order = fields
+        chunk_size = 2000
+
+    def filter_export(self, queryset, **kwargs):
+        return queryset.select_related('usuario', 'oferta')
 
 
 class CompraResource(resources.ModelResource):
@@ -48,6 +60,10 @@ class CompraResource(resources.ModelResource):
             "atualizado_em",
         )
         export_order = fields
+        chunk_size = 2000
+
+    def filter_export(self, queryset, **kwargs):
+        return queryset.select_related('usuario', 'oferta')
 
 
 class AcessoUsuarioResource(resources.ModelResource):
@@ -67,6 +83,10 @@ class AcessoUsuarioResource(resources.ModelResource):
             "ultima_assinatura",
         )
         export_order = fields
+        chunk_size = 2000
+
+    def filter_export(self, queryset, **kwargs):
+        return queryset.select_related('usuario', 'ultima_compra', 'ultima_assinatura')
 
 
 class EventoMercadoPagoResource(resources.ModelResource):
@@ -80,6 +100,7 @@ class EventoMercadoPagoResource(resources.ModelResource):
             "dados_json",
         )
         export_order = fields
+        chunk_size = 2000
 
 
 @admin.register(Oferta)
@@ -113,13 +134,14 @@ class OfertaAdmin(ImportExportModelAdmin):
 
 
 @admin.register(Compra)
-class CompraAdmin(ImportExportModelAdmin):
+class CompraAdmin(ExportacaoStreamingMixin, ImportExportModelAdmin):
     resource_class = CompraResource
     """
     Admin para o model Compra.
     """
     list_display = ['id', 'usuario', 'oferta', 'status', 'criado_em']
-    list_filter = ['status', 'criado_em', 'oferta']
+    list_filter = ['status', 'criado_em', 'oferta', ('usuario', FiltroAutocomplete)]
+    list_select_related = ['usuario', 'oferta']
     search_fields = ['usuario__username', 'usuario__email', 
                     'mercadopago_preference_id', 'mercadopago_payment_id']
     readonly_fields = ['criado_em', 'atualizado_em']
@@ -145,28 +167,36 @@ class CompraAdmin(ImportExportModelAdmin):
 
 
 @admin.register(Assinatura)
-class AssinaturaAdmin(ImportExportModelAdmin):
+class AssinaturaAdmin(ExportacaoStreamingMixin, ImportExportModelAdmin):
     resource_class = AssinaturaResource
     list_display = ['id', 'usuario', 'oferta', 'status', 'criado_em']
-    list_filter = ['status', 'oferta', 'criado_em']
+    list_filter = ['status', 'oferta', 'criado_em', ('usuario', FiltroAutocomplete)]
+    list_select_related = ['usuario', 'oferta']
     search_fields = ['usuario__username', 'usuario__email', 'mercadopago_preapproval_id']
     readonly_fields = ['criado_em', 'atualizado_em']
     raw_id_fields = ['usuario', 'oferta']
     fieldsets = (
         ('Assinatura', {'fields': ('usuario', 'oferta', 'status')}),
-        ('Mercado Pago', {'fields': ('mercadopago_preapproval_id',)}),
+        ('Mercado Pago', {'fields': ('mercadopago_preapproval_id', 'mercadopago_init_point')}),
         ('Datas', {'fields': ('criado_em', 'atualizado_em')}),
     )
 
+    def save_model(self, request, obj, form, change):
+        anterior = form.initial.get('status', '')
+        super().save_model(request, obj, form, change)
+        if 'status' in form.changed_data:
+            registrar_transicao(obj, anterior, motivo=f'admin: {request.user.username}')
+
 
 @admin.register(AcessoUsuario)
-class AcessoUsuarioAdmin(ImportExportModelAdmin):
+class AcessoUsuarioAdmin(ExportacaoStreamingMixin, ImportExportModelAdmin):
     resource_class = AcessoUsuarioResource
     """
     Admin para o model AcessoUsuario.
     """
     list_display = ['usuario', 'nivel', 'status', 'leads_limite_mensal', 'leads_consumidos_mes', 'concedido_em']
     list_filter = ['nivel', 'status', 'concedido_em']
+    list_select_related = ['usuario']
     search_fields = ['usuario__username', 'usuario__email']
     readonly_fields = ['concedido_em', 'atualizado_em']
     raw_id_fields = ['usuario', 'ultima_compra', 'ultima_assinatura']
@@ -178,9 +208,15 @@ class AcessoUsuarioAdmin(ImportExportModelAdmin):
         ('Datas', {'fields': ('concedido_em', 'atualizado_em')}),
     )
 
+    def save_model(self, request, obj, form, change):
+        anterior = form.initial.get('status', '')
+        super().save_model(request, obj, form, change)
+        if 'status' in form.changed_data:
+            registrar_transicao(obj, anterior, motivo=f'admin: {request.user.username}')
+
 
 @admin.register(EventoMercadoPago)
-class EventoMercadoPagoAdmin(ImportExportModelAdmin):
+class EventoMercadoPagoAdmin(ListaGrandeMixin, ExportacaoStreamingMixin, ImportExportModelAdmin):
     resource_class = EventoMercadoPagoResource
     """
     Admin para o model EventoMercadoPago (apenas leitura).
@@ -198,3 +234,116 @@ class EventoMercadoPagoAdmin(ImportExportModelAdmin):
     
     def has_delete_permission(self, request, obj=None):
         return False
+
+
+@admin.register(NotificacaoWebhook)
+class NotificacaoWebhookAdmin(ListaGrandeMixin, admin.ModelAdmin):
+    """
+    Admin da caixa de entrada de webhooks (apenas leitura, com reprocessamento manual).
+    """
+    list_display = ['id', 'topico', 'recurso_id', 'status', 'resultado', 'tentativas',
+                    'duracao_ms', 'recebida_em', 'processada_em']
+    list_filter = ['status', 'topico', 'resultado', 'recebida_em']
+    search_fields = ['recurso_id']
+    readonly_fields = [f.name for f in NotificacaoWebhook._meta.fields]
+    actions = ['reprocessar']
+
+    @admin.action(description='Reprocessar notificações selecionadas')
+    def reprocessar(self, request, queryset):
+        total = queryset.exclude(status='processando').update(
+            status='pendente', tentativas=0, proxima_tentativa_em=timezone.now(), ultimo_erro='',
+        )
+        self.message_user(request, f"{total} notificações reenfileiradas.")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ExecucaoReconciliacao)
+class ExecucaoReconciliacaoAdmin(admin.ModelAdmin):
+    """
+    Histórico do comando reconciliar_pagamentos (apenas leitura).
+    """
+    list_display = ['iniciada_em', 'concluida_em', 'incremental', 'dry_run', 'verificadas', 'alteradas', 'erros']
+    list_filter = ['incremental', 'dry_run']
+    readonly_fields = [f.name for f in ExecucaoReconciliacao._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(TransicaoEstado)
+class TransicaoEstadoAdmin(ListaGrandeMixin, admin.ModelAdmin):
+    """
+    Log de transições de Assinatura e AcessoUsuario (append-only).
+    """
+    list_display = ['criado_em', 'entidade', 'objeto_id', 'usuario', 'estado_anterior', 'estado_novo', 'motivo']
+    list_filter = ['entidade', 'estado_novo', 'criado_em', ('usuario', FiltroAutocomplete)]
+    list_select_related = ['usuario']
+    search_fields = ['usuario__username', 'usuario__email', 'motivo']
+    readonly_fields = [f.name for f in TransicaoEstado._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(UsoMensalLeads)
+class UsoMensalLeadsAdmin(admin.ModelAdmin):
+    """
+    Resumo mensal de consumo de leads, com relatório de tendência da plataforma e
+    maiores consumidores do mês no topo da listagem (lidos só do resumo).
+    """
+    list_display = ['mes_referencia', 'usuario', 'nivel', 'leads_consumidos', 'leads_limite', 'fechado_em']
+    list_filter = ['mes_referencia', 'nivel']
+    search_fields = ['usuario__username', 'usuario__email']
+    list_select_related = ['usuario']
+    readonly_fields = [f.name for f in UsoMensalLeads._meta.fields]
+    change_list_template = 'admin/pagamentos/usomensalleads/change_list.html'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        mes = request.GET.get('mes_referencia__exact')
+        extra_context = {
+            **(extra_context or {}),
+            'tendencia_uso': tendencia_plataforma(),
+            'maiores_consumidores': maiores_consumidores(mes),
+        }
+        return super().changelist_view(request, extra_context=extra_context)
+
+
+@admin.register(LancamentoUsoLeads)
+class LancamentoUsoLeadsAdmin(ListaGrandeMixin, admin.ModelAdmin):
+    """
+    Livro de consumo de leads (append-only), um lançamento por lote da coleta.
+    """
+    list_display = ['criado_em', 'usuario', 'coleta', 'mes_referencia', 'quantidade']
+    list_filter = ['mes_referencia']
+    search_fields = ['usuario__username', 'usuario__email']
+    list_select_related = ['usuario', 'coleta']
+    readonly_fields = [f.name for f in LancamentoUsoLeads._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,6 @@ class PagamentosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pagamentos'
     verbose_name = 'Gestão de Pagamentos'
+
+    def ready(self):
+        from . import signals  # noqa: F401
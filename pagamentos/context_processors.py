@@ -0,0 +1,11 @@
+"""
+Context processors do app de pagamentos.
+"""
+from django.utils.functional import SimpleLazyObject
+
+from .contexto_acesso import obter_direitos
+
+
+def direitos(request):
+    """Expõe {{ direitos }} aos templates; só é calculado (via cache) se o template usar."""
+    return {'direitos': SimpleLazyObject(lambda: obter_direitos(request))}
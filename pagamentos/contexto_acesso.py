@@ -0,0 +1,47 @@
+"""
+Acesso do usuário por requisição.
+
+- obter_direitos(request): snapshot de direitos vindo do cache (pagamentos.direitos);
+  é o que os decoradores e templates usam, sem consultar o banco com o cache quente.
+- obter_acesso(request): o AcessoUsuario completo, para as views que precisam da linha
+  (ex.: datas, display de choices). Uma única consulta com select_related, memoizada
+  no request.
+"""
+from django.contrib.auth.models import User
+
+from .direitos import SEM_ACESSO, obter_direitos_usuario
+from .models import AcessoUsuario
+
+ATRIBUTO_DIREITOS = '_direitos_usuario'
+ATRIBUTO_ACESSO = '_acesso_usuario'
+
+
+def obter_direitos(request):
+    """Retorna os Direitos do usuário logado, calculados no máximo uma vez por requisição."""
+    if not hasattr(request, ATRIBUTO_DIREITOS):
+        direitos = SEM_ACESSO
+        if request.user.is_authenticated:
+            direitos = obter_direitos_usuario(request.user.pk)
+        setattr(request, ATRIBUTO_DIREITOS, direitos)
+    return getattr(request, ATRIBUTO_DIREITOS)
+
+
+def obter_acesso(request):
+    """
+    Retorna o AcessoUsuario do usuário logado (ou None), carregado no máximo uma vez
+    por requisição. Também preenche o cache de request.user.acesso.
+    """
+    if hasattr(request, ATRIBUTO_ACESSO):
+        return getattr(request, ATRIBUTO_ACESSO)
+
+    acesso = None
+    if request.user.is_authenticated:
+        acesso = (
+            AcessoUsuario.objects
+            .select_related('ultima_assinatura', 'ultima_compra')
+            .filter(usuario_id=request.user.pk)
+            .first()
+        )
+        User._meta.get_field('acesso').set_cached_value(request.user, acesso)
+    setattr(request, ATRIBUTO_ACESSO, acesso)
+    return acesso
@@ -7,6 +7,9 @@ from django.shortcuts import redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 
+from .contexto_acesso import obter_direitos
+from .direitos import PAGAMENTO_ASSINATURA_INATIVA, PAGAMENTO_COMPRA_PENDENTE
+
 NIVEL_DISPLAY = {'basico': 'Básico', 'profissional': 'Profissional', 'enterprise': 'Enterprise', 'ouro': 'Ouro'}
 
 
@@ -32,44 +35,42 @@ def verificar_acesso(nivel_minimo):
         @login_required
         def wrapped_view(request, *args, **kwargs):
             # Verificar se o usuário tem acesso
-            try:
-                acesso = request.user.acesso
-                
-                # Verificar se o acesso está ativo
-                if acesso.status != 'ativo':
-                    messages.warning(
-                        request,
-                        f"Seu acesso está {acesso.status}. Entre em contato com o suporte."
-                    )
-                    return redirect('planos')
-                
-                # Verificar se tem o nível mínimo
-                if not acesso.tem_acesso_minimo(nivel_minimo):
-                    nivel_necessario_display = {
-                        'basico': 'Básico',
-                        'profissional': 'Profissional',
-                        'enterprise': 'Enterprise',
-                        'ouro': 'Profissional',
-                    }.get(nivel_minimo, nivel_minimo.title())
-                    
-                    messages.warning(
-                        request,
-                        f"Esta área requer o plano {nivel_necessario_display} ou superior. "
-                        f"Você possui o plano {_nivel_display(acesso.nivel)}."
-                    )
-                    return redirect('planos')
-                
-                # Usuário tem acesso, executar a view
-                return view_func(request, *args, **kwargs)
-                
-            except AttributeError:
+            acesso = obter_direitos(request)
+            if not acesso.tem_acesso:
                 # Usuário não tem acesso nenhum
                 messages.info(
                     request,
                     "Você precisa adquirir um plano para acessar esta área."
                 )
                 return redirect('planos')
-        
+
+            # Verificar se o acesso está ativo
+            if acesso.status != 'ativo':
+                messages.warning(
+                    request,
+                    f"Seu acesso está {acesso.status}. Entre em contato com o suporte."
+                )
+                return redirect('planos')
+
+            # Verificar se tem o nível mínimo
+            if not acesso.tem_acesso_minimo(nivel_minimo):
+                nivel_necessario_display = {
+                    'basico': 'Básico',
+                    'profissional': 'Profissional',
+                    'enterprise': 'Enterprise',
+                    'ouro': 'Profissional',
+                }.get(nivel_minimo, nivel_minimo.title())
+
+                messages.warning(
+                    request,
+                    f"Esta área requer o plano {nivel_necessario_display} ou superior. "
+                    f"Você possui o plano {_nivel_display(acesso.nivel)}."
+                )
+                return redirect('planos')
+
+            # Usuário tem acesso, executar a view
+            return view_func(request, *args, **kwargs)
+
         return wrapped_view
     return decorador
 
@@ -82,13 +83,14 @@ def exigir_assinante_ativo(view_func):
     Decorador que exige usuário assinante ativo e pagante.
     Verifica: login, existência de AcessoUsuario, status ativo e pagamento em dia
     (assinatura autorizada ou compra paga no legado).
+    Os direitos vêm do cache (ver contexto_acesso.obter_direitos), sem consultar o banco
+    com o cache quente.
     """
     @wraps(view_func)
     @login_required
     def wrapped_view(request, *args, **kwargs):
-        try:
-            acesso = request.user.acesso
-        except AttributeError:
+        acesso = obter_direitos(request)
+        if not acesso.tem_acesso:
             messages.info(
                 request,
                 "Você precisa adquirir um plano para acessar esta área."
@@ -103,20 +105,18 @@ def exigir_assinante_ativo(view_func):
             return redirect('planos')
 
         # Verificar se o pagamento está em dia
-        if acesso.ultima_assinatura_id:
-            if acesso.ultima_assinatura.status != 'authorized':
-                messages.warning(
-                    request,
-                    "Sua assinatura não está ativa. Regularize seu pagamento para continuar acessando."
-                )
-                return redirect('planos')
-        elif acesso.ultima_compra_id:
-            if acesso.ultima_compra.status != 'paga':
-                messages.warning(
-                    request,
-                    "Seu pagamento está pendente. Entre em contato com o suporte."
-                )
-                return redirect('planos')
+        if acesso.pagamento == PAGAMENTO_ASSINATURA_INATIVA:
+            messages.warning(
+                request,
+                "Sua assinatura não está ativa. Regularize seu pagamento para continuar acessando."
+            )
+            return redirect('planos')
+        if acesso.pagamento == PAGAMENTO_COMPRA_PENDENTE:
+            messages.warning(
+                request,
+                "Seu pagamento está pendente. Entre em contato com o suporte."
+            )
+            return redirect('planos')
         # Se não tem assinatura nem compra vinculada (ex.: acesso manual), permite se status ativo
 
         return view_func(request, *args, **kwargs)
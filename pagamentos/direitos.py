@@ -0,0 +1,166 @@
+"""
+Cache de direitos (entitlements) por usuário.
+
+Nível do plano, status, situação do pagamento e cota de leads são lidos em quase toda
+requisição, mas só mudam em eventos de webhook, concessão de acesso e coletas.
+Guardamos um snapshot compacto por usuário no cache 'direitos' (locmem por padrão,
+file/DB opcionais via settings) e o invalidamos pelos sinais post_save/post_delete de
+AcessoUsuario, Assinatura e Compra (ver pagamentos/signals.py).
+
+A chave inclui VERSAO_DIREITOS: ao mudar o formato do snapshot, basta incrementá-la.
+"""
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AcessoUsuario, Oferta
+
+VERSAO_DIREITOS = 1
+ALIAS_CACHE = 'direitos'
+
+PAGAMENTO_OK = 'ok'
+PAGAMENTO_ASSINATURA_INATIVA = 'assinatura_inativa'
+PAGAMENTO_COMPRA_PENDENTE = 'compra_pendente'
+
+_CAMPOS = (
+    'tem_acesso',
+    'nivel',
+    'status',
+    'pagamento',
+    'leads_limite_mensal',
+    'leads_consumidos_mes',
+    'mes_referencia',
+)
+
+
+class Direitos:
+    """
+    Snapshot somente leitura dos direitos de um usuário.
+    Espelha as regras de AcessoUsuario sem precisar do banco.
+    """
+    __slots__ = _CAMPOS
+
+    def __init__(self, tem_acesso=False, nivel='', status='', pagamento=PAGAMENTO_OK,
+                 leads_limite_mensal=0, leads_consumidos_mes=0, mes_referencia=''):
+        self.tem_acesso = tem_acesso
+        self.nivel = nivel
+        self.status = status
+        self.pagamento = pagamento
+        self.leads_limite_mensal = leads_limite_mensal
+        self.leads_consumidos_mes = leads_consumidos_mes
+        self.mes_referencia = mes_referencia
+
+    def __repr__(self):
+        return f"<Direitos {self.nivel or '-'} ({self.status or 'sem acesso'}, pagamento={self.pagamento})>"
+
+    def como_tupla(self):
+        return tuple(getattr(self, campo) for campo in _CAMPOS)
+
+    @classmethod
+    def de_tupla(cls, valores):
+        return cls(*valores)
+
+    @property
+    def ativo(self):
+        return self.tem_acesso and self.status == 'ativo'
+
+    @property
+    def pagamento_em_dia(self):
+        return self.pagamento == PAGAMENTO_OK
+
+    def tem_acesso_minimo(self, nivel_requerido):
+        """Mesma regra de AcessoUsuario.tem_acesso_minimo."""
+        if not self.ativo:
+            return False
+        return Oferta.obter_nivel_numerico(self.nivel) >= Oferta.obter_nivel_numerico(nivel_requerido)
+
+    def leads_consumidos_no_mes(self):
+        """Leads consumidos no mês corrente (0 se o snapshot é de um mês anterior)."""
+        if self.mes_referencia != timezone.now().strftime('%Y-%m'):
+            return 0
+        return self.leads_consumidos_mes
+
+    def leads_disponiveis(self):
+        return max(0, (self.leads_limite_mensal or 0) - self.leads_consumidos_no_mes())
+
+    def tem_leads_disponiveis(self):
+        """Mesma regra de AcessoUsuario.tem_leads_disponiveis."""
+        if self.mes_referencia != timezone.now().strftime('%Y-%m'):
+            return True
+        return self.leads_consumidos_mes < self.leads_limite_mensal
+
+
+SEM_ACESSO = Direitos()
+
+
+def _chave(usuario_id):
+    return f'direitos:v{VERSAO_DIREITOS}:{usuario_id}'
+
+
+def calcular_direitos(usuario_id):
+    """Monta o snapshot a partir do banco em uma única consulta."""
+    linha = (
+        AcessoUsuario.objects
+        .filter(usuario_id=usuario_id)
+        .values(
+            'nivel', 'status', 'leads_limite_mensal', 'leads_consumidos_mes', 'mes_referencia',
+            'ultima_assinatura_id', 'ultima_assinatura__status',
+            'ultima_compra_id', 'ultima_compra__status',
+        )
+        .first()
+    )
+    if linha is None:
+        return SEM_ACESSO
+
+    if linha['ultima_assinatura_id']:
+        pagamento = PAGAMENTO_OK if linha['ultima_assinatura__status'] == 'authorized' else PAGAMENTO_ASSINATURA_INATIVA
+    elif linha['ultima_compra_id']:
+        pagamento = PAGAMENTO_OK if linha['ultima_compra__status'] == 'paga' else PAGAMENTO_COMPRA_PENDENTE
+    else:
+        # Acesso manual (sem assinatura nem compra vinculada)
+        pagamento = PAGAMENTO_OK
+
+    return Direitos(
+        tem_acesso=True,
+        nivel=linha['nivel'],
+        status=linha['status'],
+        pagamento=pagamento,
+        leads_limite_mensal=linha['leads_limite_mensal'],
+        leads_consumidos_mes=linha['leads_consumidos_mes'],
+        mes_referencia=linha['mes_referencia'],
+    )
+
+
+def obter_direitos_usuario(usuario_id):
+    """Retorna os Direitos do usuário, consultando o banco apenas em cache frio."""
+    cache = caches[ALIAS_CACHE]
+    chave = _chave(usuario_id)
+    valores = cache.get(chave)
+    if valores is not None:
+        return Direitos.de_tupla(valores)
+    direitos = calcular_direitos(usuario_id)
+    cache.set(chave, direitos.como_tupla())
+    return direitos
+
+
+def invalidar_direitos(usuario_id):
+    """
+    Remove o snapshot do usuário. Repete a remoção após o commit para que uma leitura
+    concorrente durante a transação não deixe o estado antigo em cache.
+    """
+    if usuario_id is None:
+        return
+    cache = caches[ALIAS_CACHE]
+    chave = _chave(usuario_id)
+    cache.delete(chave)
+    transaction.on_commit(lambda: cache.delete(chave))
+
+
+def invalidar_direitos_em_lote(usuario_ids):
+    """Como invalidar_direitos, para vários usuários: um delete_many e um on_commit."""
+    chaves = [_chave(usuario_id) for usuario_id in set(usuario_ids) if usuario_id is not None]
+    if not chaves:
+        return
+    cache = caches[ALIAS_CACHE]
+    cache.delete_many(chaves)
+    transaction.on_commit(lambda: cache.delete_many(chaves))
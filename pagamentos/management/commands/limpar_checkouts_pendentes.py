@@ -0,0 +1,43 @@
+"""
+Management command para remover assinaturas pendentes abandonadas
+(checkout iniciado e nunca concluído), em lotes.
+
+Exemplos:
+    python manage.py limpar_checkouts_pendentes --dry-run
+    python manage.py limpar_checkouts_pendentes --dias 14 --lote 1000
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pagamentos.servicos.checkout_assinatura import (
+    IDADE_ABANDONO_PADRAO, TAMANHO_LOTE_LIMPEZA, checkouts_abandonados, limpar_checkouts_abandonados,
+)
+
+
+class Command(BaseCommand):
+    help = 'Remove em lotes as assinaturas pendentes abandonadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=IDADE_ABANDONO_PADRAO.days,
+                            help=f'Idade mínima em dias (padrão: {IDADE_ABANDONO_PADRAO.days})')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE_LIMPEZA,
+                            help=f'Linhas por DELETE (padrão: {TAMANHO_LOTE_LIMPEZA})')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Apenas conta as assinaturas que seriam removidas')
+
+    def handle(self, *args, **options):
+        if options['dias'] <= 0 or options['lote'] <= 0:
+            raise CommandError("--dias e --lote devem ser maiores que zero.")
+
+        idade = timedelta(days=options['dias'])
+        if options['dry_run']:
+            total = checkouts_abandonados(idade).count()
+            self.stdout.write(self.style.WARNING(f"{total} assinaturas pendentes seriam removidas (dry-run)."))
+            return
+
+        self.stdout.write(self.style.WARNING(f"Removendo assinaturas pendentes com mais de {options['dias']} dias..."))
+        total = limpar_checkouts_abandonados(
+            idade, options['lote'], progresso=lambda total: self.stdout.write(f"  {total} removidas")
+        )
+        self.stdout.write(self.style.SUCCESS(f"\n[OK] {total} assinaturas pendentes removidas."))
@@ -0,0 +1,70 @@
+"""
+Management command que processa a caixa de entrada de webhooks do Mercado Pago.
+O endpoint do webhook só grava a notificação; este comando consulta a API,
+aplica as transições e reagenda falhas com backoff.
+
+Exemplos:
+    python manage.py processar_webhooks                 # um lote e sai (cron)
+    python manage.py processar_webhooks --continuo      # processo de fundo
+    python manage.py processar_webhooks --metricas
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from pagamentos.servicos.webhook_inbox import TAMANHO_LOTE_PADRAO, metricas_inbox, processar_pendentes
+
+
+class Command(BaseCommand):
+    help = 'Processa as notificações pendentes da caixa de entrada de webhooks do Mercado Pago'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE_PADRAO,
+                            help=f'Notificações por lote (padrão: {TAMANHO_LOTE_PADRAO})')
+        parser.add_argument('--continuo', action='store_true',
+                            help='Fica em laço processando novas notificações')
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help='Segundos de espera quando a fila está vazia (modo contínuo)')
+        parser.add_argument('--metricas', action='store_true',
+                            help='Apenas exibe as métricas das últimas 24h e sai')
+
+    def handle(self, *args, **options):
+        if options['lote'] <= 0:
+            raise CommandError("--lote deve ser maior que zero.")
+
+        if options['metricas']:
+            self._exibir_metricas()
+            return
+
+        if not options['continuo']:
+            total = processar_pendentes(options['lote'])
+            self.stdout.write(self.style.SUCCESS(f"[OK] {total} notificações processadas."))
+            return
+
+        self.stdout.write(self.style.WARNING('Processando webhooks (Ctrl+C para sair)...'))
+        try:
+            while True:
+                total = processar_pendentes(options['lote'])
+                if total:
+                    self.stdout.write(f"  {total} notificações processadas")
+                else:
+                    time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('\n[OK] Processador encerrado.'))
+
+    def _exibir_metricas(self):
+        m = metricas_inbox(desde=timezone.now() - timedelta(hours=24))
+        self.stdout.write('Notificações (últimas 24h) por status:')
+        for status, total in sorted(m['por_status'].items()):
+            self.stdout.write(f"  {status}: {total}")
+        self.stdout.write('Por resultado:')
+        for resultado, total in sorted(m['por_resultado'].items()):
+            self.stdout.write(f"  {resultado}: {total}")
+        media = m['latencia_media_ms']
+        self.stdout.write(
+            f"Latência de processamento: média {media:.0f} ms, máxima {m['latencia_maxima_ms']} ms"
+            if media is not None else 'Latência de processamento: sem dados'
+        )
+        self.stdout.write(f"Atraso da fila: {m['atraso_fila_segundos']:.0f} s")
@@ -0,0 +1,62 @@
+"""
+Management command para reconciliar Assinatura e Compra com o Mercado Pago.
+Corrige status que ficaram divergentes quando um webhook se perdeu.
+
+Exemplos:
+    python manage.py reconciliar_pagamentos --dry-run
+    python manage.py reconciliar_pagamentos --incremental --concorrencia 8
+    python manage.py reconciliar_pagamentos --stub estado_mp.json --dry-run
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from pagamentos.servicos.mercadopago_servico import MercadoPagoServico
+from pagamentos.servicos.mercadopago_stub import MercadoPagoStub
+from pagamentos.servicos.reconciliacao import CONCORRENCIA_PADRAO, TAMANHO_PAGINA_PADRAO, reconciliar
+
+
+class Command(BaseCommand):
+    help = 'Reconcilia assinaturas e compras não finalizadas com o estado do Mercado Pago'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Apenas lista as divergências, sem alterar o banco')
+        parser.add_argument('--incremental', action='store_true',
+                            help="Busca só o que mudou desde a última reconciliação (marca d'água)")
+        parser.add_argument('--concorrencia', type=int, default=CONCORRENCIA_PADRAO,
+                            help=f'Requisições simultâneas ao Mercado Pago (padrão: {CONCORRENCIA_PADRAO})')
+        parser.add_argument('--pagina', type=int, default=TAMANHO_PAGINA_PADRAO,
+                            help=f'Itens por página nas buscas (padrão: {TAMANHO_PAGINA_PADRAO})')
+        parser.add_argument('--stub', default=None,
+                            help='Arquivo JSON com o estado do Mercado Pago (não acessa a rede)')
+
+    def handle(self, *args, **options):
+        if options['concorrencia'] <= 0 or options['pagina'] <= 0:
+            raise CommandError("--concorrencia e --pagina devem ser maiores que zero.")
+
+        cliente = MercadoPagoStub.de_arquivo(options['stub']) if options['stub'] else MercadoPagoServico
+        modo = 'incremental' if options['incremental'] else 'completa'
+        sufixo = ' (dry-run)' if options['dry_run'] else ''
+        self.stdout.write(self.style.WARNING(f"Reconciliação {modo}{sufixo}..."))
+
+        resultado = reconciliar(
+            cliente=cliente,
+            dry_run=options['dry_run'],
+            incremental=options['incremental'],
+            concorrencia=options['concorrencia'],
+            tamanho_pagina=options['pagina'],
+        )
+
+        if options['incremental'] and not resultado.execucao.incremental:
+            self.stdout.write("  Nenhuma marca d'água encontrada: executada reconciliação completa.")
+        for d in resultado.divergencias:
+            self.stdout.write(f"  {d.objeto._meta.verbose_name} #{d.objeto.pk}: {d.status_atual} -> {d.status_remoto}")
+        for erro in resultado.erros:
+            self.stdout.write(self.style.ERROR(f"  Erro: {erro}"))
+
+        acao = 'encontradas' if options['dry_run'] else 'aplicadas'
+        mensagem = (f"\n{resultado.verificadas} verificadas, "
+                    f"{len(resultado.divergencias)} divergências {acao}, {len(resultado.erros)} erros.")
+        if resultado.erros:
+            self.stdout.write(self.style.WARNING(mensagem))
+        else:
+            self.stdout.write(self.style.SUCCESS(mensagem))
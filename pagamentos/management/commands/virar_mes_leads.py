@@ -0,0 +1,43 @@
+"""
+Management command para a virada mensal da cota de leads: grava o consumo do mês
+que fecha em UsoMensalLeads e zera todos os acessos com um único UPDATE.
+Idempotente; agendar para o início do dia 1 (ex.: cron "5 0 1 * *"). --mes não aceita
+meses anteriores ao atual: a virada só avança o mes_referencia.
+
+Exemplos:
+    python manage.py virar_mes_leads
+    python manage.py virar_mes_leads --dry-run
+    python manage.py virar_mes_leads --mes 2026-11
+"""
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pagamentos.servicos.cota_mensal import acessos_a_virar, mes_atual, virar_mes
+
+_FORMATO_MES = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+
+
+class Command(BaseCommand):
+    help = 'Fecha o mês anterior e zera a cota de leads de todos os acessos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mes', default=None,
+                            help='Mês de referência de destino, YYYY-MM (padrão: mês atual)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Apenas conta os acessos que seriam virados')
+
+    def handle(self, *args, **options):
+        mes = options['mes'] or mes_atual()
+        if not _FORMATO_MES.match(mes):
+            raise CommandError("--mes deve estar no formato YYYY-MM.")
+        if mes < mes_atual():
+            raise CommandError(f"--mes {mes} é anterior ao mês atual ({mes_atual()}).")
+
+        if options['dry_run']:
+            total = acessos_a_virar(mes).count()
+            self.stdout.write(self.style.WARNING(f"{total} acessos seriam virados para {mes} (dry-run)."))
+            return
+
+        total = virar_mes(mes)
+        self.stdout.write(self.style.SUCCESS(f"[OK] {total} acessos virados para {mes}."))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:29
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagamentos', '0002_planos_assinatura_recorrente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacaoWebhook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topico', models.CharField(blank=True, max_length=100, verbose_name='Tópico')),
+                ('recurso_id', models.CharField(blank=True, max_length=100, verbose_name='ID do Recurso')),
+                ('query_string', models.TextField(blank=True, verbose_name='Query String')),
+                ('corpo', models.TextField(blank=True, verbose_name='Corpo da Requisição')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('processada', 'Processada'), ('ignorada', 'Ignorada'), ('erro', 'Erro (aguardando nova tentativa)'), ('falhou', 'Falhou (tentativas esgotadas)')], default='pendente', max_length=20, verbose_name='Status')),
+                ('tentativas', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('proxima_tentativa_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próxima Tentativa em')),
+                ('resultado', models.CharField(blank=True, max_length=100, verbose_name='Resultado')),
+                ('ultimo_erro', models.TextField(blank=True, verbose_name='Último Erro')),
+                ('duracao_ms', models.PositiveIntegerField(blank=True, null=True, verbose_name='Duração (ms)')),
+                ('recebida_em', models.DateTimeField(auto_now_add=True, verbose_name='Recebida em')),
+                ('processada_em', models.DateTimeField(blank=True, null=True, verbose_name='Processada em')),
+            ],
+            options={
+                'verbose_name': 'Notificação de Webhook',
+                'verbose_name_plural': 'Notificações de Webhook',
+                'ordering': ['-recebida_em'],
+                'indexes': [models.Index(fields=['status', 'proxima_tentativa_em'], name='notif_webhook_fila_idx')],
+            },
+        ),
+    ]
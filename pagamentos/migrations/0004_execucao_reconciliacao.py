@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagamentos', '0003_notificacao_webhook'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecucaoReconciliacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('iniciada_em', models.DateTimeField(verbose_name='Iniciada em')),
+                ('concluida_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluída em')),
+                ('incremental', models.BooleanField(default=False, verbose_name='Incremental')),
+                ('dry_run', models.BooleanField(default=False, verbose_name='Dry-run')),
+                ('verificadas', models.PositiveIntegerField(default=0, verbose_name='Verificadas')),
+                ('alteradas', models.PositiveIntegerField(default=0, verbose_name='Alteradas')),
+                ('erros', models.PositiveIntegerField(default=0, verbose_name='Erros')),
+            ],
+            options={
+                'verbose_name': 'Execução de Reconciliação',
+                'verbose_name_plural': 'Execuções de Reconciliação',
+                'ordering': ['-iniciada_em'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagamentos', '0004_execucao_reconciliacao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assinatura',
+            name='mercadopago_init_point',
+            field=models.URLField(blank=True, max_length=500, verbose_name='Link de Checkout MP'),
+        ),
+    ]
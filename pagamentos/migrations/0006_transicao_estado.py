@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagamentos', '0005_assinatura_init_point'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransicaoEstado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entidade', models.CharField(choices=[('assinatura', 'Assinatura'), ('acesso', 'Acesso de Usuário')], max_length=20, verbose_name='Entidade')),
+                ('objeto_id', models.PositiveIntegerField(verbose_name='ID do Objeto')),
+                ('estado_anterior', models.CharField(blank=True, max_length=20, verbose_name='Estado Anterior')),
+                ('estado_novo', models.CharField(max_length=20, verbose_name='Estado Novo')),
+                ('motivo', models.CharField(blank=True, max_length=200, verbose_name='Motivo')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transicoes_estado', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Transição de Estado',
+                'verbose_name_plural': 'Transições de Estado',
+                'ordering': ['-criado_em', '-id'],
+                'indexes': [models.Index(fields=['entidade', 'objeto_id'], name='transicao_objeto_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagamentos', '0006_transicao_estado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsoMensalLeads',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes_referencia', models.CharField(max_length=7, verbose_name='Mês referência (YYYY-MM)')),
+                ('nivel', models.CharField(blank=True, max_length=30, verbose_name='Nível de Acesso')),
+                ('leads_limite', models.PositiveIntegerField(default=0, verbose_name='Limite de leads')),
+                ('leads_consumidos', models.PositiveIntegerField(default=0, verbose_name='Leads consumidos')),
+                ('fechado_em', models.DateTimeField(auto_now_add=True, verbose_name='Fechado em')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uso_mensal_leads', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Uso Mensal de Leads',
+                'verbose_name_plural': 'Uso Mensal de Leads',
+                'ordering': ['-mes_referencia', 'usuario'],
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'mes_referencia'), name='uso_mensal_usuario_mes_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0003_populate_categoria_cidade_bairro'),
+        ('pagamentos', '0007_uso_mensal_leads'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LancamentoUsoLeads',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes_referencia', models.CharField(max_length=7, verbose_name='Mês referência (YYYY-MM)')),
+                ('quantidade', models.PositiveIntegerField(verbose_name='Leads')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+            ],
+            options={
+                'verbose_name': 'Lançamento de Uso de Leads',
+                'verbose_name_plural': 'Lançamentos de Uso de Leads',
+                'ordering': ['-criado_em'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='usomensalleads',
+            name='fechado_em',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Fechado em'),
+        ),
+        migrations.AddIndex(
+            model_name='usomensalleads',
+            index=models.Index(fields=['mes_referencia', '-leads_consumidos'], name='uso_mensal_ranking_idx'),
+        ),
+        migrations.AddField(
+            model_name='lancamentousoleads',
+            name='coleta',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lancamentos_uso', to='crm.coleta', verbose_name='Coleta'),
+        ),
+        migrations.AddField(
+            model_name='lancamentousoleads',
+            name='usuario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lancamentos_uso_leads', to=settings.AUTH_USER_MODEL, verbose_name='Usuário'),
+        ),
+        migrations.AddIndex(
+            model_name='lancamentousoleads',
+            index=models.Index(fields=['usuario', 'mes_referencia'], name='lancamento_uso_usuario_idx'),
+        ),
+    ]
@@ -96,6 +96,8 @@ class Assinatura(models.Model):
                              default='pendente', verbose_name='Status')
     mercadopago_preapproval_id = models.CharField(max_length=200, blank=True,
                                                   verbose_name='ID da Assinatura MP')
+    mercadopago_init_point = models.URLField(max_length=500, blank=True,
+                                             verbose_name='Link de Checkout MP')
     
     criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
     atualizado_em = models.DateTimeField(auto_now=True, verbose_name='Atualizado em')
@@ -221,6 +223,101 @@ class AcessoUsuario(models.Model):
         return nivel_atual >= nivel_necessario
 
 
+class UsoMensalLeads(models.Model):
+    """
+    Resumo materializado do consumo de leads por usuário e mês.
+    Somado a cada lote gravado em LancamentoUsoLeads e fechado pela virada de mês
+    (comando virar_mes_leads), que registra o consumo final e o limite do plano.
+    """
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE,
+                                related_name='uso_mensal_leads', verbose_name='Usuário')
+    mes_referencia = models.CharField(max_length=7, verbose_name='Mês referência (YYYY-MM)')
+    nivel = models.CharField(max_length=30, blank=True, verbose_name='Nível de Acesso')
+    leads_limite = models.PositiveIntegerField(default=0, verbose_name='Limite de leads')
+    leads_consumidos = models.PositiveIntegerField(default=0, verbose_name='Leads consumidos')
+    fechado_em = models.DateTimeField(null=True, blank=True, verbose_name='Fechado em')
+
+    class Meta:
+        verbose_name = 'Uso Mensal de Leads'
+        verbose_name_plural = 'Uso Mensal de Leads'
+        ordering = ['-mes_referencia', 'usuario']
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'mes_referencia'], name='uso_mensal_usuario_mes_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['mes_referencia', '-leads_consumidos'], name='uso_mensal_ranking_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario} {self.mes_referencia}: {self.leads_consumidos}/{self.leads_limite}"
+
+
+class LancamentoUsoLeads(models.Model):
+    """
+    Livro de consumo de leads (append-only): um lançamento por lote de leads
+    gravado pelo coletor. Alimenta UsoMensalLeads.
+    """
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE,
+                                related_name='lancamentos_uso_leads', verbose_name='Usuário')
+    coleta = models.ForeignKey('crm.Coleta', on_delete=models.SET_NULL, null=True, blank=True,
+                               related_name='lancamentos_uso', verbose_name='Coleta')
+    mes_referencia = models.CharField(max_length=7, verbose_name='Mês referência (YYYY-MM)')
+    quantidade = models.PositiveIntegerField(verbose_name='Leads')
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
+
+    class Meta:
+        verbose_name = 'Lançamento de Uso de Leads'
+        verbose_name_plural = 'Lançamentos de Uso de Leads'
+        ordering = ['-criado_em']
+        indexes = [
+            models.Index(fields=['usuario', 'mes_referencia'], name='lancamento_uso_usuario_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario} {self.mes_referencia}: +{self.quantidade}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("LancamentoUsoLeads é somente inclusão")
+        super().save(*args, **kwargs)
+
+
+class TransicaoEstado(models.Model):
+    """
+    Log append-only das mudanças de status de Assinatura e AcessoUsuario.
+    Gravado por pagamentos.servicos.estados_assinatura; linhas nunca são alteradas.
+    """
+    ENTIDADE_CHOICES = [
+        ('assinatura', 'Assinatura'),
+        ('acesso', 'Acesso de Usuário'),
+    ]
+
+    entidade = models.CharField(max_length=20, choices=ENTIDADE_CHOICES, verbose_name='Entidade')
+    objeto_id = models.PositiveIntegerField(verbose_name='ID do Objeto')
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='transicoes_estado', verbose_name='Usuário')
+    estado_anterior = models.CharField(max_length=20, blank=True, verbose_name='Estado Anterior')
+    estado_novo = models.CharField(max_length=20, verbose_name='Estado Novo')
+    motivo = models.CharField(max_length=200, blank=True, verbose_name='Motivo')
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
+
+    class Meta:
+        verbose_name = 'Transição de Estado'
+        verbose_name_plural = 'Transições de Estado'
+        ordering = ['-criado_em', '-id']
+        indexes = [
+            models.Index(fields=['entidade', 'objeto_id'], name='transicao_objeto_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entidade} #{self.objeto_id}: {self.estado_anterior or '-'} -> {self.estado_novo}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("TransicaoEstado é append-only.")
+        super().save(*args, **kwargs)
+
+
 class EventoMercadoPago(models.Model):
     """
     Registra eventos do webhook Mercado Pago para implementar idempotência.
@@ -242,6 +339,71 @@ class EventoMercadoPago(models.Model):
         return f"{self.event_id} - {self.tipo}"
 
 
+class ExecucaoReconciliacao(models.Model):
+    """
+    Registro de cada execução do comando reconciliar_pagamentos.
+    O início da última execução concluída (sem dry-run) é a marca d'água do modo incremental.
+    """
+    iniciada_em = models.DateTimeField(verbose_name='Iniciada em')
+    concluida_em = models.DateTimeField(null=True, blank=True, verbose_name='Concluída em')
+    incremental = models.BooleanField(default=False, verbose_name='Incremental')
+    dry_run = models.BooleanField(default=False, verbose_name='Dry-run')
+    verificadas = models.PositiveIntegerField(default=0, verbose_name='Verificadas')
+    alteradas = models.PositiveIntegerField(default=0, verbose_name='Alteradas')
+    erros = models.PositiveIntegerField(default=0, verbose_name='Erros')
+
+    class Meta:
+        verbose_name = 'Execução de Reconciliação'
+        verbose_name_plural = 'Execuções de Reconciliação'
+        ordering = ['-iniciada_em']
+
+    def __str__(self):
+        modo = 'incremental' if self.incremental else 'completa'
+        return f"Reconciliação {modo} em {self.iniciada_em:%d/%m/%Y %H:%M}"
+
+
+class NotificacaoWebhook(models.Model):
+    """
+    Caixa de entrada dos webhooks do Mercado Pago.
+    O webhook apenas grava a notificação bruta e responde 200; o processamento
+    (consulta à API e transições de estado) é feito pelo comando processar_webhooks.
+    """
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('processando', 'Processando'),
+        ('processada', 'Processada'),
+        ('ignorada', 'Ignorada'),
+        ('erro', 'Erro (aguardando nova tentativa)'),
+        ('falhou', 'Falhou (tentativas esgotadas)'),
+    ]
+
+    topico = models.CharField(max_length=100, blank=True, verbose_name='Tópico')
+    recurso_id = models.CharField(max_length=100, blank=True, verbose_name='ID do Recurso')
+    query_string = models.TextField(blank=True, verbose_name='Query String')
+    corpo = models.TextField(blank=True, verbose_name='Corpo da Requisição')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pendente',
+                              verbose_name='Status')
+    tentativas = models.PositiveIntegerField(default=0, verbose_name='Tentativas')
+    proxima_tentativa_em = models.DateTimeField(default=timezone.now,
+                                                verbose_name='Próxima Tentativa em')
+    resultado = models.CharField(max_length=100, blank=True, verbose_name='Resultado')
+    ultimo_erro = models.TextField(blank=True, verbose_name='Último Erro')
+    duracao_ms = models.PositiveIntegerField(null=True, blank=True, verbose_name='Duração (ms)')
+    recebida_em = models.DateTimeField(auto_now_add=True, verbose_name='Recebida em')
+    processada_em = models.DateTimeField(null=True, blank=True, verbose_name='Processada em')
+
+    class Meta:
+        verbose_name = 'Notificação de Webhook'
+        verbose_name_plural = 'Notificações de Webhook'
+        ordering = ['-recebida_em']
+        indexes = [
+            models.Index(fields=['status', 'proxima_tentativa_em'], name='notif_webhook_fila_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.topico or '?'} {self.recurso_id or '?'} ({self.get_status_display()})"
+
+
 class Perfil(models.Model):
     """
     Extensão do modelo de usuário para armazenar dados adicionais.
@@ -0,0 +1,70 @@
+"""
+Catálogo de planos pré-computado.
+
+A página inicial e a página de planos mostram as mesmas ofertas agrupadas por plano,
+que só mudam quando um admin edita uma Oferta. O agrupamento é montado uma vez e
+guardado em cache sob uma versão; salvar/excluir uma Oferta troca a versão
+(ver pagamentos/signals.py), o que invalida o catálogo e as páginas cacheadas com ele.
+
+A versão fica no cache 'catalogo' e o catálogo/páginas no 'default', com a versão na
+chave. Para que a troca valha para todos os workers, 'catalogo' precisa de um backend
+compartilhado (CATALOGO_CACHE_BACKEND em settings); com o locmem padrão ela só vale no
+processo que salvou a Oferta, e os demais servem o catálogo antigo até o
+CATALOGO_PLANOS_TTL expirar.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+
+from ..models import Oferta
+
+CHAVE_VERSAO = 'catalogo_planos:versao'
+ALIAS_CACHE_VERSAO = 'catalogo'
+
+NOMES_PLANOS = {'basico': 'Básico', 'profissional': 'Profissional', 'enterprise': 'Enterprise'}
+
+
+def _ttl():
+    return getattr(settings, 'CATALOGO_PLANOS_TTL', 600)
+
+
+def agrupar_planos(ofertas):
+    """Agrupa ofertas por plano base (basico, profissional, enterprise)."""
+    planos = {}
+    for o in ofertas:
+        base = o.slug_base()
+        if base not in planos:
+            planos[base] = {'nome': NOMES_PLANOS.get(base, base.title()), 'mensal': None, 'anual': None}
+        if o.periodicidade == 'mensal':
+            planos[base]['mensal'] = o
+        else:
+            planos[base]['anual'] = o
+    return list(planos.values())
+
+
+def versao_catalogo():
+    """Versão atual do catálogo; entra nas chaves de cache que dependem das ofertas."""
+    versoes = caches[ALIAS_CACHE_VERSAO]
+    versao = versoes.get(CHAVE_VERSAO)
+    if versao is None:
+        versao = time.time_ns()
+        versoes.add(CHAVE_VERSAO, versao, None)
+        versao = versoes.get(CHAVE_VERSAO, versao)
+    return versao
+
+
+def obter_catalogo_planos():
+    """Retorna a lista de planos agrupados (mensal/anual), consultando o banco só em cache frio."""
+    chave = f'catalogo_planos:{versao_catalogo()}'
+    planos = cache.get(chave)
+    if planos is None:
+        ofertas = Oferta.objects.filter(ativo=True).exclude(slug='ouro').order_by('valor_centavos')
+        planos = agrupar_planos(ofertas)
+        cache.set(chave, planos, _ttl())
+    return planos
+
+
+def invalidar_catalogo_planos():
+    """Troca a versão do catálogo, descartando catálogo e páginas cacheadas."""
+    caches[ALIAS_CACHE_VERSAO].set(CHAVE_VERSAO, time.time_ns(), None)
@@ -0,0 +1,103 @@
+"""
+Links de checkout de assinatura (preapproval) reaproveitados.
+
+Cada clique em "assinar" criava uma Assinatura e fazia um POST síncrono em /preapproval
+antes do redirect. Com CHECKOUT_REUTILIZAR_PREAPPROVAL ativo, um clique repetido do mesmo
+usuário na mesma Oferta reaproveita a Assinatura pendente criada há menos de
+CHECKOUT_VALIDADE_PENDENTE segundos e redireciona direto para o init_point salvo,
+sem chamar o Mercado Pago.
+
+Assinaturas pendentes abandonadas são removidas em lotes por
+`python manage.py limpar_checkouts_pendentes`.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import Assinatura
+from .mercadopago_servico import MercadoPagoServico
+
+logger = logging.getLogger(__name__)
+
+VALIDADE_PENDENTE_PADRAO = 24 * 3600  # 1 dia
+IDADE_ABANDONO_PADRAO = timedelta(days=7)
+TAMANHO_LOTE_LIMPEZA = 500
+
+
+def reutilizacao_ativa():
+    return getattr(settings, 'CHECKOUT_REUTILIZAR_PREAPPROVAL', True)
+
+
+def validade_pendente():
+    return timedelta(seconds=getattr(settings, 'CHECKOUT_VALIDADE_PENDENTE', VALIDADE_PENDENTE_PADRAO))
+
+
+def checkout_pendente_reutilizavel(usuario, oferta):
+    """Assinatura pendente recente do usuário para a oferta, com link já criado (ou None)."""
+    return (
+        Assinatura.objects
+        .filter(
+            usuario=usuario,
+            oferta=oferta,
+            status='pendente',
+            criado_em__gte=timezone.now() - validade_pendente(),
+        )
+        .exclude(mercadopago_init_point='')
+        .order_by('-criado_em')
+        .first()
+    )
+
+
+def obter_link_checkout(usuario, oferta):
+    """
+    Retorna o init_point do checkout de assinatura, reaproveitando um pendente
+    válido quando possível. Só cria Assinatura + preapproval quando necessário.
+    """
+    if reutilizacao_ativa():
+        assinatura = checkout_pendente_reutilizavel(usuario, oferta)
+        if assinatura is not None:
+            logger.info(f"Checkout reaproveitado: Assinatura {assinatura.id}")
+            return assinatura.mercadopago_init_point
+
+    assinatura = Assinatura.objects.create(usuario=usuario, oferta=oferta, status='pendente')
+    preapproval = MercadoPagoServico.criar_preapproval(
+        assinatura=assinatura,
+        oferta=oferta,
+        dominio_base=settings.DOMINIO_BASE,
+    )
+    init_point = preapproval.get('init_point')
+    if not init_point:
+        raise Exception("Mercado Pago não retornou init_point")
+
+    assinatura.mercadopago_preapproval_id = preapproval.get('id', '')
+    assinatura.mercadopago_init_point = init_point
+    assinatura.save(update_fields=['mercadopago_preapproval_id', 'mercadopago_init_point', 'atualizado_em'])
+    logger.info(f"Checkout assinatura criado: Assinatura {assinatura.id}, Preapproval {assinatura.mercadopago_preapproval_id}")
+    return init_point
+
+
+def checkouts_abandonados(idade=IDADE_ABANDONO_PADRAO):
+    """Assinaturas ainda pendentes criadas antes de `idade` e não vinculadas a um acesso."""
+    return Assinatura.objects.filter(
+        status='pendente',
+        criado_em__lt=timezone.now() - idade,
+        acessos_concedidos__isnull=True,
+    )
+
+
+def limpar_checkouts_abandonados(idade=IDADE_ABANDONO_PADRAO, tamanho_lote=TAMANHO_LOTE_LIMPEZA, progresso=None):
+    """
+    Remove as assinaturas pendentes abandonadas em lotes de `tamanho_lote`, para não
+    segurar uma transação longa nem carregar tudo em memória. Retorna o total removido.
+    """
+    total = 0
+    while True:
+        ids = list(checkouts_abandonados(idade).order_by('pk').values_list('pk', flat=True)[:tamanho_lote])
+        if not ids:
+            return total
+        removidas, _ = Assinatura.objects.filter(pk__in=ids, status='pendente').delete()
+        total += removidas
+        if progresso:
+            progresso(total)
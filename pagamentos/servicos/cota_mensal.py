@@ -0,0 +1,131 @@
+"""
+Cota mensal de leads: virada de mês agendada.
+
+A cota era zerada de forma preguiçosa, no caminho quente: cada coleta e cada pagamento
+aprovado gravavam leads_consumidos_mes = 0 quando mes_referencia mudava. Agora a virada
+roda uma vez por mês (`python manage.py virar_mes_leads`, agendado para o dia 1):
+- fecha o resumo do mês em UsoMensalLeads com o consumo e o limite finais;
+- zera todos os AcessoUsuario com um único UPDATE para o novo mes_referencia.
+
+Entre a meia-noite e a execução do comando, as leituras continuam corretas porque
+AcessoUsuario/Direitos tratam um mes_referencia antigo como 0 consumidos. O coletor só
+escreve com registrar_consumo, em lotes: um UPDATE condicional com F() no acesso, um
+lançamento em LancamentoUsoLeads e a soma no resumo UsoMensalLeads do mês, na mesma
+transação. Só força a virada do próprio usuário se ela ainda não tiver rodado.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..direitos import invalidar_direitos, invalidar_direitos_em_lote
+from ..models import AcessoUsuario, LancamentoUsoLeads, UsoMensalLeads
+
+TAMANHO_LOTE_HISTORICO = 1000
+
+
+def mes_atual():
+    return timezone.now().strftime('%Y-%m')
+
+
+def acessos_a_virar(mes=None):
+    """Acessos com mes_referencia anterior a `mes` (YYYY-MM compara como texto)."""
+    return AcessoUsuario.objects.filter(mes_referencia__lt=mes or mes_atual())
+
+
+def virar_mes(mes=None, usuario_ids=None, tamanho_lote=TAMANHO_LOTE_HISTORICO):
+    """
+    Fecha o mês anterior de cada acesso pendente e o zera para `mes` (padrão: mês atual).
+    Idempotente: rodar de novo no mesmo mês não altera nada, e acessos já em um mês
+    posterior a `mes` nunca voltam. Retorna quantos acessos viraram.
+    """
+    mes = mes or mes_atual()
+    qs = acessos_a_virar(mes)
+    if usuario_ids is not None:
+        qs = qs.filter(usuario_id__in=usuario_ids)
+
+    with transaction.atomic():
+        linhas = list(
+            qs.select_for_update()
+            .values_list('usuario_id', 'mes_referencia', 'nivel', 'leads_limite_mensal', 'leads_consumidos_mes')
+        )
+        if not linhas:
+            return 0
+
+        agora = timezone.now()
+        fechamentos = [
+            UsoMensalLeads(
+                usuario_id=usuario_id,
+                mes_referencia=mes_referencia,
+                nivel=nivel,
+                leads_limite=limite,
+                leads_consumidos=consumidos,
+                fechado_em=agora,
+            )
+            for usuario_id, mes_referencia, nivel, limite, consumidos in linhas
+            if mes_referencia
+        ]
+        # O resumo do mês pode já existir (somado pelos lançamentos): fecha com os valores do acesso
+        UsoMensalLeads.objects.bulk_create(
+            fechamentos,
+            batch_size=tamanho_lote,
+            update_conflicts=True,
+            unique_fields=['usuario', 'mes_referencia'],
+            update_fields=['nivel', 'leads_limite', 'leads_consumidos', 'fechado_em'],
+        )
+
+        usuarios = [usuario_id for usuario_id, *_ in linhas]
+        AcessoUsuario.objects.filter(usuario_id__in=usuarios, mes_referencia__lt=mes).update(
+            leads_consumidos_mes=0, mes_referencia=mes, atualizado_em=agora,
+        )
+        # UPDATE não dispara post_save: invalida os direitos explicitamente
+        invalidar_direitos_em_lote(usuarios)
+    return len(linhas)
+
+
+def leads_consumidos(acesso, mes=None):
+    """Consumo do acesso no mês (0 se a virada ainda não rodou para ele). Sem escrita."""
+    if acesso.mes_referencia != (mes or mes_atual()):
+        return 0
+    return acesso.leads_consumidos_mes
+
+
+def _somar_resumo(acesso, mes, quantidade):
+    filtro = UsoMensalLeads.objects.filter(usuario_id=acesso.usuario_id, mes_referencia=mes)
+    if filtro.update(leads_consumidos=F('leads_consumidos') + quantidade):
+        return
+    # Primeiro lançamento do mês: parte do consumo que o acesso já tinha antes do livro
+    UsoMensalLeads.objects.bulk_create([
+        UsoMensalLeads(usuario_id=acesso.usuario_id, mes_referencia=mes, nivel=acesso.nivel,
+                       leads_limite=acesso.leads_limite_mensal or 0,
+                       leads_consumidos=max(0, acesso.leads_consumidos_mes - quantidade)),
+    ], ignore_conflicts=True)
+    filtro.update(leads_consumidos=F('leads_consumidos') + quantidade)
+
+
+def registrar_consumo(acesso, quantidade=1, coleta=None):
+    """
+    Soma `quantidade` ao consumo do mês atual com um UPDATE condicional (F()), seguro
+    entre coletas concorrentes, e grava o lançamento e o resumo mensal. Se o acesso ainda
+    está no mês anterior, faz a virada só desse usuário antes. Retorna o consumo atualizado.
+    """
+    if quantidade <= 0:
+        return leads_consumidos(acesso)
+
+    mes = mes_atual()
+    with transaction.atomic():
+        for _ in range(2):
+            atualizadas = AcessoUsuario.objects.filter(pk=acesso.pk, mes_referencia=mes).update(
+                leads_consumidos_mes=F('leads_consumidos_mes') + quantidade,
+            )
+            if atualizadas:
+                break
+            virar_mes(mes, usuario_ids=[acesso.usuario_id])
+        acesso.refresh_from_db(fields=['leads_consumidos_mes', 'mes_referencia'])
+
+        LancamentoUsoLeads.objects.create(
+            usuario_id=acesso.usuario_id, coleta=coleta, mes_referencia=mes, quantidade=quantidade,
+        )
+        _somar_resumo(acesso, mes, quantidade)
+
+    invalidar_direitos(acesso.usuario_id)
+    return acesso.leads_consumidos_mes
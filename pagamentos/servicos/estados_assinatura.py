@@ -0,0 +1,162 @@
+"""
+Máquina de estados de Assinatura e AcessoUsuario.
+
+Toda mudança de status passa por aqui:
+- transicionar(objeto, novo_status): valida contra o mapa de transições, grava só
+  status/atualizado_em (update_fields) e registra uma linha em TransicaoEstado;
+- transicionar_em_lote(queryset, novo_status): um único UPDATE para todas as linhas
+  cujo status atual permite a transição, com o log gravado via bulk_create;
+- conceder_acesso: concessão de plano, também com update_fields.
+
+A cota mensal de leads é zerada pela virada de mês agendada (ver cota_mensal.py).
+
+Status iguais ao atual são no-op (nada é gravado nem registrado).
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from ..direitos import invalidar_direitos
+from ..models import AcessoUsuario, Assinatura, TransicaoEstado
+from .cota_mensal import mes_atual
+
+# status atual -> status permitidos
+TRANSICOES_ASSINATURA = {
+    'pendente': {'pending', 'authorized', 'paused', 'cancelled'},
+    'pending': {'authorized', 'paused', 'cancelled'},
+    'authorized': {'pending', 'paused', 'cancelled'},  # pending: nova tentativa de cobrança
+    'paused': {'authorized', 'pending', 'cancelled'},
+    'cancelled': {'authorized'},  # reativação confirmada pelo Mercado Pago
+}
+
+TRANSICOES_ACESSO = {
+    'ativo': {'suspenso', 'revogado'},
+    'suspenso': {'ativo', 'revogado'},
+    'revogado': {'ativo'},  # nova compra/assinatura
+}
+
+_MAQUINAS = {
+    Assinatura: ('assinatura', TRANSICOES_ASSINATURA),
+    AcessoUsuario: ('acesso', TRANSICOES_ACESSO),
+}
+
+
+class TransicaoInvalida(Exception):
+    """Mudança de status não permitida pelo mapa de transições."""
+
+
+def pode_transicionar(modelo, estado_atual, estado_novo):
+    _, mapa = _MAQUINAS[modelo]
+    return estado_atual == estado_novo or estado_novo in mapa.get(estado_atual, ())
+
+
+def _validar(modelo, estado_atual, estado_novo):
+    if not pode_transicionar(modelo, estado_atual, estado_novo):
+        raise TransicaoInvalida(f"{modelo.__name__}: {estado_atual} -> {estado_novo} não é permitido")
+
+
+def _transicao(entidade, objeto_id, usuario_id, estado_anterior, estado_novo, motivo):
+    return TransicaoEstado(
+        entidade=entidade,
+        objeto_id=objeto_id,
+        usuario_id=usuario_id,
+        estado_anterior=estado_anterior,
+        estado_novo=estado_novo,
+        motivo=motivo[:200],
+    )
+
+
+def transicionar(objeto, novo_status, motivo=''):
+    """
+    Muda o status de uma Assinatura ou AcessoUsuario. Retorna True se houve mudança.
+    Levanta TransicaoInvalida se o mapa não permite a transição.
+    """
+    modelo = type(objeto)
+    entidade, _ = _MAQUINAS[modelo]
+    anterior = objeto.status
+    if anterior == novo_status:
+        return False
+    _validar(modelo, anterior, novo_status)
+
+    with transaction.atomic():
+        objeto.status = novo_status
+        objeto.save(update_fields=['status', 'atualizado_em'])
+        _transicao(entidade, objeto.pk, objeto.usuario_id, anterior, novo_status, motivo).save()
+    return True
+
+
+def registrar_transicao(objeto, estado_anterior, motivo=''):
+    """Registra no log uma mudança de status já gravada por fora (ex.: edição no admin)."""
+    entidade, _ = _MAQUINAS[type(objeto)]
+    _transicao(entidade, objeto.pk, objeto.usuario_id, estado_anterior, objeto.status, motivo).save()
+
+
+def transicionar_em_lote(queryset, novo_status, motivo=''):
+    """
+    Aplica a transição a todas as linhas do queryset cujo status atual a permite,
+    com um único UPDATE. Linhas em outros status são ignoradas. Retorna quantas mudaram.
+    """
+    modelo = queryset.model
+    entidade, mapa = _MAQUINAS[modelo]
+    origens = [estado for estado, destinos in mapa.items() if novo_status in destinos]
+
+    with transaction.atomic():
+        linhas = list(
+            queryset.filter(status__in=origens)
+            .select_for_update()
+            .values_list('pk', 'status', 'usuario_id')
+        )
+        if not linhas:
+            return 0
+        modelo.objects.filter(pk__in=[pk for pk, _, _ in linhas]).update(
+            status=novo_status, atualizado_em=timezone.now(),
+        )
+        TransicaoEstado.objects.bulk_create([
+            _transicao(entidade, pk, usuario_id, anterior, novo_status, motivo)
+            for pk, anterior, usuario_id in linhas
+        ])
+        # UPDATE não dispara post_save: invalida os direitos explicitamente
+        for usuario_id in {usuario_id for _, _, usuario_id in linhas}:
+            invalidar_direitos(usuario_id)
+    return len(linhas)
+
+
+def suspender_inadimplentes(motivo='assinatura pausada ou cancelada'):
+    """Suspende, em um UPDATE, os acessos ativos cuja assinatura está pausada ou cancelada."""
+    return transicionar_em_lote(
+        AcessoUsuario.objects.filter(ultima_assinatura__status__in=('paused', 'cancelled')),
+        'suspenso',
+        motivo,
+    )
+
+
+def conceder_acesso(usuario, oferta, compra=None, assinatura=None, motivo=''):
+    """
+    Cria ou atualiza o AcessoUsuario do usuário para o plano da oferta, vinculando a
+    compra (fluxo legado) ou a assinatura. Registra a transição quando o acesso é
+    criado ou volta a ficar ativo. O consumo do mês só é zerado na criação: renovações
+    e reautorizações mantêm o uso, que a virada de mês (cota_mensal) fecha e zera.
+    """
+    valores = {
+        'nivel': oferta.slug_base(),
+        'status': 'ativo',
+        'leads_limite_mensal': oferta.leads_mensais or 0,
+        'ultima_compra': compra,
+        'ultima_assinatura': assinatura,
+    }
+    with transaction.atomic():
+        acesso, criado = AcessoUsuario.objects.get_or_create(
+            usuario=usuario, defaults={**valores, 'leads_consumidos_mes': 0, 'mes_referencia': mes_atual()},
+        )
+        if criado:
+            _transicao('acesso', acesso.pk, usuario.pk, '', 'ativo', motivo).save()
+            return acesso
+
+        anterior = acesso.status
+        _validar(AcessoUsuario, anterior, 'ativo')
+        for campo, valor in valores.items():
+            setattr(acesso, campo, valor)
+        acesso.save(update_fields=[*valores, 'atualizado_em'])
+        if anterior != 'ativo':
+            _transicao('acesso', acesso.pk, usuario.pk, anterior, 'ativo', motivo).save()
+    return acesso
+
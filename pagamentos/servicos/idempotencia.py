@@ -0,0 +1,85 @@
+"""
+Idempotência dos eventos do Mercado Pago.
+
+Em vez de exists() seguido de create()/get_or_create() (duas entregas simultâneas
+passam juntas pela verificação), o evento é reivindicado com um único INSERT que
+depende da constraint unique de EventoMercadoPago.event_id. A reivindicação deve
+acontecer dentro da mesma transação da mudança de estado: se a transição falhar,
+o INSERT é desfeito junto e o evento pode ser reprocessado.
+
+Antes do banco há um filtro em memória com os IDs confirmados recentemente, que
+descarta reentregas repetidas sem nenhuma consulta. Ele é só um atalho por
+processo: a garantia continua sendo a constraint unique.
+"""
+import json
+import threading
+from collections import OrderedDict
+
+from django.db import IntegrityError, transaction
+
+from ..models import EventoMercadoPago
+
+CAPACIDADE_FILTRO_PADRAO = 10000
+
+
+class FiltroIdsRecentes:
+    """Conjunto LRU limitado e thread-safe de event_ids já processados."""
+
+    def __init__(self, capacidade=CAPACIDADE_FILTRO_PADRAO):
+        self.capacidade = capacidade
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, event_id):
+        with self._lock:
+            if event_id in self._ids:
+                self._ids.move_to_end(event_id)
+                return True
+            return False
+
+    def __len__(self):
+        return len(self._ids)
+
+    def adicionar(self, event_id):
+        with self._lock:
+            self._ids[event_id] = None
+            self._ids.move_to_end(event_id)
+            while len(self._ids) > self.capacidade:
+                self._ids.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._ids.clear()
+
+
+ids_recentes = FiltroIdsRecentes()
+
+
+def ja_processado_recentemente(event_id):
+    """Verificação sem banco; False não garante que o evento seja novo."""
+    return event_id in ids_recentes
+
+
+def reivindicar_evento(event_id, tipo, dados):
+    """
+    Tenta registrar o evento com um único INSERT. Retorna True se esta chamada
+    ficou com o evento, False se ele já existia (entrega duplicada).
+
+    Deve ser chamada dentro de transaction.atomic(), antes da mudança de estado.
+    O ID só entra no filtro em memória depois do commit.
+    """
+    if event_id in ids_recentes:
+        return False
+    try:
+        # Savepoint: a violação de unique não invalida a transação externa
+        with transaction.atomic():
+            EventoMercadoPago.objects.create(
+                event_id=event_id,
+                tipo=tipo,
+                dados_json=json.dumps(dados),
+            )
+    except IntegrityError:
+        ids_recentes.adicionar(event_id)
+        return False
+    transaction.on_commit(lambda: ids_recentes.adicionar(event_id))
+    return True
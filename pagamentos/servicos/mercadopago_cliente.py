@@ -0,0 +1,159 @@
+"""
+Clientes HTTP do Mercado Pago compartilhados por processo.
+
+O HttpClient padrão do SDK cria um requests.Session novo a cada chamada, e as rotas
+de preapproval usavam requests.get/post soltos: cada checkout e cada webhook pagava
+DNS + TCP + TLS de novo. Aqui existe uma única Session por processo (pool de conexões
+keep-alive do urllib3, seguro entre threads), usada tanto pelo SDK quanto pelas
+chamadas diretas à API de preapproval, com timeouts separados de conexão e leitura.
+
+Cada chamada alimenta o histograma 'mercadopago_http_ms' (web.metricas) por endpoint
+normalizado (ex.: 'GET /v1/payments/{id}') em duas fases:
+- 'cabecalhos': até a resposta chegar (conexão + envio + espera do servidor);
+- 'total': incluindo a leitura do corpo.
+A chamada também entra na medição da requisição corrente (web.instrumentacao.chamada_externa).
+
+Com settings.MERCADOPAGO_API_URL, as chamadas para https://api.mercadopago.com (do SDK
+e diretas) vão para outra base, ex.: o servidor stub local de web.servidores_stub.
+"""
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+import mercadopago
+import requests
+from django.conf import settings
+from mercadopago.config.defaults import DEFAULT_MAX_RETRIES, DEFAULT_RETRY_ON
+from mercadopago.errors.exceptions import MPServerError
+from mercadopago.http.http_client import HttpClient
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+from web.instrumentacao import chamada_externa
+from web.metricas import histogramas
+
+METRICA_HTTP = 'mercadopago_http_ms'
+API_URL_PADRAO = 'https://api.mercadopago.com'
+
+TIMEOUT_CONEXAO_PADRAO = 3.05
+TIMEOUT_LEITURA_PADRAO = 20
+TAMANHO_POOL_PADRAO = 10
+
+_SEGMENTO_VARIAVEL = re.compile(r'\d')
+_VERSAO_API = re.compile(r'^v\d+$')
+
+_lock = threading.Lock()
+_sessao = None
+_sdks = {}
+
+
+def timeouts():
+    """Tupla (conexão, leitura) em segundos, configurável via settings."""
+    return (
+        getattr(settings, 'MERCADOPAGO_TIMEOUT_CONEXAO', TIMEOUT_CONEXAO_PADRAO),
+        getattr(settings, 'MERCADOPAGO_TIMEOUT_LEITURA', TIMEOUT_LEITURA_PADRAO),
+    )
+
+
+def _nova_sessao():
+    sessao = requests.Session()
+    tamanho_pool = getattr(settings, 'MERCADOPAGO_POOL_CONEXOES', TAMANHO_POOL_PADRAO)
+    adaptador = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=tamanho_pool,
+        # Mesma política de retry do SDK: só erros transitórios do servidor, e o
+        # urllib3 não repete POST (evita criar preapproval/preferência em dobro)
+        max_retries=Retry(total=DEFAULT_MAX_RETRIES, status_forcelist=DEFAULT_RETRY_ON,
+                          raise_on_status=False),
+    )
+    sessao.mount('https://', adaptador)
+    sessao.mount('http://', adaptador)  # servidor stub local
+    return sessao
+
+
+def obter_sessao():
+    """requests.Session única do processo para a API do Mercado Pago."""
+    global _sessao
+    if _sessao is None:
+        with _lock:
+            if _sessao is None:
+                _sessao = _nova_sessao()
+    return _sessao
+
+
+def url_api(url):
+    """Troca a base https://api.mercadopago.com por settings.MERCADOPAGO_API_URL, se configurada."""
+    base = (getattr(settings, 'MERCADOPAGO_API_URL', '') or API_URL_PADRAO).rstrip('/')
+    if base != API_URL_PADRAO and url.startswith(API_URL_PADRAO):
+        return base + url[len(API_URL_PADRAO):]
+    return url
+
+
+def endpoint_normalizado(metodo, url):
+    """'GET https://api.mercadopago.com/v1/payments/123' -> 'GET /v1/payments/{id}'."""
+    segmentos = [
+        '{id}' if _SEGMENTO_VARIAVEL.search(s) and not _VERSAO_API.match(s) else s
+        for s in urlsplit(url).path.split('/')
+    ]
+    return f"{metodo.upper()} {'/'.join(segmentos)}"
+
+
+def requisitar(metodo, url, **kwargs):
+    """
+    Executa uma chamada HTTP pela sessão compartilhada, com os timeouts configurados,
+    e registra a latência por endpoint. Retorna o requests.Response (corpo já lido).
+    """
+    kwargs.setdefault('timeout', timeouts())
+    url = url_api(url)
+    endpoint = endpoint_normalizado(metodo, url)
+    inicio = time.perf_counter()
+    try:
+        with chamada_externa(urlsplit(url).hostname):
+            response = obter_sessao().request(metodo, url, **kwargs)
+            response.content  # lê o corpo dentro da medição
+    except requests.RequestException:
+        histogramas.observar(METRICA_HTTP, (time.perf_counter() - inicio) * 1000,
+                             {'endpoint': endpoint, 'fase': 'erro'})
+        raise
+    total_ms = (time.perf_counter() - inicio) * 1000
+    histogramas.observar(METRICA_HTTP, response.elapsed.total_seconds() * 1000,
+                         {'endpoint': endpoint, 'fase': 'cabecalhos'})
+    histogramas.observar(METRICA_HTTP, total_ms, {'endpoint': endpoint, 'fase': 'total'})
+    return response
+
+
+class HttpClientCompartilhado(HttpClient):
+    """HttpClient do SDK que usa a sessão do processo em vez de uma Session por chamada."""
+
+    def request(self, method, url, maxretries=None, retry_on=None, backoff_factor=None, **kwargs):
+        # O timeout único do SDK (60 s) é substituído por (conexão, leitura)
+        kwargs['timeout'] = timeouts()
+        api_result = requisitar(method, url, **kwargs)
+        response = {"status": api_result.status_code, "response": None}
+        if api_result.status_code != 204 and api_result.content:
+            try:
+                response["response"] = api_result.json()
+            except ValueError as exc:
+                raise MPServerError(
+                    api_result.status_code,
+                    {"message": "Invalid JSON in response body", "error": "invalid_response"},
+                ) from exc
+        return response
+
+
+def obter_sdk():
+    """mercadopago.SDK único por access token, reaproveitado entre requisições e threads."""
+    token = settings.MERCADOPAGO_ACCESS_TOKEN
+    sdk = _sdks.get(token)
+    if sdk is None:
+        with _lock:
+            sdk = _sdks.get(token)
+            if sdk is None:
+                sdk = _sdks[token] = mercadopago.SDK(token, http_client=HttpClientCompartilhado())
+    return sdk
+
+
+def metricas_http():
+    """Séries de latência do Mercado Pago: [(rotulos, snapshot), ...]."""
+    return [(rotulos, snapshot) for _, rotulos, snapshot in histogramas.series(METRICA_HTTP)]
@@ -1,11 +1,11 @@
-import mercadopago
-import requests
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
 import logging
 import json
 
+from .mercadopago_cliente import obter_sdk, requisitar
+
 logger = logging.getLogger(__name__)
 
 MP_PREAPPROVAL_URL = 'https://api.mercadopago.com/preapproval'
@@ -18,7 +18,8 @@ class MercadoPagoServico:
     
     @staticmethod
     def _get_sdk():
-        return mercadopago.SDK(settings.MERCADOPAGO_ACCESS_TOKEN)
+        # SDK compartilhado pelo processo (sessão HTTP persistente, ver mercadopago_cliente)
+        return obter_sdk()
     
     @staticmethod
     def criar_preferencia(compra, oferta, dominio_base):
@@ -108,7 +109,7 @@ class MercadoPagoServico:
             "Content-Type": "application/json",
         }
         
-        response = requests.post(MP_PREAPPROVAL_URL, json=payload, headers=headers, timeout=30)
+        response = requisitar('POST', MP_PREAPPROVAL_URL, json=payload, headers=headers)
         
         if response.status_code in (200, 201):
             data = response.json()
@@ -124,7 +125,33 @@ class MercadoPagoServico:
         token = settings.MERCADOPAGO_ACCESS_TOKEN
         url = f"{MP_PREAPPROVAL_URL}/{preapproval_id}"
         headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(url, headers=headers, timeout=30)
+        response = requisitar('GET', url, headers=headers)
         if response.status_code == 200:
             return response.json()
         return None
+
+    @staticmethod
+    def buscar_preapprovals(filtros, offset=0, limit=50):
+        """
+        Uma página de /preapproval/search.
+        Retorna {'results': [...], 'paging': {'total', 'offset', 'limit'}}.
+        """
+        token = settings.MERCADOPAGO_ACCESS_TOKEN
+        headers = {"Authorization": f"Bearer {token}"}
+        params = {**filtros, "offset": offset, "limit": limit}
+        response = requisitar('GET', f"{MP_PREAPPROVAL_URL}/search", params=params, headers=headers)
+        if response.status_code != 200:
+            raise Exception(f"Erro ao buscar preapprovals MP. Status: {response.status_code}")
+        return response.json()
+
+    @staticmethod
+    def buscar_pagamentos(filtros, offset=0, limit=50):
+        """
+        Uma página de /v1/payments/search.
+        Retorna {'results': [...], 'paging': {'total', 'offset', 'limit'}}.
+        """
+        sdk = MercadoPagoServico._get_sdk()
+        resposta = sdk.payment().search({**filtros, "offset": offset, "limit": limit})
+        if resposta.get("status") != 200:
+            raise Exception(f"Erro ao buscar pagamentos MP. Status: {resposta.get('status')}")
+        return resposta["response"]
@@ -0,0 +1,59 @@
+"""
+Stub local das buscas do Mercado Pago, com a mesma interface de MercadoPagoServico
+(buscar_preapprovals / buscar_pagamentos). Usado nos testes e em
+`reconciliar_pagamentos --stub arquivo.json` para rodar a reconciliação sem rede.
+
+Formato do JSON:
+    {"preapprovals": [{"id": "...", "external_reference": "ass_1", "status": "authorized",
+                       "last_modified": "2026-01-01T00:00:00Z"}],
+     "pagamentos":   [{"id": 1, "external_reference": "7", "status": "approved",
+                       "date_last_updated": "2026-01-01T00:00:00Z"}]}
+"""
+import json
+import threading
+
+from django.utils.dateparse import parse_datetime
+
+
+def _data(valor):
+    return parse_datetime(valor) if isinstance(valor, str) else valor
+
+
+class MercadoPagoStub:
+    def __init__(self, preapprovals=None, pagamentos=None):
+        self.preapprovals = list(preapprovals or [])
+        self.pagamentos = list(pagamentos or [])
+        self.chamadas = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def de_arquivo(cls, caminho):
+        with open(caminho, encoding='utf-8') as f:
+            dados = json.load(f)
+        return cls(dados.get('preapprovals'), dados.get('pagamentos'))
+
+    def _pagina(self, itens, offset, limit):
+        with self._lock:
+            self.chamadas += 1
+        return {
+            'results': itens[offset:offset + limit],
+            'paging': {'total': len(itens), 'offset': offset, 'limit': limit},
+        }
+
+    def buscar_preapprovals(self, filtros, offset=0, limit=50):
+        itens = self.preapprovals
+        if 'external_reference' in filtros:
+            itens = [i for i in itens if i.get('external_reference') == filtros['external_reference']]
+        if filtros.get('sort') == 'last_modified':
+            itens = sorted(itens, key=lambda i: _data(i['last_modified']),
+                           reverse=filtros.get('criteria') == 'desc')
+        return self._pagina(itens, offset, limit)
+
+    def buscar_pagamentos(self, filtros, offset=0, limit=50):
+        itens = self.pagamentos
+        if 'external_reference' in filtros:
+            itens = [i for i in itens if i.get('external_reference') == filtros['external_reference']]
+        if filtros.get('range') == 'date_last_updated':
+            inicio = _data(filtros['begin_date'])
+            itens = [i for i in itens if _data(i['date_last_updated']) >= inicio]
+        return self._pagina(itens, offset, limit)
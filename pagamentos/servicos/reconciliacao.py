@@ -0,0 +1,239 @@
+"""
+Reconciliação de Assinatura e Compra com o estado do Mercado Pago.
+
+Se um webhook se perde, o status local fica divergente e nada o corrige. Aqui:
+1. carregamos as linhas não finais (Assinatura != cancelled, Compra pendente);
+2. buscamos o estado remoto pelas rotas de search do Mercado Pago, paginadas:
+   - modo completo: uma busca por external_reference, com no máximo `concorrencia`
+     requisições simultâneas;
+   - modo incremental: uma varredura do que mudou desde a marca d'água (início da
+     última execução concluída), sem uma requisição por linha;
+3. calculamos as divergências e aplicamos em lote: transições que concedem acesso
+   passam por finalizar_assinatura/finalizar_compra (só preapproval 'authorized' e
+   pagamento aprovado); as demais viram um UPDATE por
+   status de destino (transicionar_em_lote para Assinatura), seguido da invalidação
+   do cache de direitos.
+   Uma assinatura 'pendente' com preapproval 'pending' não é divergência: o
+   preapproval fica 'pending' até o pagador concluir o checkout, e a varredura não
+   pode conceder acesso a checkouts abandonados (limpar_checkouts_abandonados os
+   remove).
+
+O cliente é qualquer objeto com buscar_preapprovals/buscar_pagamentos
+(MercadoPagoServico em produção, MercadoPagoStub nos testes).
+"""
+import logging
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..direitos import invalidar_direitos
+from ..models import Assinatura, Compra, ExecucaoReconciliacao
+from .estados_assinatura import transicionar_em_lote
+from .mercadopago_servico import MercadoPagoServico
+
+logger = logging.getLogger(__name__)
+
+CONCORRENCIA_PADRAO = 4
+TAMANHO_PAGINA_PADRAO = 50
+
+STATUS_PREAPPROVAL = {'authorized', 'pending', 'paused', 'cancelled'}
+STATUS_PAGAMENTO_PARA_COMPRA = {
+    'approved': 'paga',
+    'rejected': 'cancelada',
+    'cancelled': 'cancelada',
+    'refunded': 'cancelada',
+    'charged_back': 'cancelada',
+}
+
+Divergencia = namedtuple('Divergencia', 'objeto status_atual status_remoto remoto')
+
+# (status local, status remoto) de Assinatura que não são divergência
+EQUIVALENTES_ASSINATURA = {('pendente', 'pending')}
+
+
+def _concede_acesso(divergencia):
+    if isinstance(divergencia.objeto, Compra):
+        return divergencia.status_remoto == 'paga'
+    return divergencia.status_remoto == 'authorized'
+
+
+class ResultadoReconciliacao:
+    def __init__(self, execucao):
+        self.execucao = execucao
+        self.divergencias = []
+        self.erros = []
+
+    @property
+    def verificadas(self):
+        return self.execucao.verificadas
+
+
+def iterar_paginas(buscar, filtros, tamanho_pagina=TAMANHO_PAGINA_PADRAO):
+    """Percorre todas as páginas de uma busca do Mercado Pago."""
+    offset = 0
+    while True:
+        pagina = buscar(filtros, offset=offset, limit=tamanho_pagina)
+        resultados = pagina.get('results') or []
+        yield from resultados
+        offset += len(resultados)
+        if not resultados or offset >= (pagina.get('paging') or {}).get('total', 0):
+            return
+
+
+def _data(item, campo):
+    valor = item.get(campo)
+    return (parse_datetime(valor) if isinstance(valor, str) else valor) or timezone.now()
+
+
+def _por_referencia_concorrente(buscar, referencias, campo_data, concorrencia, tamanho_pagina, erros):
+    """Modo completo: busca cada external_reference, `concorrencia` por vez."""
+    def buscar_uma(referencia):
+        try:
+            itens = list(iterar_paginas(buscar, {'external_reference': referencia}, tamanho_pagina))
+        except Exception as e:
+            return referencia, None, e
+        return referencia, max(itens, key=lambda i: _data(i, campo_data), default=None), None
+
+    estado = {}
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        for referencia, item, erro in executor.map(buscar_uma, referencias):
+            if erro is not None:
+                erros.append(f"{referencia}: {erro}")
+            elif item is not None:
+                estado[referencia] = item
+    return estado
+
+
+def _preapprovals_desde(cliente, referencias, marca, tamanho_pagina):
+    """Modo incremental: preapprovals ordenados do mais recente, até passar da marca."""
+    estado = {}
+    filtros = {'sort': 'last_modified', 'criteria': 'desc'}
+    for item in iterar_paginas(cliente.buscar_preapprovals, filtros, tamanho_pagina):
+        if _data(item, 'last_modified') < marca:
+            break
+        referencia = item.get('external_reference')
+        if referencia in referencias:
+            estado.setdefault(referencia, item)
+    return estado
+
+
+def _pagamentos_desde(cliente, referencias, marca, tamanho_pagina):
+    """Modo incremental: pagamentos atualizados desde a marca."""
+    estado = {}
+    filtros = {'range': 'date_last_updated', 'begin_date': marca.isoformat(), 'end_date': 'NOW'}
+    for item in iterar_paginas(cliente.buscar_pagamentos, filtros, tamanho_pagina):
+        referencia = item.get('external_reference')
+        if referencia in referencias:
+            atual = estado.get(referencia)
+            if atual is None or _data(item, 'date_last_updated') > _data(atual, 'date_last_updated'):
+                estado[referencia] = item
+    return estado
+
+
+def marca_dagua():
+    """Início da última reconciliação concluída sem erros e sem dry-run (None se nunca houve)."""
+    return (
+        ExecucaoReconciliacao.objects
+        .filter(concluida_em__isnull=False, dry_run=False, erros=0)
+        .order_by('-iniciada_em')
+        .values_list('iniciada_em', flat=True)
+        .first()
+    )
+
+
+def calcular_divergencias(assinaturas, compras, preapprovals, pagamentos):
+    divergencias = []
+    for assinatura in assinaturas:
+        remoto = preapprovals.get(f"ass_{assinatura.id}")
+        status_remoto = (remoto or {}).get('status')
+        if (status_remoto in STATUS_PREAPPROVAL and status_remoto != assinatura.status
+                and (assinatura.status, status_remoto) not in EQUIVALENTES_ASSINATURA):
+            divergencias.append(Divergencia(assinatura, assinatura.status, status_remoto, remoto))
+    for compra in compras:
+        remoto = pagamentos.get(str(compra.id))
+        novo_status = STATUS_PAGAMENTO_PARA_COMPRA.get((remoto or {}).get('status'))
+        if novo_status and novo_status != compra.status:
+            divergencias.append(Divergencia(compra, compra.status, novo_status, remoto))
+    return divergencias
+
+
+def aplicar_divergencias(divergencias):
+    """
+    Concessões de acesso passam pelas funções do fluxo normal; as demais mudanças
+    são um UPDATE por (modelo, status) e invalidam os direitos dos usuários afetados.
+    """
+    from ..views import finalizar_assinatura, finalizar_compra
+
+    em_lote = defaultdict(list)
+    for d in divergencias:
+        if not _concede_acesso(d):
+            em_lote[(type(d.objeto), d.status_remoto)].append(d.objeto)
+        elif isinstance(d.objeto, Assinatura):
+            finalizar_assinatura(d.objeto)
+        else:
+            finalizar_compra(d.objeto, str(d.remoto.get('id', '')))
+
+    agora = timezone.now()
+    with transaction.atomic():
+        for (modelo, status), objetos in em_lote.items():
+            pks = [o.pk for o in objetos]
+            if modelo is Assinatura:
+                transicionar_em_lote(Assinatura.objects.filter(pk__in=pks), status, motivo='reconciliação')
+                continue
+            modelo.objects.filter(pk__in=pks).update(status=status, atualizado_em=agora)
+            for usuario_id in {o.usuario_id for o in objetos}:
+                invalidar_direitos(usuario_id)
+
+
+def reconciliar(cliente=MercadoPagoServico, dry_run=False, incremental=False,
+                concorrencia=CONCORRENCIA_PADRAO, tamanho_pagina=TAMANHO_PAGINA_PADRAO):
+    """Executa uma reconciliação completa ou incremental. Retorna ResultadoReconciliacao."""
+    marca = marca_dagua() if incremental else None
+    execucao = ExecucaoReconciliacao.objects.create(
+        iniciada_em=timezone.now(), incremental=marca is not None, dry_run=dry_run,
+    )
+    resultado = ResultadoReconciliacao(execucao)
+
+    assinaturas = list(Assinatura.objects.exclude(status='cancelled').select_related('usuario', 'oferta'))
+    compras = list(Compra.objects.filter(status='pendente').select_related('usuario', 'oferta'))
+    refs_assinaturas = {f"ass_{a.id}" for a in assinaturas}
+    refs_compras = {str(c.id) for c in compras}
+
+    try:
+        if marca is not None:
+            preapprovals = _preapprovals_desde(cliente, refs_assinaturas, marca, tamanho_pagina)
+            pagamentos = _pagamentos_desde(cliente, refs_compras, marca, tamanho_pagina)
+        else:
+            preapprovals = _por_referencia_concorrente(
+                cliente.buscar_preapprovals, sorted(refs_assinaturas), 'last_modified',
+                concorrencia, tamanho_pagina, resultado.erros,
+            )
+            pagamentos = _por_referencia_concorrente(
+                cliente.buscar_pagamentos, sorted(refs_compras), 'date_last_updated',
+                concorrencia, tamanho_pagina, resultado.erros,
+            )
+    except Exception as e:
+        # Falha na varredura incremental: não avança a marca d'água
+        resultado.erros.append(str(e))
+        execucao.erros = len(resultado.erros)
+        execucao.save(update_fields=['erros'])
+        logger.error(f"Reconciliação interrompida: {e}")
+        return resultado
+
+    resultado.divergencias = calcular_divergencias(assinaturas, compras, preapprovals, pagamentos)
+    if not dry_run:
+        aplicar_divergencias(resultado.divergencias)
+
+    execucao.verificadas = len(assinaturas) + len(compras)
+    execucao.alteradas = len(resultado.divergencias)
+    execucao.erros = len(resultado.erros)
+    execucao.concluida_em = timezone.now()
+    execucao.save()
+    logger.info(
+        f"Reconciliação concluída: {execucao.verificadas} verificadas, "
+        f"{execucao.alteradas} divergências, {execucao.erros} erros"
+    )
+    return resultado
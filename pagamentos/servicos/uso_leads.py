@@ -0,0 +1,71 @@
+"""
+Consultas de uso de leads sobre o resumo materializado UsoMensalLeads.
+
+Tendências e rankings leem apenas o resumo (uma linha por usuário e mês, mantida por
+cota_mensal.registrar_consumo e fechada pela virada de mês), nunca a tabela Lead.
+"""
+from datetime import date
+
+from django.db.models import Count, Sum
+
+from ..models import UsoMensalLeads
+from .cota_mensal import mes_atual
+
+MESES_TENDENCIA = 6
+TOP_CONSUMIDORES = 10
+
+
+def meses_anteriores(quantidade=MESES_TENDENCIA, ate=None):
+    """Lista de 'YYYY-MM' em ordem crescente terminando em `ate` (padrão: mês atual)."""
+    ano, mes = map(int, (ate or mes_atual()).split('-'))
+    meses = []
+    for _ in range(quantidade):
+        meses.append(date(ano, mes, 1).strftime('%Y-%m'))
+        ano, mes = (ano, mes - 1) if mes > 1 else (ano - 1, 12)
+    return meses[::-1]
+
+
+def tendencia_usuario(usuario_id, quantidade=MESES_TENDENCIA):
+    """Consumo e limite do usuário nos últimos meses: [{'mes', 'consumidos', 'limite'}, ...]."""
+    meses = meses_anteriores(quantidade)
+    por_mes = {
+        mes: (consumidos, limite)
+        for mes, consumidos, limite in UsoMensalLeads.objects
+        .filter(usuario_id=usuario_id, mes_referencia__in=meses)
+        .values_list('mes_referencia', 'leads_consumidos', 'leads_limite')
+    }
+    return [
+        {'mes': mes, 'consumidos': por_mes.get(mes, (0, 0))[0], 'limite': por_mes.get(mes, (0, 0))[1]}
+        for mes in meses
+    ]
+
+
+def tendencia_plataforma(quantidade=MESES_TENDENCIA):
+    """Totais da plataforma por mês: [{'mes', 'consumidos', 'usuarios'}, ...]."""
+    meses = meses_anteriores(quantidade)
+    por_mes = {
+        linha['mes_referencia']: linha
+        for linha in UsoMensalLeads.objects
+        .filter(mes_referencia__in=meses, leads_consumidos__gt=0)
+        .values('mes_referencia')
+        .annotate(consumidos=Sum('leads_consumidos'), usuarios=Count('usuario_id'))
+        .order_by()
+    }
+    return [
+        {
+            'mes': mes,
+            'consumidos': por_mes.get(mes, {}).get('consumidos') or 0,
+            'usuarios': por_mes.get(mes, {}).get('usuarios') or 0,
+        }
+        for mes in meses
+    ]
+
+
+def maiores_consumidores(mes=None, limite=TOP_CONSUMIDORES):
+    """Resumos do mês com maior consumo, já com o usuário carregado (usa uso_mensal_ranking_idx)."""
+    return list(
+        UsoMensalLeads.objects
+        .filter(mes_referencia=mes or mes_atual(), leads_consumidos__gt=0)
+        .select_related('usuario')
+        .order_by('-leads_consumidos')[:limite]
+    )
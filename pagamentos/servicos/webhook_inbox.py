@@ -0,0 +1,282 @@
+"""
+Caixa de entrada dos webhooks do Mercado Pago.
+
+O endpoint só grava a notificação bruta (registrar_notificacao) e responde 200 na hora;
+nenhuma chamada à API do Mercado Pago acontece durante a requisição HTTP.
+O comando processar_webhooks chama processar_pendentes em laço: reivindica um lote,
+consulta os detalhes na API, aplica as transições (finalizar_assinatura/finalizar_compra)
+na mesma transação que reivindica o evento (ver idempotencia.py) e reagenda falhas com
+backoff exponencial até WEBHOOK_MAX_TENTATIVAS.
+
+A reivindicação é um UPDATE condicional (status/proxima_tentativa_em), então vários
+processadores podem rodar ao mesmo tempo sem pegar a mesma notificação. Uma notificação
+presa em 'processando' (processador morto) volta à fila quando o prazo expira.
+"""
+import json
+import logging
+import time
+from datetime import timedelta
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Q
+from django.utils import timezone
+
+from ..models import Assinatura, Compra, NotificacaoWebhook
+from .idempotencia import ja_processado_recentemente, reivindicar_evento
+from .mercadopago_servico import MercadoPagoServico
+
+logger = logging.getLogger(__name__)
+
+MAX_TENTATIVAS_PADRAO = 8
+BACKOFF_BASE_SEGUNDOS = 30
+BACKOFF_MAXIMO_SEGUNDOS = 3600
+PRAZO_PROCESSAMENTO = timedelta(minutes=5)
+TAMANHO_LOTE_PADRAO = 50
+
+# Resultados gravados em NotificacaoWebhook.resultado
+RESULTADO_ASSINATURA_CONFIRMADA = 'assinatura_confirmada'
+RESULTADO_ASSINATURA_RENOVADA = 'assinatura_renovada'
+RESULTADO_COMPRA_CONFIRMADA = 'compra_confirmada'
+RESULTADO_DUPLICADO = 'duplicado'
+RESULTADO_SEM_ALTERACAO = 'sem_alteracao'
+RESULTADO_NAO_ENCONTRADO = 'referencia_nao_encontrada'
+RESULTADO_TOPICO_IGNORADO = 'topico_ignorado'
+
+
+class ErroTransitorio(Exception):
+    """Falha que vale nova tentativa (API indisponível, resposta inesperada)."""
+
+
+def max_tentativas():
+    return getattr(settings, 'WEBHOOK_MAX_TENTATIVAS', MAX_TENTATIVAS_PADRAO)
+
+
+def extrair_topico_e_id(query_string, corpo):
+    """
+    Lê tópico e ID do recurso como o Mercado Pago envia: na query string
+    (topic/type, id/data.id) ou no corpo JSON ({"type": ..., "data": {"id": ...}}).
+    """
+    params = parse_qs(query_string or '')
+    topico = (params.get('topic') or params.get('type') or [''])[0]
+    recurso_id = (params.get('id') or params.get('data.id') or [''])[0]
+
+    if not recurso_id and corpo:
+        try:
+            data = json.loads(corpo)
+            topico = data.get('type') or topico
+            recurso_id = str((data.get('data') or {}).get('id') or '')
+        except (ValueError, AttributeError):
+            pass
+    return topico, recurso_id
+
+
+def registrar_notificacao(request):
+    """Grava a notificação bruta na caixa de entrada. Único acesso ao banco do webhook."""
+    query_string = request.META.get('QUERY_STRING', '')
+    corpo = request.body.decode('utf-8', errors='replace')
+    topico, recurso_id = extrair_topico_e_id(query_string, corpo)
+    return NotificacaoWebhook.objects.create(
+        topico=topico,
+        recurso_id=recurso_id,
+        query_string=query_string,
+        corpo=corpo,
+    )
+
+
+def _backoff(tentativas):
+    return timedelta(seconds=min(BACKOFF_BASE_SEGUNDOS * 2 ** max(tentativas - 1, 0), BACKOFF_MAXIMO_SEGUNDOS))
+
+
+def _fila(agora):
+    return NotificacaoWebhook.objects.filter(
+        status__in=('pendente', 'erro', 'processando'),
+        proxima_tentativa_em__lte=agora,
+    )
+
+
+def reivindicar(notificacao, agora=None):
+    """
+    Marca a notificação como 'processando' se ela ainda estiver disponível.
+    Retorna False se outro processador chegou antes.
+    """
+    agora = agora or timezone.now()
+    atualizadas = _fila(agora).filter(
+        pk=notificacao.pk,
+        status=notificacao.status,
+        tentativas=notificacao.tentativas,
+    ).update(
+        status='processando',
+        tentativas=notificacao.tentativas + 1,
+        proxima_tentativa_em=agora + PRAZO_PROCESSAMENTO,
+    )
+    if atualizadas:
+        notificacao.status = 'processando'
+        notificacao.tentativas += 1
+    return bool(atualizadas)
+
+
+def _processar_preapproval(recurso_id):
+    from ..views import finalizar_assinatura
+
+    event_id = f"sub_preapproval_{recurso_id}"
+    if ja_processado_recentemente(event_id):
+        return RESULTADO_DUPLICADO
+
+    info = MercadoPagoServico.get_preapproval_info(recurso_id)
+    if info is None:
+        raise ErroTransitorio(f"preapproval {recurso_id}: API não retornou dados")
+    if info.get('status') not in ('authorized', 'pending'):
+        return RESULTADO_SEM_ALTERACAO
+
+    try:
+        assinatura = Assinatura.objects.get(mercadopago_preapproval_id=recurso_id)
+    except Assinatura.DoesNotExist:
+        logger.error(f"Assinatura preapproval_id={recurso_id} não encontrada")
+        return RESULTADO_NAO_ENCONTRADO
+
+    with transaction.atomic():
+        if not reivindicar_evento(event_id, 'subscription_preapproval', info):
+            return RESULTADO_DUPLICADO
+        if assinatura.status in ('authorized', 'pending'):
+            return RESULTADO_SEM_ALTERACAO
+        finalizar_assinatura(assinatura)
+    logger.info(f"Assinatura {assinatura.id} confirmada via Webhook")
+    return RESULTADO_ASSINATURA_CONFIRMADA
+
+
+def _processar_payment(recurso_id):
+    from ..views import finalizar_assinatura, finalizar_compra
+
+    payment_info = MercadoPagoServico.get_payment_info(recurso_id)
+    if payment_info.get("status") != 200:
+        raise ErroTransitorio(f"payment {recurso_id}: API respondeu {payment_info.get('status')}")
+
+    payment = payment_info.get("response") or {}
+    external_reference = payment.get("external_reference")
+    status = payment.get("status")
+    event_id = f"payment_{recurso_id}_{status}"
+
+    if ja_processado_recentemente(event_id):
+        return RESULTADO_DUPLICADO
+    if not external_reference or status != 'approved':
+        return RESULTADO_SEM_ALTERACAO
+
+    # Assinatura: external_reference = "ass_123"
+    if str(external_reference).startswith('ass_'):
+        try:
+            assinatura = Assinatura.objects.get(id=int(external_reference.replace('ass_', '')))
+        except (ValueError, Assinatura.DoesNotExist):
+            logger.error(f"Assinatura ref {external_reference} não encontrada")
+            return RESULTADO_NAO_ENCONTRADO
+
+        with transaction.atomic():
+            if not reivindicar_evento(event_id, 'payment', payment):
+                return RESULTADO_DUPLICADO
+            if assinatura.status not in ('authorized', 'pending'):
+                finalizar_assinatura(assinatura)
+            # A cota mensal não é zerada aqui: ver servicos/cota_mensal.py
+        return RESULTADO_ASSINATURA_RENOVADA
+
+    # Fluxo legado: Compra
+    try:
+        compra = Compra.objects.get(id=external_reference)
+    except (ValueError, Compra.DoesNotExist):
+        logger.error(f"Compra {external_reference} não encontrada no webhook")
+        return RESULTADO_NAO_ENCONTRADO
+
+    with transaction.atomic():
+        if not reivindicar_evento(event_id, 'payment', payment):
+            return RESULTADO_DUPLICADO
+        if compra.status == 'paga':
+            return RESULTADO_SEM_ALTERACAO
+        finalizar_compra(compra, str(payment['id']))
+    logger.info(f"Compra {compra.id} confirmada via Webhook")
+    return RESULTADO_COMPRA_CONFIRMADA
+
+
+def processar_notificacao(notificacao):
+    """
+    Aplica uma notificação já reivindicada e grava status, resultado e duração.
+    Falhas viram 'erro' com nova tentativa agendada, ou 'falhou' ao esgotar as tentativas.
+    """
+    inicio = time.monotonic()
+    try:
+        if not notificacao.recurso_id:
+            resultado = RESULTADO_TOPICO_IGNORADO
+        elif notificacao.topico == 'subscription_preapproval':
+            resultado = _processar_preapproval(notificacao.recurso_id)
+        elif notificacao.topico == 'payment':
+            resultado = _processar_payment(notificacao.recurso_id)
+        else:
+            resultado = RESULTADO_TOPICO_IGNORADO
+    except Exception as e:
+        agora = timezone.now()
+        notificacao.ultimo_erro = f"{type(e).__name__}: {e}"
+        if notificacao.tentativas >= max_tentativas():
+            notificacao.status = 'falhou'
+            notificacao.processada_em = agora
+        else:
+            notificacao.status = 'erro'
+            notificacao.proxima_tentativa_em = agora + _backoff(notificacao.tentativas)
+        notificacao.resultado = ''
+        if not isinstance(e, ErroTransitorio):
+            logger.exception(f"Erro ao processar notificação {notificacao.pk}")
+    else:
+        notificacao.status = 'ignorada' if resultado == RESULTADO_TOPICO_IGNORADO else 'processada'
+        notificacao.resultado = resultado
+        notificacao.ultimo_erro = ''
+        notificacao.processada_em = timezone.now()
+
+    notificacao.duracao_ms = int((time.monotonic() - inicio) * 1000)
+    notificacao.save(update_fields=[
+        'status', 'resultado', 'ultimo_erro', 'proxima_tentativa_em', 'processada_em', 'duracao_ms',
+    ])
+    logger.info(
+        "webhook_processado id=%s topico=%s recurso=%s status=%s resultado=%s tentativas=%s duracao_ms=%s",
+        notificacao.pk, notificacao.topico, notificacao.recurso_id, notificacao.status,
+        notificacao.resultado or '-', notificacao.tentativas, notificacao.duracao_ms,
+    )
+    return notificacao
+
+
+def processar_pendentes(limite=TAMANHO_LOTE_PADRAO):
+    """Processa até `limite` notificações disponíveis. Retorna quantas foram processadas."""
+    agora = timezone.now()
+    candidatas = list(_fila(agora).order_by('proxima_tentativa_em', 'pk')[:limite])
+    processadas = 0
+    for notificacao in candidatas:
+        if reivindicar(notificacao, agora):
+            processar_notificacao(notificacao)
+            processadas += 1
+    return processadas
+
+
+def metricas_inbox(desde=None):
+    """
+    Métricas da caixa de entrada: contagem por status e resultado, latência de
+    processamento (duracao_ms) e idade da notificação pendente mais antiga.
+    """
+    qs = NotificacaoWebhook.objects.all()
+    if desde is not None:
+        qs = qs.filter(recebida_em__gte=desde)
+
+    por_status = dict(qs.values_list('status').annotate(total=Count('pk')).order_by())
+    por_resultado = dict(
+        qs.exclude(resultado='').values_list('resultado').annotate(total=Count('pk')).order_by()
+    )
+    latencia = qs.filter(duracao_ms__isnull=False).aggregate(
+        media_ms=Avg('duracao_ms'), maxima_ms=Max('duracao_ms'),
+    )
+    mais_antiga = (
+        qs.filter(Q(status='pendente') | Q(status='erro'))
+        .order_by('recebida_em').values_list('recebida_em', flat=True).first()
+    )
+    return {
+        'por_status': por_status,
+        'por_resultado': por_resultado,
+        'latencia_media_ms': latencia['media_ms'],
+        'latencia_maxima_ms': latencia['maxima_ms'],
+        'atraso_fila_segundos': (timezone.now() - mais_antiga).total_seconds() if mais_antiga else 0,
+    }
@@ -0,0 +1,27 @@
+"""
+Sinais do app de pagamentos.
+Invalidam o cache de direitos sempre que acesso, assinatura ou compra de um usuário mudam,
+e o catálogo de planos sempre que uma Oferta muda.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .direitos import invalidar_direitos
+from .models import AcessoUsuario, Assinatura, Compra, Oferta
+from .servicos.catalogo_planos import invalidar_catalogo_planos
+
+
+@receiver(post_save, sender=AcessoUsuario)
+@receiver(post_delete, sender=AcessoUsuario)
+@receiver(post_save, sender=Assinatura)
+@receiver(post_delete, sender=Assinatura)
+@receiver(post_save, sender=Compra)
+@receiver(post_delete, sender=Compra)
+def invalidar_direitos_usuario(sender, instance, **kwargs):
+    invalidar_direitos(instance.usuario_id)
+
+
+@receiver(post_save, sender=Oferta)
+@receiver(post_delete, sender=Oferta)
+def invalidar_catalogo(sender, instance, **kwargs):
+    invalidar_catalogo_planos()
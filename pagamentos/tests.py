@@ -2,9 +2,42 @@
 Testes unitários para o app de pagamentos.
 Cobre models, níveis de acesso e lógica de upgrade.
 """
-from django.test import TestCase
+from io import StringIO
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, override_settings, RequestFactory
 from django.contrib.auth.models import User
-from .models import Oferta, Compra, AcessoUsuario
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from .models import (
+    Oferta, Compra, Assinatura, AcessoUsuario, EventoMercadoPago, NotificacaoWebhook, TransicaoEstado,
+    LancamentoUsoLeads, UsoMensalLeads,
+)
+from .contexto_acesso import obter_acesso, obter_direitos
+from .direitos import obter_direitos_usuario
+from .decoradores_acesso import exigir_assinante_ativo
+from .servicos.idempotencia import ids_recentes, reivindicar_evento
+from .servicos import mercadopago_cliente
+from .servicos.checkout_assinatura import limpar_checkouts_abandonados
+from .servicos.cota_mensal import registrar_consumo, virar_mes
+from .servicos.uso_leads import maiores_consumidores, tendencia_plataforma, tendencia_usuario
+from .servicos.estados_assinatura import (
+    TRANSICOES_ACESSO, TRANSICOES_ASSINATURA, TransicaoInvalida, conceder_acesso,
+    suspender_inadimplentes, transicionar, transicionar_em_lote,
+)
+from .servicos.mercadopago_servico import MercadoPagoServico
+from .servicos.mercadopago_stub import MercadoPagoStub
+from .servicos.reconciliacao import reconciliar
+from .servicos.webhook_inbox import processar_pendentes, processar_notificacao
+from .views import finalizar_assinatura, finalizar_compra
+from web.fabricas import criar_assinante
+from web.orcamento_views import OrcamentoViewsMixin
 
 class OfertaModelTest(TestCase):
     def test_comparacao_niveis(self):
@@ -14,11 +47,23 @@ class OfertaModelTest(TestCase):
         self.assertEqual(Oferta.obter_nivel_numerico('ouro'), 3)
         self.assertEqual(Oferta.obter_nivel_numerico('invalido'), 0)
 
+class CadastrarPlanosTest(TestCase):
+    def test_sincroniza_e_desativa_legado(self):
+        Oferta.objects.create(slug='ouro', nome_exibicao='Ouro', valor_centavos=9900)
+        call_command('cadastrar_planos', stdout=StringIO())
+        self.assertEqual(Oferta.objects.filter(ativo=True).count(), 6)
+        self.assertFalse(Oferta.objects.get(slug='ouro').ativo)
+
+        saida = StringIO()
+        call_command('cadastrar_planos', stdout=saida)
+        self.assertIn('0 criados, 0 atualizados, 0 desativados, 6 inalterados', saida.getvalue())
+
 class AcessoUsuarioModelTest(TestCase):
-    def setUp(self):
-        self.user = User.objects.create(username='testuser')
-        self.acesso = AcessoUsuario.objects.create(
-            usuario=self.user,
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='testuser')
+        cls.acesso = AcessoUsuario.objects.create(
+            usuario=cls.user,
             nivel='prata',
             status='ativo'
         )
@@ -81,3 +126,602 @@ class FluxoUpgradeTest(TestCase):
         # Verifica se atualizou
         acesso.refresh_from_db()
         self.assertEqual(acesso.nivel, 'ouro')
+
+
+class ContextoAcessoTest(TestCase):
+    """Direitos carregados uma vez e servidos pelo cache, invalidados por sinais."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='assinante')
+        cls.oferta = Oferta.objects.create(
+            slug='basico_mensal', nome_exibicao='Básico', valor_centavos=11900, leads_mensais=300
+        )
+        cls.assinatura = Assinatura.objects.create(usuario=cls.user, oferta=cls.oferta, status='authorized')
+        AcessoUsuario.objects.create(
+            usuario=cls.user, nivel='basico', status='ativo', ultima_assinatura=cls.assinatura
+        )
+
+    def setUp(self):
+        caches['direitos'].clear()
+        self.factory = RequestFactory()
+
+    def _request(self):
+        request = self.factory.get('/')
+        request.user = User.objects.get(pk=self.user.pk)
+        return request
+
+    def test_decorador_usa_uma_consulta_e_depois_o_cache(self):
+        view = exigir_assinante_ativo(lambda request: HttpResponse(obter_direitos(request).nivel))
+
+        request = self._request()
+        with self.assertNumQueries(1):
+            response = view(request)
+        self.assertEqual(response.content, b'basico')
+
+        request = self._request()
+        with self.assertNumQueries(0):
+            response = view(request)
+        self.assertEqual(response.content, b'basico')
+
+    def test_obter_acesso_carrega_linha_completa_uma_vez(self):
+        request = self._request()
+        with self.assertNumQueries(1):
+            acesso = obter_acesso(request)
+            self.assertIs(obter_acesso(request), acesso)
+            self.assertIs(request.user.acesso, acesso)
+            self.assertEqual(acesso.ultima_assinatura.status, 'authorized')
+
+    def test_finalizar_assinatura_invalida_direitos(self):
+        self.assinatura.status = 'paused'
+        self.assinatura.save()
+        self.assertEqual(obter_direitos(self._request()).pagamento, 'assinatura_inativa')
+
+        finalizar_assinatura(self.assinatura)
+
+        direitos = obter_direitos(self._request())
+        self.assertTrue(direitos.pagamento_em_dia)
+        self.assertTrue(direitos.tem_acesso_minimo('basico'))
+
+    def test_sinal_de_acesso_invalida_direitos(self):
+        self.assertTrue(obter_direitos(self._request()).ativo)
+
+        AcessoUsuario.objects.get(usuario=self.user).delete()
+
+        self.assertFalse(obter_direitos(self._request()).tem_acesso)
+
+
+class WebhookInboxTest(TestCase):
+    """Webhook grava e responde na hora; o processador aplica e reagenda falhas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='webhook')
+        cls.oferta = Oferta.objects.create(
+            slug='basico_mensal', nome_exibicao='Básico', valor_centavos=11900, leads_mensais=300
+        )
+        cls.assinatura = Assinatura.objects.create(
+            usuario=cls.user, oferta=cls.oferta, mercadopago_preapproval_id='PRE123'
+        )
+
+    def _enviar(self):
+        return self.client.post(
+            reverse('mercadopago_webhook'),
+            data='{"type": "subscription_preapproval", "data": {"id": "PRE123"}}',
+            content_type='application/json',
+        )
+
+    @mock.patch('pagamentos.servicos.webhook_inbox.MercadoPagoServico.get_preapproval_info')
+    def test_webhook_nao_chama_api_e_processador_aplica(self, get_info):
+        get_info.return_value = {'id': 'PRE123', 'status': 'authorized'}
+
+        self.assertEqual(self._enviar().status_code, 200)
+        get_info.assert_not_called()
+        notificacao = NotificacaoWebhook.objects.get()
+        self.assertEqual((notificacao.topico, notificacao.recurso_id, notificacao.status),
+                         ('subscription_preapproval', 'PRE123', 'pendente'))
+
+        self.assertEqual(processar_pendentes(), 1)
+
+        notificacao.refresh_from_db()
+        self.assertEqual(notificacao.status, 'processada')
+        self.assertEqual(notificacao.resultado, 'assinatura_confirmada')
+        self.assertIsNotNone(notificacao.duracao_ms)
+        self.assinatura.refresh_from_db()
+        self.assertEqual(self.assinatura.status, 'authorized')
+        self.assertTrue(EventoMercadoPago.objects.filter(event_id='sub_preapproval_PRE123').exists())
+
+    @mock.patch('pagamentos.servicos.webhook_inbox.MercadoPagoServico.get_preapproval_info')
+    def test_falha_da_api_reagenda_com_backoff(self, get_info):
+        get_info.return_value = None
+        self._enviar()
+
+        self.assertEqual(processar_pendentes(), 1)
+        notificacao = NotificacaoWebhook.objects.get()
+        self.assertEqual(notificacao.status, 'erro')
+        self.assertEqual(notificacao.tentativas, 1)
+        self.assertIn('ErroTransitorio', notificacao.ultimo_erro)
+
+        # Ainda dentro do backoff: nada a processar
+        self.assertEqual(processar_pendentes(), 0)
+
+        get_info.return_value = {'id': 'PRE123', 'status': 'authorized'}
+        NotificacaoWebhook.objects.update(proxima_tentativa_em=notificacao.recebida_em)
+        self.assertEqual(processar_pendentes(), 1)
+        notificacao.refresh_from_db()
+        self.assertEqual((notificacao.status, notificacao.tentativas), ('processada', 2))
+
+
+class IdempotenciaEventosTest(TestCase):
+    """
+    Entregas duplicadas aplicam a transição uma única vez. A garantia é o INSERT único
+    de reivindicar_evento, exercitado aqui sem o filtro em memória; o SQLite em memória
+    dos testes não reproduz INSERTs concorrentes de verdade, então não usamos threads.
+    """
+
+    ENTREGAS = 8
+
+    def setUp(self):
+        ids_recentes.limpar()
+        user = User.objects.create(username='duplicado')
+        oferta = Oferta.objects.create(slug='basico_mensal', nome_exibicao='Básico', valor_centavos=11900)
+        self.compra = Compra.objects.create(usuario=user, oferta=oferta)
+        self.resposta_api = {
+            'status': 200,
+            'response': {'id': 999, 'status': 'approved', 'external_reference': str(self.compra.id)},
+        }
+
+    def _notificacoes(self, n):
+        return [
+            NotificacaoWebhook.objects.create(topico='payment', recurso_id='999', status='processando', tentativas=1)
+            for _ in range(n)
+        ]
+
+    def test_reivindicacao_por_insert_unico(self):
+        with transaction.atomic():
+            self.assertTrue(reivindicar_evento('payment_999_approved', 'payment', {}))
+            ids_recentes.limpar()
+            self.assertFalse(reivindicar_evento('payment_999_approved', 'payment', {}))
+        self.assertEqual(EventoMercadoPago.objects.count(), 1)
+
+    @mock.patch('pagamentos.servicos.webhook_inbox.MercadoPagoServico.get_payment_info')
+    def test_duplicatas_finalizam_uma_vez(self, get_info):
+        get_info.return_value = self.resposta_api
+
+        with mock.patch('pagamentos.views.finalizar_compra', wraps=finalizar_compra) as finalizar:
+            for notificacao in self._notificacoes(self.ENTREGAS):
+                ids_recentes.limpar()  # cada entrega chega ao banco, como em outro processo
+                processar_notificacao(notificacao)
+
+        resultados = list(NotificacaoWebhook.objects.values_list('resultado', flat=True))
+        self.assertEqual(finalizar.call_count, 1)
+        self.assertEqual(EventoMercadoPago.objects.count(), 1)
+        self.assertEqual(resultados.count('compra_confirmada'), 1)
+        self.assertEqual(resultados.count('duplicado'), self.ENTREGAS - 1)
+        self.assertEqual(Compra.objects.get(pk=self.compra.pk).status, 'paga')
+
+    @mock.patch('pagamentos.servicos.webhook_inbox.MercadoPagoServico.get_payment_info')
+    def test_reentrega_conhecida_nao_consulta_o_banco(self, get_info):
+        get_info.return_value = self.resposta_api
+        primeira, segunda = self._notificacoes(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            processar_notificacao(primeira)
+
+        # Só o UPDATE da própria notificação; nenhuma consulta de idempotência
+        with self.assertNumQueries(1):
+            processar_notificacao(segunda)
+        self.assertEqual(segunda.resultado, 'duplicado')
+
+
+class ReconciliacaoTest(TestCase):
+    """Reconciliação contra o stub local do Mercado Pago."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.oferta = Oferta.objects.create(
+            slug='basico_mensal', nome_exibicao='Básico', valor_centavos=11900, leads_mensais=300
+        )
+        cls.user_a = User.objects.create(username='rec_a')
+        cls.user_b = User.objects.create(username='rec_b')
+        cls.pendente = Assinatura.objects.create(usuario=cls.user_a, oferta=cls.oferta)
+        cls.autorizada = Assinatura.objects.create(usuario=cls.user_b, oferta=cls.oferta, status='authorized')
+        cls.compra = Compra.objects.create(usuario=cls.user_b, oferta=cls.oferta)
+
+    def setUp(self):
+        caches['direitos'].clear()
+        self.stub = MercadoPagoStub(
+            preapprovals=[
+                {'id': 'P1', 'external_reference': f'ass_{self.pendente.id}', 'status': 'authorized',
+                 'last_modified': '2026-01-02T00:00:00Z'},
+                {'id': 'P2', 'external_reference': f'ass_{self.autorizada.id}', 'status': 'paused',
+                 'last_modified': '2026-01-02T00:00:00Z'},
+            ],
+            pagamentos=[
+                {'id': 77, 'external_reference': str(self.compra.id), 'status': 'approved',
+                 'date_last_updated': '2026-01-02T00:00:00Z'},
+            ],
+        )
+
+    def test_dry_run_lista_sem_alterar(self):
+        resultado = reconciliar(cliente=self.stub, dry_run=True)
+
+        self.assertEqual(
+            sorted((d.status_atual, d.status_remoto) for d in resultado.divergencias),
+            [('authorized', 'paused'), ('pendente', 'authorized'), ('pendente', 'paga')],
+        )
+        self.pendente.refresh_from_db()
+        self.assertEqual(self.pendente.status, 'pendente')
+
+    def test_aplica_divergencias(self):
+        reconciliar(cliente=self.stub, concorrencia=2, tamanho_pagina=1)
+
+        self.pendente.refresh_from_db()
+        self.autorizada.refresh_from_db()
+        self.compra.refresh_from_db()
+        self.assertEqual(self.pendente.status, 'authorized')
+        self.assertEqual(self.autorizada.status, 'paused')
+        self.assertEqual((self.compra.status, self.compra.mercadopago_payment_id), ('paga', '77'))
+        self.assertTrue(AcessoUsuario.objects.filter(usuario=self.user_a, status='ativo').exists())
+
+    def test_pending_remoto_em_assinatura_pendente_nao_concede_acesso(self):
+        # Checkout criado e não concluído: o preapproval fica 'pending'
+        stub = MercadoPagoStub(preapprovals=[
+            {'id': 'P1', 'external_reference': f'ass_{self.pendente.id}', 'status': 'pending',
+             'last_modified': '2026-01-02T00:00:00Z'},
+        ])
+        resultado = reconciliar(cliente=stub)
+
+        self.assertEqual(resultado.divergencias, [])
+        self.pendente.refresh_from_db()
+        self.assertEqual(self.pendente.status, 'pendente')
+        self.assertFalse(AcessoUsuario.objects.filter(usuario=self.user_a).exists())
+
+    def test_incremental_parte_da_marca_dagua(self):
+        reconciliar(cliente=self.stub)
+        Assinatura.objects.filter(pk=self.autorizada.pk).update(status='authorized')
+
+        # Nada mudou no Mercado Pago desde a última execução: nenhuma divergência
+        resultado = reconciliar(cliente=self.stub, incremental=True)
+        self.assertTrue(resultado.execucao.incremental)
+        self.assertEqual(resultado.divergencias, [])
+
+
+class MercadoPagoClienteTest(TestCase):
+    """SDK e sessão HTTP reaproveitados, com latência registrada por endpoint."""
+
+    def setUp(self):
+        mercadopago_cliente.histogramas.limpar()
+
+    def _resposta(self, corpo=b'{"id": "PRE1", "status": "authorized"}'):
+        response = mock.Mock(status_code=200, content=corpo)
+        response.json.return_value = {'id': 'PRE1', 'status': 'authorized'}
+        response.elapsed.total_seconds.return_value = 0.04
+        return response
+
+    def test_sdk_e_sessao_unicos_por_processo(self):
+        self.assertIs(mercadopago_cliente.obter_sdk(), mercadopago_cliente.obter_sdk())
+        self.assertIs(mercadopago_cliente.obter_sessao(), mercadopago_cliente.obter_sessao())
+
+    def test_chamadas_usam_sessao_compartilhada_e_alimentam_histograma(self):
+        sessao = mercadopago_cliente.obter_sessao()
+        with mock.patch.object(sessao, 'request', return_value=self._resposta()) as request:
+            MercadoPagoServico.get_preapproval_info('2c9380848f1')
+            MercadoPagoServico.get_payment_info(123)
+
+        self.assertEqual(request.call_count, 2)
+        self.assertEqual(request.call_args.kwargs['timeout'], mercadopago_cliente.timeouts())
+        series = {(r['endpoint'], r['fase']): s['total'] for r, s in mercadopago_cliente.metricas_http()}
+        self.assertEqual(series[('GET /preapproval/{id}', 'total')], 1)
+        self.assertEqual(series[('GET /v1/payments/{id}', 'cabecalhos')], 1)
+
+
+@mock.patch('pagamentos.servicos.checkout_assinatura.MercadoPagoServico.criar_preapproval')
+class CheckoutReaproveitadoTest(TestCase):
+    """Cliques repetidos em "assinar" reaproveitam o preapproval pendente."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('checkout', password='x')
+        cls.oferta = Oferta.objects.create(
+            slug='basico_mensal', nome_exibicao='Básico', valor_centavos=11900, leads_mensais=300
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _clicar(self):
+        return self.client.get(reverse('criar_checkout', args=[self.oferta.id]))
+
+    def test_segundo_clique_reaproveita_sem_chamar_mercado_pago(self, criar_preapproval):
+        criar_preapproval.return_value = {'id': 'PRE9', 'init_point': 'https://mp.test/checkout/PRE9'}
+
+        self.assertRedirects(self._clicar(), 'https://mp.test/checkout/PRE9', fetch_redirect_response=False)
+        self.assertRedirects(self._clicar(), 'https://mp.test/checkout/PRE9', fetch_redirect_response=False)
+
+        self.assertEqual(criar_preapproval.call_count, 1)
+        self.assertEqual(Assinatura.objects.filter(usuario=self.user).count(), 1)
+
+    def test_pendente_expirado_gera_novo_checkout(self, criar_preapproval):
+        criar_preapproval.return_value = {'id': 'PRE9', 'init_point': 'https://mp.test/checkout/PRE9'}
+        self._clicar()
+        Assinatura.objects.update(criado_em=timezone.now() - timedelta(days=2))
+
+        self._clicar()
+        self.assertEqual(criar_preapproval.call_count, 2)
+
+    def test_limpeza_remove_pendentes_abandonados_em_lotes(self, criar_preapproval):
+        antigas = [Assinatura.objects.create(usuario=self.user, oferta=self.oferta) for _ in range(5)]
+        vinculada = antigas.pop()
+        AcessoUsuario.objects.create(usuario=self.user, nivel='basico', ultima_assinatura=vinculada)
+        Assinatura.objects.update(criado_em=timezone.now() - timedelta(days=30))
+        recente = Assinatura.objects.create(usuario=self.user, oferta=self.oferta)
+
+        lotes = []
+        total = limpar_checkouts_abandonados(tamanho_lote=2, progresso=lotes.append)
+
+        self.assertEqual(total, 4)
+        self.assertEqual(lotes, [2, 4])
+        self.assertEqual(set(Assinatura.objects.values_list('pk', flat=True)), {vinculada.pk, recente.pk})
+
+
+class EstadosAssinaturaTest(TestCase):
+    """Máquina de estados: todas as transições, log append-only e transições em lote."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.oferta = Oferta.objects.create(
+            slug='profissional_mensal', nome_exibicao='Profissional', valor_centavos=29900, leads_mensais=1000
+        )
+        cls.user = User.objects.create(username='estados')
+
+    def setUp(self):
+        caches['direitos'].clear()
+
+    def _assinatura(self, status):
+        return Assinatura.objects.create(usuario=self.user, oferta=self.oferta, status=status)
+
+    def _acesso(self, status):
+        return AcessoUsuario.objects.update_or_create(
+            usuario=self.user, defaults={'nivel': 'profissional', 'status': status}
+        )[0]
+
+    def test_todas_as_transicoes_de_assinatura(self):
+        for origem, destinos in TRANSICOES_ASSINATURA.items():
+            for destino in {status for status, _ in Assinatura.STATUS_CHOICES} - {origem}:
+                with self.subTest(origem=origem, destino=destino):
+                    assinatura = self._assinatura(origem)
+                    if destino in destinos:
+                        self.assertTrue(transicionar(assinatura, destino, motivo='teste'))
+                        assinatura.refresh_from_db()
+                        self.assertEqual(assinatura.status, destino)
+                        log = TransicaoEstado.objects.filter(entidade='assinatura', objeto_id=assinatura.pk).get()
+                        self.assertEqual((log.estado_anterior, log.estado_novo), (origem, destino))
+                    else:
+                        with self.assertRaises(TransicaoInvalida):
+                            transicionar(assinatura, destino)
+                        assinatura.refresh_from_db()
+                        self.assertEqual(assinatura.status, origem)
+
+    def test_todas_as_transicoes_de_acesso(self):
+        for origem, destinos in TRANSICOES_ACESSO.items():
+            for destino in {status for status, _ in AcessoUsuario.STATUS_CHOICES} - {origem}:
+                with self.subTest(origem=origem, destino=destino):
+                    acesso = self._acesso(origem)
+                    if destino in destinos:
+                        self.assertTrue(transicionar(acesso, destino))
+                    else:
+                        with self.assertRaises(TransicaoInvalida):
+                            transicionar(acesso, destino)
+
+    def test_mesmo_status_nao_grava(self):
+        assinatura = self._assinatura('authorized')
+        with self.assertNumQueries(0):
+            self.assertFalse(transicionar(assinatura, 'authorized'))
+
+    def test_transicao_grava_apenas_status(self):
+        assinatura = self._assinatura('pending')
+        with CaptureQueriesContext(connection) as ctx:
+            transicionar(assinatura, 'authorized')
+        update = next(q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE'))
+        self.assertIn('"status"', update)
+        self.assertNotIn('"oferta_id"', update)
+
+    def test_em_lote_um_unico_update_e_log_por_linha(self):
+        usuarios = [User.objects.create(username=f'lote{i}') for i in range(4)]
+        assinaturas = [Assinatura.objects.create(usuario=u, oferta=self.oferta, status='paused') for u in usuarios]
+        for u, a in zip(usuarios, assinaturas):
+            AcessoUsuario.objects.create(usuario=u, nivel='profissional', ultima_assinatura=a)
+        AcessoUsuario.objects.filter(usuario=usuarios[0]).update(status='revogado')  # não muda
+
+        with CaptureQueriesContext(connection) as ctx:
+            suspensos = suspender_inadimplentes()
+
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(suspensos, 3)
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(AcessoUsuario.objects.filter(status='suspenso').count(), 3)
+        self.assertEqual(TransicaoEstado.objects.filter(entidade='acesso', estado_novo='suspenso').count(), 3)
+
+    def test_em_lote_ignora_origens_invalidas(self):
+        self._assinatura('pendente')
+        self._assinatura('authorized')
+        self.assertEqual(transicionar_em_lote(Assinatura.objects.all(), 'pendente'), 0)
+
+    def test_conceder_reativa_acesso_suspenso_e_registra(self):
+        acesso = self._acesso('suspenso')
+        conceder_acesso(self.user, self.oferta, assinatura=self._assinatura('authorized'), motivo='teste')
+
+        acesso.refresh_from_db()
+        self.assertEqual((acesso.status, acesso.nivel, acesso.leads_limite_mensal), ('ativo', 'profissional', 1000))
+        self.assertTrue(TransicaoEstado.objects.filter(objeto_id=acesso.pk, estado_anterior='suspenso').exists())
+
+    def test_conceder_no_meio_do_mes_mantem_consumo(self):
+        mes = timezone.now().strftime('%Y-%m')
+        AcessoUsuario.objects.create(usuario=self.user, nivel='profissional', leads_limite_mensal=1000,
+                                     leads_consumidos_mes=120, mes_referencia=mes)
+        conceder_acesso(self.user, self.oferta, assinatura=self._assinatura('authorized'), motivo='renovação')
+
+        acesso = AcessoUsuario.objects.get(usuario=self.user)
+        self.assertEqual((acesso.leads_consumidos_mes, acesso.mes_referencia), (120, mes))
+
+    def test_log_e_append_only(self):
+        transicionar(self._assinatura('pending'), 'authorized')
+        log = TransicaoEstado.objects.get()
+        with self.assertRaises(ValueError):
+            log.save()
+
+
+class CotaMensalTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mes = timezone.now().strftime('%Y-%m')
+        cls.acessos = []
+        for i, (consumidos, mes) in enumerate([(40, '2000-01'), (7, '2000-01'), (3, cls.mes)]):
+            u = User.objects.create(username=f'cota{i}')
+            cls.acessos.append(AcessoUsuario.objects.create(
+                usuario=u, nivel='basico', leads_limite_mensal=100,
+                leads_consumidos_mes=consumidos, mes_referencia=mes,
+            ))
+
+    def test_virada_grava_historico_e_zera_com_um_update(self):
+        with CaptureQueriesContext(connection) as ctx:
+            viradas = virar_mes()
+
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(viradas, 2)
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            sorted(UsoMensalLeads.objects.values_list('mes_referencia', 'leads_consumidos', 'leads_limite')),
+            [('2000-01', 7, 100), ('2000-01', 40, 100)],
+        )
+        self.assertEqual(
+            sorted(AcessoUsuario.objects.values_list('mes_referencia', 'leads_consumidos_mes')),
+            [(self.mes, 0), (self.mes, 0), (self.mes, 3)],
+        )
+
+    def test_virada_idempotente(self):
+        virar_mes()
+        self.assertEqual(virar_mes(), 0)
+        self.assertEqual(UsoMensalLeads.objects.count(), 2)
+
+    def test_virada_para_mes_anterior_nao_volta_acessos(self):
+        self.assertEqual(virar_mes('2000-01'), 0)
+        self.assertEqual(UsoMensalLeads.objects.count(), 0)
+        acesso = AcessoUsuario.objects.get(pk=self.acessos[2].pk)
+        self.assertEqual((acesso.mes_referencia, acesso.leads_consumidos_mes), (self.mes, 3))
+
+        with self.assertRaisesMessage(CommandError, 'anterior ao mês atual'):
+            call_command('virar_mes_leads', mes='2000-01', stdout=StringIO())
+
+    def test_leitura_de_mes_antigo_nao_grava(self):
+        acesso = self.acessos[0]
+        with self.assertNumQueries(0):
+            self.assertTrue(acesso.tem_leads_disponiveis())
+        self.assertEqual(obter_direitos_usuario(acesso.usuario_id).leads_disponiveis(), 100)
+        acesso.refresh_from_db()
+        self.assertEqual(acesso.leads_consumidos_mes, 40)
+
+    def test_consumo_antes_da_virada_fecha_so_o_usuario(self):
+        self.assertEqual(registrar_consumo(self.acessos[0]), 1)
+        self.assertEqual(registrar_consumo(self.acessos[2], 2), 5)
+
+        fechados = UsoMensalLeads.objects.filter(mes_referencia='2000-01')
+        self.assertEqual(list(fechados.values_list('usuario_id', flat=True)), [self.acessos[0].usuario_id])
+        self.assertEqual(AcessoUsuario.objects.get(pk=self.acessos[1].pk).mes_referencia, '2000-01')
+
+    def test_consumo_grava_lancamento_e_soma_resumo(self):
+        acesso = self.acessos[2]
+        registrar_consumo(acesso, 4)
+        registrar_consumo(acesso, 6)
+
+        self.assertEqual(list(LancamentoUsoLeads.objects.order_by('pk').values_list('quantidade', flat=True)), [4, 6])
+        resumo = UsoMensalLeads.objects.get(usuario=acesso.usuario, mes_referencia=self.mes)
+        self.assertEqual((resumo.leads_consumidos, resumo.leads_limite, resumo.fechado_em), (13, 100, None))
+
+    def test_virada_fecha_resumo_existente(self):
+        UsoMensalLeads.objects.create(usuario=self.acessos[0].usuario, mes_referencia='2000-01', leads_consumidos=35)
+        virar_mes()
+
+        resumo = UsoMensalLeads.objects.get(usuario=self.acessos[0].usuario, mes_referencia='2000-01')
+        self.assertEqual((resumo.leads_consumidos, resumo.leads_limite), (40, 100))
+        self.assertIsNotNone(resumo.fechado_em)
+
+    def test_coletor_registra_consumo_em_lotes(self):
+        from crm.models import Coleta
+        from crm.services import places_collector
+
+        acesso = self.acessos[2]
+        coleta = Coleta.objects.create(usuario=acesso.usuario, keyword='padaria', cidade='Recife')
+        lugares = [{'id': f'place{i}'} for i in range(25)]
+        with override_settings(LEADS_LOTE_CONSUMO=10), \
+                mock.patch.object(places_collector, 'search_places_location', return_value=lugares), \
+                mock.patch.object(places_collector, 'get_place_details', return_value={'displayName': 'Lead'}), \
+                mock.patch.object(places_collector.time, 'sleep'), \
+                mock.patch('builtins.print'):
+            places_collector.run_coleta(coleta.pk)
+
+        self.assertEqual(
+            list(LancamentoUsoLeads.objects.filter(coleta=coleta).order_by('pk').values_list('quantidade', flat=True)),
+            [10, 10, 5],
+        )
+        acesso.refresh_from_db()
+        self.assertEqual(acesso.leads_consumidos_mes, 28)
+
+    def test_tendencia_e_ranking_leem_so_o_resumo(self):
+        virar_mes()
+        registrar_consumo(self.acessos[1], 9)
+        registrar_consumo(self.acessos[2], 1)
+
+        with self.assertNumQueries(1):
+            tendencia = tendencia_plataforma(quantidade=2)
+        self.assertEqual(tendencia[-1], {'mes': self.mes, 'consumidos': 13, 'usuarios': 2})
+        with self.assertNumQueries(1):
+            ranking = [uso.usuario.username for uso in maiores_consumidores()]
+        self.assertEqual(ranking, ['cota1', 'cota2'])
+        self.assertEqual(tendencia_usuario(self.acessos[0].usuario_id, quantidade=1), [{'mes': self.mes, 'consumidos': 0, 'limite': 0}])
+
+    def test_webhook_de_renovacao_nao_zera_cota(self):
+        acesso = self.acessos[2]
+        oferta = Oferta.objects.create(slug='basico_mensal', nome_exibicao='Básico', valor_centavos=11900)
+        assinatura = Assinatura.objects.create(usuario=acesso.usuario, oferta=oferta, status='authorized')
+        NotificacaoWebhook.objects.create(topico='payment', recurso_id='77')
+        pagamento = {'status': 200, 'response': {'id': 77, 'status': 'approved', 'external_reference': f'ass_{assinatura.id}'}}
+
+        with mock.patch.object(MercadoPagoServico, 'get_payment_info', return_value=pagamento):
+            processar_pendentes()
+
+        acesso.refresh_from_db()
+        self.assertEqual(acesso.leads_consumidos_mes, 3)
+
+    def test_relatorio_no_admin(self):
+        admin_user = User.objects.create_superuser('admin_uso', 'admin@example.com', 'senha')
+        registrar_consumo(self.acessos[2], 2)
+        self.client.force_login(admin_user)
+
+        resposta = self.client.get(reverse('admin:pagamentos_usomensalleads_changelist'))
+
+        self.assertContains(resposta, 'Maiores consumidores do mês')
+        self.assertEqual(resposta.context['maiores_consumidores'][0].usuario_id, self.acessos[2].usuario_id)
+
+
+class OrcamentoViewsPagamentosTest(OrcamentoViewsMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for slug, valor in (('basico_mensal', 11900), ('profissional_mensal', 24900), ('enterprise_mensal', 49900)):
+            Oferta.objects.create(slug=slug, nome_exibicao=slug, valor_centavos=valor, leads_mensais=100)
+        cls.usuario = criar_assinante()
+
+    def test_planos(self):
+        self.client.force_login(self.usuario)
+        self.assertDentroDoOrcamento('planos')
+
+    def test_plataforma_inicio(self):
+        self.client.force_login(self.usuario)
+        self.assertDentroDoOrcamento('plataforma_inicio')
+
+    def test_webhook_so_grava_a_notificacao(self):
+        medicao = self.assertDentroDoOrcamento(
+            'mercadopago_webhook', metodo='post', data='{}', content_type='application/json',
+            QUERY_STRING='topic=payment&id=123',
+        )
+        self.assertEqual(medicao.resposta.status_code, 200)
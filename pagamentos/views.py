@@ -3,23 +3,27 @@ Views do aplicativo de pagamentos.
 Todas em português com lógica de negócio clara e comentada.
 """
 import logging
-import json
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.http import HttpResponse, JsonResponse
-from django.conf import settings
 from django.db import transaction
-from django.utils import timezone
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import login, logout
 
-from .models import Oferta, Compra, Assinatura, AcessoUsuario, EventoMercadoPago
+from .models import Oferta, Compra, Assinatura
 from .servicos.mercadopago_servico import MercadoPagoServico
 from .decoradores_acesso import exigir_assinante_ativo
+from .contexto_acesso import obter_acesso
 from .forms import CadastroUsuarioForm
+from .servicos.catalogo_planos import obter_catalogo_planos, versao_catalogo
+from .servicos.webhook_inbox import registrar_notificacao
+from .servicos.checkout_assinatura import obter_link_checkout
+from .servicos.estados_assinatura import conceder_acesso, transicionar
+from .servicos.uso_leads import tendencia_usuario
+from web.cache_pagina import cache_pagina_anonima
 
 logger = logging.getLogger(__name__)
 
@@ -94,43 +98,23 @@ def logout_view(request):
     return redirect('pagina_inicial')
 
 
-def _agrupar_planos(ofertas):
-    """Agrupa ofertas por plano base (basico, profissional, enterprise)."""
-    planos = {}
-    for o in ofertas:
-        base = o.slug_base()
-        if base not in planos:
-            nomes = {'basico': 'Básico', 'profissional': 'Profissional', 'enterprise': 'Enterprise'}
-            planos[base] = {'nome': nomes.get(base, base.title()), 'mensal': None, 'anual': None}
-        if o.periodicidade == 'mensal':
-            planos[base]['mensal'] = o
-        else:
-            planos[base]['anual'] = o
-    return list(planos.values())
-
-
 def inicio(request):
     """
     Página de planos com os 3 planos (Básico, Profissional, Enterprise)
     cada um com opção mensal e anual.
+    O catálogo vem do cache; visitantes anônimos recebem a página inteira do cache (ver planos).
     """
-    ofertas = Oferta.objects.filter(ativo=True).exclude(slug='ouro').order_by('valor_centavos')
-    planos = _agrupar_planos(ofertas)
-    
-    acesso_atual = None
-    if request.user.is_authenticated:
-        try:
-            acesso_atual = request.user.acesso
-        except AcessoUsuario.DoesNotExist:
-            pass
+    acesso_atual = obter_acesso(request) if request.user.is_authenticated else None
     
     context = {
-        'planos': planos,
+        'planos': obter_catalogo_planos(),
+        'versao_catalogo': versao_catalogo(),
         'acesso_atual': acesso_atual,
     }
     return render(request, 'pagamentos/inicio.html', context)
 
 
+@cache_pagina_anonima('planos', versao=versao_catalogo)
 def planos(request):
     """
     Página de planos (mesma que início, mas com URL diferente).
@@ -156,8 +140,8 @@ def confirmar_plano(request, oferta_id):
     oferta = get_object_or_404(Oferta, id=oferta_id, ativo=True)
     
     # Verificar se usuário já tem este plano ou superior
-    try:
-        acesso = request.user.acesso
+    acesso = obter_acesso(request)
+    if acesso is not None:
         nivel_atual = Oferta.obter_nivel_numerico(acesso.nivel)
         nivel_novo = Oferta.obter_nivel_numerico(oferta.slug)
         
@@ -167,8 +151,6 @@ def confirmar_plano(request, oferta_id):
                 f"Você já possui o plano {_nivel_display(acesso.nivel)} ou superior."
             )
             return redirect('plataforma_inicio')
-    except AcessoUsuario.DoesNotExist:
-        pass
     
     context = {
         'oferta': oferta,
@@ -180,35 +162,16 @@ def confirmar_plano(request, oferta_id):
 def criar_checkout(request, oferta_id):
     """
     Cria uma assinatura no Mercado Pago (preapproval) e redireciona o usuário.
+    Um checkout pendente recente do mesmo usuário/oferta é reaproveitado sem nova chamada.
     Permite GET para facilitar redirecionamentos diretos após cadastro/login.
     """
     oferta = get_object_or_404(Oferta, id=oferta_id, ativo=True)
     
     try:
-        # Criar registro de assinatura
-        assinatura = Assinatura.objects.create(
-            usuario=request.user,
-            oferta=oferta,
-            status='pendente'
-        )
-        
-        # Criar preapproval no Mercado Pago (API de assinaturas)
-        preapproval = MercadoPagoServico.criar_preapproval(
-            assinatura=assinatura,
-            oferta=oferta,
-            dominio_base=settings.DOMINIO_BASE
-        )
-        
-        # Salvar ID do preapproval
-        assinatura.mercadopago_preapproval_id = preapproval.get('id', '')
-        assinatura.save()
-        
-        logger.info(f"Checkout assinatura criado: Assinatura {assinatura.id}, Preapproval {assinatura.mercadopago_preapproval_id}")
+        # Reaproveita um checkout pendente recente ou cria a assinatura + preapproval
+        init_point = obter_link_checkout(request.user, oferta)
         
         # Redirecionar para checkout de assinaturas do Mercado Pago
-        init_point = preapproval.get('init_point')
-        if not init_point:
-            raise Exception("Mercado Pago não retornou init_point")
         return redirect(init_point)
         
     except Exception as e:
@@ -301,112 +264,18 @@ def pagamento_pendente(request):
 def mercadopago_webhook(request):
     """
     Endpoint para receber webhooks do Mercado Pago.
-    Trata: payment (pagamentos), subscription_preapproval (assinaturas).
+    Apenas grava a notificação na caixa de entrada e responde 200; o processamento
+    (payment, subscription_preapproval) é feito pelo comando processar_webhooks.
     """
     try:
-        topic = request.GET.get('topic') or request.GET.get('type')
-        id_param = request.GET.get('id') or request.GET.get('data.id')
-        
-        if not id_param:
-            try:
-                data = json.loads(request.body)
-                topic = data.get('type')
-                id_param = data.get('data', {}).get('id')
-            except Exception:
-                pass
-
-        logger.info(f"Webhook recebido: Topic={topic}, ID={id_param}")
-
-        # Assinatura: subscription_preapproval
-        if topic == 'subscription_preapproval' and id_param:
-            event_id = f"sub_preapproval_{id_param}"
-            if EventoMercadoPago.objects.filter(event_id=event_id).exists():
-                logger.info(f"Evento {event_id} já processado.")
-                return HttpResponse(status=200)
-            
-            info = MercadoPagoServico.get_preapproval_info(id_param)
-            if info and info.get('status') in ('authorized', 'pending'):
-                try:
-                    assinatura = Assinatura.objects.get(mercadopago_preapproval_id=id_param)
-                    if assinatura.status not in ('authorized', 'pending'):
-                        finalizar_assinatura(assinatura)
-                        EventoMercadoPago.objects.create(
-                            event_id=event_id,
-                            tipo=topic or 'subscription_preapproval',
-                            dados_json=json.dumps(info)
-                        )
-                        logger.info(f"Assinatura {assinatura.id} confirmada via Webhook")
-                    else:
-                        EventoMercadoPago.objects.get_or_create(
-                            event_id=event_id,
-                            defaults={'tipo': topic or 'subscription_preapproval', 'dados_json': json.dumps(info)}
-                        )
-                except Assinatura.DoesNotExist:
-                    logger.error(f"Assinatura preapproval_id={id_param} não encontrada")
-
-        # Pagamento: payment (legado ou cobrança recorrente de assinatura)
-        if topic == 'payment' and id_param:
-            payment_info = MercadoPagoServico.get_payment_info(id_param)
-            if payment_info.get("status") != 200:
-                return HttpResponse(status=200)
-            
-            payment = payment_info.get("response") or {}
-            external_reference = payment.get("external_reference")
-            status = payment.get("status")
-            event_id = f"payment_{id_param}_{status}"
-            
-            if EventoMercadoPago.objects.filter(event_id=event_id).exists():
-                logger.info(f"Evento {event_id} já processado.")
-                return HttpResponse(status=200)
-
-            if external_reference and status == 'approved':
-                # Assinatura: external_reference = "ass_123"
-                if str(external_reference).startswith('ass_'):
-                    try:
-                        ass_id = int(external_reference.replace('ass_', ''))
-                        assinatura = Assinatura.objects.get(id=ass_id)
-                        if assinatura.status not in ('authorized', 'pending'):
-                            finalizar_assinatura(assinatura)
-                        EventoMercadoPago.objects.get_or_create(
-                            event_id=event_id,
-                            defaults={'tipo': topic or 'payment', 'dados_json': json.dumps(payment)}
-                        )
-                        # Renovação mensal: reset leads_consumidos_mes
-                        try:
-                            acesso = assinatura.usuario.acesso
-                            acesso.leads_consumidos_mes = 0
-                            acesso.mes_referencia = timezone.now().strftime('%Y-%m')
-                            acesso.save()
-                        except AcessoUsuario.DoesNotExist:
-                            pass
-                    except (ValueError, Assinatura.DoesNotExist):
-                        logger.error(f"Assinatura ref {external_reference} não encontrada")
-                else:
-                    # Fluxo legado: Compra
-                    try:
-                        compra = Compra.objects.get(id=external_reference)
-                        if compra.status != 'paga':
-                            finalizar_compra(compra, str(payment['id']))
-                            EventoMercadoPago.objects.create(
-                                event_id=event_id,
-                                tipo=topic or 'payment',
-                                dados_json=json.dumps(payment)
-                            )
-                            logger.info(f"Compra {compra.id} confirmada via Webhook")
-                        else:
-                            EventoMercadoPago.objects.get_or_create(
-                                event_id=event_id,
-                                defaults={'tipo': topic or 'payment', 'dados_json': json.dumps(payment)}
-                            )
-                    except Compra.DoesNotExist:
-                        logger.error(f"Compra {external_reference} não encontrada no webhook")
-            
-        return HttpResponse(status=200)
-
+        notificacao = registrar_notificacao(request)
     except Exception as e:
-        logger.error(f"Erro no webhook: {str(e)}")
+        logger.error(f"Erro ao registrar webhook: {str(e)}")
         return HttpResponse(status=500)
 
+    logger.info(f"Webhook recebido: Topic={notificacao.topico}, ID={notificacao.recurso_id}")
+    return HttpResponse(status=200)
+
 
 @transaction.atomic
 def finalizar_compra(compra, payment_id):
@@ -415,7 +284,7 @@ def finalizar_compra(compra, payment_id):
     """
     compra.status = 'paga'
     compra.mercadopago_payment_id = payment_id
-    compra.save()
+    compra.save(update_fields=['status', 'mercadopago_payment_id', 'atualizado_em'])
     
     conceder_acesso_por_compra(compra)
     
@@ -427,8 +296,7 @@ def finalizar_assinatura(assinatura):
     """
     Finaliza a assinatura, marca como autorizada e concede acesso.
     """
-    assinatura.status = 'authorized'
-    assinatura.save()
+    transicionar(assinatura, 'authorized', motivo='pagamento confirmado')
     
     conceder_acesso_por_assinatura(assinatura)
     
@@ -439,67 +307,20 @@ def conceder_acesso_por_compra(compra):
     """
     Concede ou atualiza o acesso do usuário ao plano (fluxo legado - compra única).
     """
-    usuario = compra.usuario
-    novo_nivel = compra.oferta.slug_base()
-    leads_limite = compra.oferta.leads_mensais or 0
-    
-    acesso, criado = AcessoUsuario.objects.get_or_create(
-        usuario=usuario,
-        defaults={
-            'nivel': novo_nivel,
-            'status': 'ativo',
-            'leads_limite_mensal': leads_limite,
-            'leads_consumidos_mes': 0,
-            'mes_referencia': timezone.now().strftime('%Y-%m'),
-            'ultima_compra': compra,
-        }
-    )
-    
-    if not criado:
-        acesso.nivel = novo_nivel
-        acesso.status = 'ativo'
-        acesso.leads_limite_mensal = leads_limite
-        acesso.leads_consumidos_mes = 0
-        acesso.mes_referencia = timezone.now().strftime('%Y-%m')
-        acesso.ultima_compra = compra
-        acesso.ultima_assinatura = None
-        acesso.save()
+    acesso = conceder_acesso(compra.usuario, compra.oferta, compra=compra,
+                             motivo=f'compra #{compra.pk} paga')
     
-    logger.info(f"Acesso concedido/atualizado para {usuario.username}: {novo_nivel}")
+    logger.info(f"Acesso concedido/atualizado para {compra.usuario.username}: {acesso.nivel}")
 
 
 def conceder_acesso_por_assinatura(assinatura):
     """
     Concede ou atualiza o acesso do usuário ao plano (fluxo de assinatura recorrente).
     """
-    usuario = assinatura.usuario
-    oferta = assinatura.oferta
-    novo_nivel = oferta.slug_base()
-    leads_limite = oferta.leads_mensais or 0
+    acesso = conceder_acesso(assinatura.usuario, assinatura.oferta, assinatura=assinatura,
+                             motivo=f'assinatura #{assinatura.pk} autorizada')
     
-    acesso, criado = AcessoUsuario.objects.get_or_create(
-        usuario=usuario,
-        defaults={
-            'nivel': novo_nivel,
-            'status': 'ativo',
-            'leads_limite_mensal': leads_limite,
-            'leads_consumidos_mes': 0,
-            'mes_referencia': timezone.now().strftime('%Y-%m'),
-            'ultima_assinatura': assinatura,
-        }
-    )
-    
-    if not criado:
-        acesso.nivel = novo_nivel
-        acesso.status = 'ativo'
-        acesso.leads_limite_mensal = leads_limite
-        acesso.leads_consumidos_mes = 0
-        acesso.mes_referencia = timezone.now().strftime('%Y-%m')
-        acesso.ultima_assinatura = assinatura
-        acesso.ultima_compra = None
-        acesso.save()
-    
-    logger.info(f"Acesso assinatura concedido/atualizado para {usuario.username}: {novo_nivel} ({leads_limite} leads/mes)")
+    logger.info(f"Acesso assinatura concedido/atualizado para {assinatura.usuario.username}: {acesso.nivel} ({acesso.leads_limite_mensal} leads/mes)")
 
 
 # ============== VIEWS DAS PÁGINAS PROTEGIDAS ==============
@@ -509,14 +330,11 @@ def plataforma_inicio(request):
     """
     Página inicial da plataforma (requer estar logado, mas não requer plano específico).
     """
-    acesso = None
-    try:
-        acesso = request.user.acesso
-    except AcessoUsuario.DoesNotExist:
-        pass
+    acesso = obter_acesso(request)
     
     context = {
         'acesso': acesso,
+        'uso_leads': tendencia_usuario(request.user.pk) if acesso else [],
     }
     return render(request, 'app/plataforma/inicio.html', context)
 
@@ -1,3 +1,63 @@
-from django.test import TestCase
+"""
+Testes da página inicial.
+Cobre o cache do catálogo de planos e o cache de página para visitantes anônimos.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from pagamentos.models import Oferta
+from pagamentos.servicos.catalogo_planos import ALIAS_CACHE_VERSAO, CHAVE_VERSAO
+
+MIDDLEWARE_SEM_VISITOR = [m for m in settings.MIDDLEWARE if m != 'dados_acesso.middleware.VisitorMiddleware']
+
+
+@override_settings(MIDDLEWARE=MIDDLEWARE_SEM_VISITOR)
+class CatalogoPlanosCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.oferta = Oferta.objects.create(
+            slug='basico_mensal', nome_exibicao='Básico - Mensal', valor_centavos=11900,
+            leads_mensais=300, periodicidade='mensal',
+        )
+
+    def setUp(self):
+        cache.clear()
+        caches[ALIAS_CACHE_VERSAO].clear()
+
+    def test_anonimo_recebe_pagina_do_cache_sem_consultas(self):
+        for nome in ('pagina_inicial', 'planos'):
+            with self.subTest(pagina=nome):
+                self.assertContains(self.client.get(reverse(nome)), '119.00')
+                with self.assertNumQueries(0):
+                    response = self.client.get(reverse(nome))
+                self.assertContains(response, '119.00')
+
+    def test_salvar_oferta_invalida_catalogo_e_paginas(self):
+        self.client.get(reverse('pagina_inicial'))
+
+        self.oferta.valor_centavos = 12900
+        self.oferta.save()
+
+        response = self.client.get(reverse('pagina_inicial'))
+        self.assertContains(response, '129.00')
+        self.assertNotContains(response, '119.00')
+
+    def test_versao_no_cache_compartilhado_invalida_copias_locais(self):
+        self.client.get(reverse('planos'))
+
+        # Outro worker salvou a Oferta: aqui só chega a versão nova, pelo cache 'catalogo'
+        Oferta.objects.filter(pk=self.oferta.pk).update(valor_centavos=12900)
+        caches[ALIAS_CACHE_VERSAO].set(CHAVE_VERSAO, 1, None)
+
+        self.assertContains(self.client.get(reverse('planos')), '129.00')
+
+    def test_logado_renderiza_fragmentos_do_usuario(self):
+        user = User.objects.create_user('logado@exemplo.com', password='x')
+        self.client.get(reverse('planos'))  # aquece o cache anônimo
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('planos'))
+        self.assertContains(response, reverse('confirmar_plano', args=[self.oferta.id]))
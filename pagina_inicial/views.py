@@ -1,16 +1,16 @@
 from django.shortcuts import render
-from pagamentos.models import Oferta
-from pagamentos.views import _agrupar_planos
+from pagamentos.servicos.catalogo_planos import obter_catalogo_planos, versao_catalogo
+from web.cache_pagina import cache_pagina_anonima
 
 
+@cache_pagina_anonima('pagina_inicial', versao=versao_catalogo)
 def pagina_inicial(request):
-    ofertas = Oferta.objects.filter(ativo=True).exclude(slug='ouro').order_by('valor_centavos')
-    planos = _agrupar_planos(ofertas)
     return render(
         request=request,
         template_name='site/index.html',
         context={
-            'planos': planos,
+            'planos': obter_catalogo_planos(),
+            'versao_catalogo': versao_catalogo(),
         }
     )
 
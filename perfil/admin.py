@@ -1,7 +1,14 @@
 from import_export import resources
 from import_export.admin import ImportExportModelAdmin
+from django import forms
 from django.contrib import admin
+from web.import_export_lotes import ExportacaoStreamingMixin
+from web.sincronizacao_m2m import sincronizar_ligacoes
+from .analise import painel
+from .forms import LIGACOES_PERFIL
+from .segmentos import catalogo_segmentos
 from .models import (
+    AgregadoPerfil,
     PerfilEmpresa,
     CanalAquisicaoCliente,
     SistemaUtilizado,
@@ -32,6 +39,10 @@ class PerfilEmpresaResource(resources.ModelResource):
             "criado_em", "atualizado_em",
         )
         export_order = fields
+        chunk_size = 2000
+
+    def filter_export(self, queryset, **kwargs):
+        return queryset.select_related('usuario')
 
 
 class CanalAquisicaoClienteResource(resources.ModelResource):
@@ -83,13 +94,14 @@ class RestricoesInline(admin.TabularInline):
 
 
 @admin.register(PerfilEmpresa)
-class PerfilEmpresaAdmin(ImportExportModelAdmin):
+class PerfilEmpresaAdmin(ExportacaoStreamingMixin, ImportExportModelAdmin):
     resource_class = PerfilEmpresaResource
     list_display = (
         "nome_empresa",
         "usuario",
         "cargo",
         "setor_atuacao",
+        "segmento",
         "fase_negocio",
         "criado_em",
     )
@@ -102,6 +114,18 @@ class PerfilEmpresaAdmin(ImportExportModelAdmin):
         RestricoesInline,
     ]
 
+    @admin.display(description="Segmento", ordering="segmento_especifico")
+    def segmento(self, obj):
+        return catalogo_segmentos().rotulo(obj.segmento_especifico, obj.segmento_especifico)
+
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        if db_field.name == "segmento_especifico":
+            # Todos os segmentos agrupados por setor, pré-montados no catálogo
+            return forms.ChoiceField(
+                label=db_field.verbose_name, choices=catalogo_segmentos().agrupadas, help_text=db_field.help_text,
+            )
+        return super().formfield_for_dbfield(db_field, request, **kwargs)
+
     fieldsets = (
         ("Identificação", {
             "fields": ("usuario", "nome_empresa", "cargo", "cargo_outro", "setor_atuacao", "setor_outro", "segmento_especifico")
@@ -138,6 +162,25 @@ class PerfilEmpresaAdmin(ImportExportModelAdmin):
 
     readonly_fields = ("criado_em", "atualizado_em")
 
+    def save_formset(self, request, form, formset, change):
+        """
+        Inlines das tabelas de ligação: grava pela diferença (um DELETE e um
+        bulk_create) em vez de salvar/apagar linha a linha.
+        """
+        campos_alvo = {modelo: campo_alvo for modelo, campo_alvo in LIGACOES_PERFIL.values()}
+        campo_alvo = campos_alvo.get(formset.model)
+        if campo_alvo is None:
+            return super().save_formset(request, form, formset, change)
+
+        alvos = [
+            f.cleaned_data[campo_alvo]
+            for f in formset.forms
+            if f.cleaned_data.get(campo_alvo) and not f.cleaned_data.get('DELETE')
+        ]
+        sincronizar_ligacoes(formset.model, form.instance, 'perfil_empresa', campo_alvo, alvos)
+        # Usados pelo log de alterações do admin (construct_change_message)
+        formset.new_objects, formset.changed_objects, formset.deleted_objects = [], [], []
+
 
 @admin.register(CanalAquisicaoCliente)
 class CanalAquisicaoClienteAdmin(ImportExportModelAdmin):
@@ -161,3 +204,25 @@ class ObjetivoProximo12MesesAdmin(ImportExportModelAdmin):
 class RestricaoCriticaAdmin(ImportExportModelAdmin):
     resource_class = RestricaoCriticaResource
     search_fields = ("nome",)
+
+
+@admin.register(AgregadoPerfil)
+class AgregadoPerfilAdmin(admin.ModelAdmin):
+    """
+    Painel de análise dos perfis (distribuições por setor, fase, faturamento, canais,
+    objetivos e completude), lido só dos agregados materializados.
+    """
+    list_display = ("dimensao", "valor", "total", "atualizado_em")
+    list_filter = ("dimensao",)
+    readonly_fields = [f.name for f in AgregadoPerfil._meta.fields]
+    change_list_template = "admin/perfil/agregadoperfil/change_list.html"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {**(extra_context or {}), "analise": painel()}
+        return super().changelist_view(request, extra_context=extra_context)
@@ -0,0 +1,208 @@
+"""
+Análise dos perfis das empresas sobre agregados materializados.
+
+O painel do admin mostra a distribuição de setor, fase, faturamento, canais, objetivos e
+completude entre os perfis. Em vez de GROUP BY sobre PerfilEmpresa e as tabelas de
+ligação a cada acesso, as contagens ficam em AgregadoPerfil (uma linha por dimensão e
+valor):
+- atualizar_perfil(perfil_id): incremental. Calcula as chaves "dimensao:valor" do perfil,
+  compara com as gravadas em AnalisePerfil e aplica só a diferença (+1/-1 com F()).
+  Roda no on_commit do post_save do perfil (ver perfil/signals.py), depois que as
+  ligações N:N do formulário/admin já foram gravadas;
+- remover_chaves(chaves): desconta as chaves de um perfil excluído (post_delete da
+  AnalisePerfil, apagada em cascata com o perfil);
+- reconstruir(): recalcula tudo (comando atualizar_analise_perfis, agendado), corrigindo
+  qualquer deriva — ex.: ligações alteradas por fora do formulário.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .catalogo_opcoes import obter_opcoes
+from .models import AgregadoPerfil, AnalisePerfil, CanalAquisicaoCliente, ObjetivoProximo12Meses, PerfilEmpresa
+
+Dimensao = AgregadoPerfil.Dimensao
+
+# Mesmos campos da barra de progresso da página do perfil
+CAMPOS_COMPLETUDE = (
+    'nome_empresa', 'cargo', 'setor_atuacao', 'segmento_especifico',
+    'fase_negocio', 'faixa_ano_fundacao', 'faixa_funcionarios',
+    'decisao_estrategica', 'responsavel_tecnologia_processos',
+    'regime_tributario', 'faturamento_anual_aproximado', 'orcamento_anual_ti',
+    'modelo_negocio', 'tipo_receita_predominante', 'ticket_medio_venda',
+    'principal_canal_vendas', 'estrutura_operacional', 'quantidade_unidades',
+    'pais', 'estado', 'cidade', 'possui_equipe_ti_dados',
+    'alfabetizacao_digital_equipe', 'abrangencia_geografica',
+    'ferramentas_gestao', 'residencia_dados', 'prioridade_estrategica_ano',
+    'conformidade_lgpd', 'preferencia_entrega_recomendacoes',
+    'sazonalidade_negocio',
+)
+
+# Faixas de completude: (limite inferior em %, valor gravado)
+FAIXAS_COMPLETUDE = ((100, '100'), (75, '75-99'), (50, '50-74'), (25, '25-49'), (0, '0-24'))
+
+TAMANHO_LOTE = 500
+
+
+def completude(perfil):
+    """Percentual (0-100) de CAMPOS_COMPLETUDE preenchidos no perfil."""
+    preenchidos = sum(1 for campo in CAMPOS_COMPLETUDE if str(getattr(perfil, campo) or '').strip())
+    return round(preenchidos * 100 / len(CAMPOS_COMPLETUDE))
+
+
+def faixa_completude(percentual):
+    return next(faixa for minimo, faixa in FAIXAS_COMPLETUDE if percentual >= minimo)
+
+
+def chaves_perfil(perfil, canais_ids, objetivos_ids, percentual):
+    """Chaves "dimensao:valor" com que o perfil conta nos agregados (ordenadas)."""
+    chaves = {
+        f'{Dimensao.SETOR}:{perfil.setor_atuacao}',
+        f'{Dimensao.FASE}:{perfil.fase_negocio}',
+        f'{Dimensao.FATURAMENTO}:{perfil.faturamento_anual_aproximado}',
+        f'{Dimensao.COMPLETUDE}:{faixa_completude(percentual)}',
+    }
+    chaves.update(f'{Dimensao.CANAL}:{pk}' for pk in canais_ids)
+    chaves.update(f'{Dimensao.OBJETIVO}:{pk}' for pk in objetivos_ids)
+    return sorted(chaves)
+
+
+def _aplicar(variacoes):
+    """Soma as variações {chave: delta} em AgregadoPerfil, criando as linhas que faltarem."""
+    variacoes = {chave: delta for chave, delta in variacoes.items() if delta}
+    if not variacoes:
+        return
+    AgregadoPerfil.objects.bulk_create(
+        [AgregadoPerfil(dimensao=chave.split(':', 1)[0], valor=chave.split(':', 1)[1]) for chave in variacoes],
+        ignore_conflicts=True,
+    )
+    agora = timezone.now()
+    for chave, delta in variacoes.items():
+        dimensao, valor = chave.split(':', 1)
+        AgregadoPerfil.objects.filter(dimensao=dimensao, valor=valor).update(
+            total=F('total') + delta, atualizado_em=agora,
+        )
+
+
+def atualizar_perfil(perfil_id):
+    """Aplica nos agregados a diferença entre as chaves atuais do perfil e as já contadas."""
+    with transaction.atomic():
+        # O lock no perfil serializa atualizações concorrentes do mesmo perfil
+        perfil = PerfilEmpresa.objects.select_for_update().filter(pk=perfil_id).first()
+        if perfil is None:
+            return
+        percentual = completude(perfil)
+        novas = chaves_perfil(
+            perfil,
+            perfil.canais_aquisicao.values_list('canal_aquisicao_id', flat=True),
+            perfil.objetivos_12_meses.values_list('objetivo_id', flat=True),
+            percentual,
+        )
+        registro = AnalisePerfil.objects.filter(perfil_empresa_id=perfil_id).first()
+        antigas = set(registro.chaves) if registro else set()
+        if registro and set(novas) == antigas and registro.completude == percentual:
+            return
+
+        variacoes = Counter({chave: 1 for chave in set(novas) - antigas})
+        variacoes.subtract({chave: 1 for chave in antigas - set(novas)})
+        _aplicar(variacoes)
+        AnalisePerfil.objects.update_or_create(
+            perfil_empresa_id=perfil_id, defaults={'chaves': novas, 'completude': percentual},
+        )
+
+
+def remover_chaves(chaves):
+    """Desconta dos agregados as chaves de um perfil excluído."""
+    _aplicar({chave: -1 for chave in chaves or ()})
+
+
+def reconstruir(tamanho_lote=TAMANHO_LOTE):
+    """Recalcula todos os agregados e a análise de cada perfil. Retorna quantos perfis contou."""
+    contagem = Counter()
+    perfis = (
+        PerfilEmpresa.objects.order_by('pk')
+        .prefetch_related('canais_aquisicao', 'objetivos_12_meses')
+    )
+
+    def gravar(lote):
+        AnalisePerfil.objects.bulk_create(
+            lote, update_conflicts=True, unique_fields=['perfil_empresa'],
+            update_fields=['chaves', 'completude', 'atualizado_em'],
+        )
+
+    with transaction.atomic():
+        total = 0
+        lote = []
+        for perfil in perfis.iterator(chunk_size=tamanho_lote):
+            percentual = completude(perfil)
+            chaves = chaves_perfil(
+                perfil,
+                [ligacao.canal_aquisicao_id for ligacao in perfil.canais_aquisicao.all()],
+                [ligacao.objetivo_id for ligacao in perfil.objetivos_12_meses.all()],
+                percentual,
+            )
+            contagem.update(chaves)
+            lote.append(AnalisePerfil(perfil_empresa_id=perfil.pk, chaves=chaves, completude=percentual))
+            total += 1
+            if len(lote) >= tamanho_lote:
+                gravar(lote)
+                lote = []
+        if lote:
+            gravar(lote)
+
+        AgregadoPerfil.objects.all().delete()
+        AgregadoPerfil.objects.bulk_create([
+            AgregadoPerfil(dimensao=chave.split(':', 1)[0], valor=chave.split(':', 1)[1], total=n)
+            for chave, n in sorted(contagem.items())
+        ], batch_size=tamanho_lote)
+    return total
+
+
+def _rotulos(dimensao):
+    """Rótulo de cada valor gravado na dimensão (choices do modelo ou catálogo de opções)."""
+    if dimensao == Dimensao.CANAL:
+        return {str(pk): nome for pk, nome in obter_opcoes(CanalAquisicaoCliente)}
+    if dimensao == Dimensao.OBJETIVO:
+        return {str(pk): nome for pk, nome in obter_opcoes(ObjetivoProximo12Meses)}
+    if dimensao == Dimensao.COMPLETUDE:
+        return {faixa: f'{faixa}%' for _, faixa in FAIXAS_COMPLETUDE}
+    campo = {
+        Dimensao.SETOR: 'setor_atuacao',
+        Dimensao.FASE: 'fase_negocio',
+        Dimensao.FATURAMENTO: 'faturamento_anual_aproximado',
+    }[dimensao]
+    return dict(PerfilEmpresa._meta.get_field(campo).flatchoices)
+
+
+def painel():
+    """
+    Distribuições para o painel, lidas só de AgregadoPerfil (uma consulta):
+    {'total': perfis, 'dimensoes': [{'nome', 'linhas': [{'rotulo', 'total', 'percentual'}]}]}.
+    Canais e objetivos são de múltipla escolha: os percentuais não somam 100%.
+    """
+    por_dimensao = {}
+    for dimensao, valor, total in (
+        AgregadoPerfil.objects.filter(total__gt=0).order_by('dimensao', '-total', 'valor')
+        .values_list('dimensao', 'valor', 'total')
+    ):
+        por_dimensao.setdefault(dimensao, []).append((valor, total))
+
+    # Todo perfil conta em exatamente uma faixa de completude
+    total_perfis = sum(total for _, total in por_dimensao.get(Dimensao.COMPLETUDE, ()))
+    dimensoes = []
+    for dimensao, nome in Dimensao.choices:
+        rotulos = _rotulos(dimensao)
+        dimensoes.append({
+            'nome': nome,
+            'linhas': [
+                {
+                    'rotulo': rotulos.get(valor, valor) if valor else 'Não informado',
+                    'total': total,
+                    'percentual': round(total * 100 / total_perfis, 1) if total_perfis else 0,
+                }
+                for valor, total in por_dimensao.get(dimensao, ())
+            ],
+        })
+    return {'total': total_perfis, 'dimensoes': dimensoes}
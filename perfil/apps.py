@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class PerfilConfig(AppConfig):
     name = 'perfil'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .segmentos import asset_segmentos
+
+        # Compila o asset de setores/segmentos na subida do processo, fora da primeira requisição
+        asset_segmentos()
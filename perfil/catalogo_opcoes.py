@@ -0,0 +1,93 @@
+"""
+Catálogo de opções de múltipla escolha do perfil (canais, sistemas, objetivos, restrições).
+
+As quatro tabelas de apoio quase nunca mudam, mas cada renderização do formulário
+consultava todas elas. As opções ficam em memória no processo, sob a versão guardada
+no cache 'catalogo'; salvar/excluir uma opção troca a versão (ver perfil/signals.py).
+A troca só alcança os outros workers se 'catalogo' usar um backend compartilhado
+(CATALOGO_CACHE_BACKEND em settings); com o locmem padrão, eles recarregam quando a
+entrada em memória expira (CATALOGO_OPCOES_TTL).
+
+MultiplaEscolhaCatalogo é o ModelMultipleChoiceField do PerfilEmpresaForm: gera as opções
+a partir do catálogo em memória. A validação do POST continua usando o queryset.
+"""
+import threading
+import time
+
+from django import forms
+from django.conf import settings
+from django.core.cache import caches
+from django.forms.models import ModelChoiceIterator, ModelChoiceIteratorValue
+
+CHAVE_VERSAO = 'catalogo_opcoes_perfil:versao'
+ALIAS_CACHE_VERSAO = 'catalogo'
+
+# (label do modelo, versão) -> ([(pk, nome), ...], carregado_em em time.monotonic())
+_opcoes_processo = {}
+_trava = threading.Lock()
+
+
+def _ttl():
+    return getattr(settings, 'CATALOGO_OPCOES_TTL', 600)
+
+
+def versao_catalogo():
+    """
+    Versão atual do catálogo de opções, no cache 'catalogo'. Só é compartilhada entre
+    processos se esse cache usar um backend compartilhado.
+    """
+    versoes = caches[ALIAS_CACHE_VERSAO]
+    versao = versoes.get(CHAVE_VERSAO)
+    if versao is None:
+        versao = time.time_ns()
+        versoes.add(CHAVE_VERSAO, versao, None)
+        versao = versoes.get(CHAVE_VERSAO, versao)
+    return versao
+
+
+def obter_opcoes(modelo):
+    """
+    Lista (pk, nome) das opções de `modelo`, consultando o banco só quando a versão
+    muda ou a entrada em memória expira.
+    """
+    chave = (modelo._meta.label, versao_catalogo())
+    agora = time.monotonic()
+    entrada = _opcoes_processo.get(chave)
+    if entrada is not None and agora - entrada[1] < _ttl():
+        return entrada[0]
+
+    opcoes = list(modelo.objects.order_by('pk').values_list('pk', 'nome'))
+    with _trava:
+        # Versões antigas do mesmo modelo não serão lidas de novo
+        for antiga in [c for c in _opcoes_processo if c[0] == chave[0]]:
+            del _opcoes_processo[antiga]
+        _opcoes_processo[chave] = (opcoes, agora)
+    return opcoes
+
+
+def invalidar_catalogo_opcoes():
+    """
+    Troca a versão: este processo recarrega na próxima leitura; os demais também, se o
+    cache 'catalogo' for compartilhado, ou quando suas entradas expirarem.
+    """
+    caches[ALIAS_CACHE_VERSAO].set(CHAVE_VERSAO, time.time_ns(), None)
+
+
+class ChoicesCatalogo(ModelChoiceIterator):
+    """Iterator de ModelChoiceField que lê as opções do catálogo em memória."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for pk, nome in obter_opcoes(self.queryset.model):
+            yield (ModelChoiceIteratorValue(pk, None), nome)
+
+    def __len__(self):
+        return len(obter_opcoes(self.queryset.model)) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(obter_opcoes(self.queryset.model))
+
+
+class MultiplaEscolhaCatalogo(forms.ModelMultipleChoiceField):
+    iterator = ChoicesCatalogo
@@ -1,4 +1,8 @@
 from django import forms
+from django.db import transaction
+
+from web.sincronizacao_m2m import sincronizar_ligacoes
+from .catalogo_opcoes import MultiplaEscolhaCatalogo
 from .models import (
     PerfilEmpresa,
     CanalAquisicaoCliente,
@@ -11,7 +15,35 @@ from .models import (
     PerfilEmpresaRestricoes,
 )
 
-from .constants import SETORES_SEGMENTOS, DEFAULT_SEGMENTS
+from .segmentos import catalogo_segmentos
+
+# Campo do formulário -> (tabela de ligação, campo do alvo na ligação)
+LIGACOES_PERFIL = {
+    'canais_aquisicao_selecionados': (PerfilEmpresaCanaisAquisicao, 'canal_aquisicao'),
+    'sistemas_utilizados_selecionados': (PerfilEmpresaSistemasUtilizados, 'sistema_utilizado'),
+    'objetivos_selecionados': (PerfilEmpresaObjetivos, 'objetivo'),
+    'restricoes_selecionadas': (PerfilEmpresaRestricoes, 'restricao'),
+}
+
+# Nomes das relações reversas em PerfilEmpresa (canais_aquisicao, sistemas_utilizados, ...)
+RELACOES_PERFIL = tuple(
+    modelo._meta.get_field('perfil_empresa').remote_field.get_accessor_name()
+    for modelo, _ in LIGACOES_PERFIL.values()
+)
+
+
+def perfis_para_formulario():
+    """PerfilEmpresa com as quatro ligações N:N pré-carregadas para o valor inicial do formulário."""
+    return PerfilEmpresa.objects.prefetch_related(*RELACOES_PERFIL)
+
+
+class SegmentoChoiceField(forms.ChoiceField):
+    """Segmento do setor escolhido, validado pelo índice do catálogo em vez de percorrer as choices."""
+    setor = None
+
+    def valid_value(self, value):
+        return catalogo_segmentos().segmento_valido(self.setor, value)
+
 
 class PerfilEmpresaForm(forms.ModelForm):
     """
@@ -19,14 +51,15 @@ class PerfilEmpresaForm(forms.ModelForm):
     Inclui campos de múltipla escolha para gerenciar as relações N:N personalizadas.
     """
     
-    segmento_especifico = forms.ChoiceField(
+    segmento_especifico = SegmentoChoiceField(
         label="Segmento específico",
         required=True,
         help_text="Lista dinâmica com base no setor selecionado.",
     )
 
-    # Campos de múltipla escolha manuais (tabelas de ligação personalizadas)
-    canais_aquisicao_selecionados = forms.ModelMultipleChoiceField(
+    # Campos de múltipla escolha manuais (tabelas de ligação personalizadas).
+    # As opções vêm do catálogo em memória (perfil.catalogo_opcoes), sem consultar as tabelas.
+    canais_aquisicao_selecionados = MultiplaEscolhaCatalogo(
         queryset=CanalAquisicaoCliente.objects.all(),
         required=False,
         widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'}),
@@ -34,7 +67,7 @@ class PerfilEmpresaForm(forms.ModelForm):
         help_text="Quais canais sua empresa utiliza para atrair clientes?"
     )
     
-    sistemas_utilizados_selecionados = forms.ModelMultipleChoiceField(
+    sistemas_utilizados_selecionados = MultiplaEscolhaCatalogo(
         queryset=SistemaUtilizado.objects.all(),
         required=False,
         widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'}),
@@ -42,7 +75,7 @@ class PerfilEmpresaForm(forms.ModelForm):
         help_text="Quais ferramentas e softwares fazem parte do dia a dia?"
     )
     
-    objetivos_selecionados = forms.ModelMultipleChoiceField(
+    objetivos_selecionados = MultiplaEscolhaCatalogo(
         queryset=ObjetivoProximo12Meses.objects.all(),
         required=False,
         widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'}),
@@ -50,7 +83,7 @@ class PerfilEmpresaForm(forms.ModelForm):
         help_text="O que é prioridade para o futuro do negócio?"
     )
     
-    restricoes_selecionadas = forms.ModelMultipleChoiceField(
+    restricoes_selecionadas = MultiplaEscolhaCatalogo(
         queryset=RestricaoCritica.objects.all(),
         required=False,
         widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'}),
@@ -114,7 +147,8 @@ class PerfilEmpresaForm(forms.ModelForm):
         elif self.instance and self.instance.pk:
             setor_atual = self.instance.setor_atuacao
         
-        self.fields['segmento_especifico'].choices = [('', '---------')] + SETORES_SEGMENTOS.get(setor_atual, DEFAULT_SEGMENTS)
+        self.fields['segmento_especifico'].setor = setor_atual
+        self.fields['segmento_especifico'].choices = catalogo_segmentos().escolhas(setor_atual)
 
         # Aplicamos classes CSS e organizamos os campos
         for name, field in self.fields.items():
@@ -124,12 +158,12 @@ class PerfilEmpresaForm(forms.ModelForm):
                 existing_class = field.widget.attrs.get('class', '')
                 field.widget.attrs['class'] = f"{existing_class} form-control".strip()
         
-        # Se for uma edição, carregamos os valores das relações N:N
+        # Se for uma edição, carregamos os valores das relações N:N. Com a instância vinda
+        # de perfis_para_formulario() as ligações já estão em memória (prefetch_related).
         if self.instance.pk:
-            self.fields['canais_aquisicao_selecionados'].initial = list(self.instance.canais_aquisicao.values_list('canal_aquisicao', flat=True))
-            self.fields['sistemas_utilizados_selecionados'].initial = list(self.instance.sistemas_utilizados.values_list('sistema_utilizado', flat=True))
-            self.fields['objetivos_selecionados'].initial = list(self.instance.objetivos_12_meses.values_list('objetivo', flat=True))
-            self.fields['restricoes_selecionadas'].initial = list(self.instance.restricoes_criticas.values_list('restricao', flat=True))
+            for (campo, (_, campo_alvo)), relacao in zip(LIGACOES_PERFIL.items(), RELACOES_PERFIL):
+                coluna = f'{campo_alvo}_id'
+                self.fields[campo].initial = [getattr(ligacao, coluna) for ligacao in getattr(self.instance, relacao).all()]
 
     def save(self, commit=True):
         """
@@ -138,35 +172,17 @@ class PerfilEmpresaForm(forms.ModelForm):
         instance = super().save(commit=False)
         
         if commit:
-            instance.save()
-            self._save_custom_m2m(instance)
+            with transaction.atomic():
+                instance.save()
+                self._save_custom_m2m(instance)
             
         return instance
 
     def _save_custom_m2m(self, instance):
         """
-        Sincroniza as escolhas de múltipla escolha com as tabelas de ligação.
+        Sincroniza as escolhas de múltipla escolha com as tabelas de ligação:
+        só as ligações removidas são apagadas e só as novas são inseridas.
         """
-        # Canais de Aquisição
-        if 'canais_aquisicao_selecionados' in self.cleaned_data:
-            instance.canais_aquisicao.all().delete()
-            for obj in self.cleaned_data['canais_aquisicao_selecionados']:
-                PerfilEmpresaCanaisAquisicao.objects.create(perfil_empresa=instance, canal_aquisicao=obj)
-        
-        # Sistemas
-        if 'sistemas_utilizados_selecionados' in self.cleaned_data:
-            instance.sistemas_utilizados.all().delete()
-            for obj in self.cleaned_data['sistemas_utilizados_selecionados']:
-                PerfilEmpresaSistemasUtilizados.objects.create(perfil_empresa=instance, sistema_utilizado=obj)
-                
-        # Objetivos
-        if 'objetivos_selecionados' in self.cleaned_data:
-            instance.objetivos_12_meses.all().delete()
-            for obj in self.cleaned_data['objetivos_selecionados']:
-                PerfilEmpresaObjetivos.objects.create(perfil_empresa=instance, objetivo=obj)
-                
-        # Restrições
-        if 'restricoes_selecionadas' in self.cleaned_data:
-            instance.restricoes_criticas.all().delete()
-            for obj in self.cleaned_data['restricoes_selecionadas']:
-                PerfilEmpresaRestricoes.objects.create(perfil_empresa=instance, restricao=obj)
+        for campo, (modelo, campo_alvo) in LIGACOES_PERFIL.items():
+            if campo in self.cleaned_data:
+                sincronizar_ligacoes(modelo, instance, 'perfil_empresa', campo_alvo, self.cleaned_data[campo])
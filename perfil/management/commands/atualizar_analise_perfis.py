@@ -0,0 +1,23 @@
+"""
+Management command que recalcula os agregados da análise de perfis (AgregadoPerfil)
+a partir de todos os perfis. Os agregados já são mantidos a cada salvamento de perfil;
+agendar diariamente corrige qualquer deriva (ex.: cron "30 3 * * *").
+
+Exemplos:
+    python manage.py atualizar_analise_perfis
+"""
+from django.core.management.base import BaseCommand
+
+from perfil.analise import TAMANHO_LOTE, reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os agregados da análise de perfis das empresas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanho-lote', type=int, default=TAMANHO_LOTE,
+                            help='Perfis lidos e gravados por lote')
+
+    def handle(self, *args, **options):
+        total = reconstruir(tamanho_lote=options['tamanho_lote'])
+        self.stdout.write(self.style.SUCCESS(f"[OK] Agregados recalculados a partir de {total} perfis."))
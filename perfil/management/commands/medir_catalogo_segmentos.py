@@ -0,0 +1,72 @@
+"""
+Microbenchmark das consultas ao catálogo de setores/segmentos: varredura linear sobre
+SETORES_SEGMENTOS (como era feito) contra os índices de CatalogoSegmentos.
+
+Exemplos:
+    python manage.py medir_catalogo_segmentos
+    python manage.py medir_catalogo_segmentos --repeticoes 50000
+"""
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from perfil.constants import DEFAULT_SEGMENTS, SETORES_SEGMENTOS
+from perfil.segmentos import catalogo_segmentos
+
+
+def _rotulo_linear(codigo):
+    for segmentos in SETORES_SEGMENTOS.values():
+        for cod, rotulo in segmentos:
+            if cod == codigo:
+                return rotulo
+    return ''
+
+
+def _codigo_linear(rotulo):
+    for segmentos in SETORES_SEGMENTOS.values():
+        for cod, rot in segmentos:
+            if rot == rotulo:
+                return cod
+    return None
+
+
+def _setores_linear(codigo):
+    return tuple(setor for setor, segmentos in SETORES_SEGMENTOS.items() if any(c == codigo for c, _ in segmentos))
+
+
+def _valido_linear(setor, codigo):
+    return any(c == codigo for c, _ in SETORES_SEGMENTOS.get(setor, DEFAULT_SEGMENTS))
+
+
+def _escolhas_linear(setor):
+    return [('', '---------')] + SETORES_SEGMENTOS.get(setor, DEFAULT_SEGMENTS)
+
+
+def cenarios():
+    """(nome, linear, indexado) com um segmento do fim do catálogo: pior caso da varredura."""
+    catalogo = catalogo_segmentos()
+    setor = list(SETORES_SEGMENTOS)[-2]
+    codigo, rotulo = SETORES_SEGMENTOS[setor][-2]  # o último costuma ser OUTRO, presente em todos
+    return [
+        ('código -> rótulo', lambda: _rotulo_linear(codigo), lambda: catalogo.rotulo(codigo)),
+        ('rótulo -> código', lambda: _codigo_linear(rotulo), lambda: catalogo.codigo(rotulo)),
+        ('segmento -> setores', lambda: _setores_linear(codigo), lambda: catalogo.setores_do_segmento[codigo]),
+        ('validação do segmento', lambda: _valido_linear(setor, codigo), lambda: catalogo.segmento_valido(setor, codigo)),
+        ('choices do setor', lambda: _escolhas_linear(setor), lambda: catalogo.escolhas(setor)),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Compara as consultas ao catálogo de segmentos por varredura linear e pelos índices'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=20000,
+                            help='Execuções por medição (a melhor de 5 é usada)')
+
+    def handle(self, *args, **options):
+        n = options['repeticoes']
+        self.stdout.write(f"{'consulta':<24}{'linear (µs)':>14}{'índice (µs)':>14}{'ganho':>10}")
+        for nome, linear, indexado in cenarios():
+            t_linear = min(timeit.repeat(linear, number=n, repeat=5)) / n * 1e6
+            t_indice = min(timeit.repeat(indexado, number=n, repeat=5)) / n * 1e6
+            self.stdout.write(f"{nome:<24}{t_linear:>14.3f}{t_indice:>14.3f}{t_linear / t_indice:>9.1f}x")
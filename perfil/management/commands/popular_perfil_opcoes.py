@@ -1,53 +1,76 @@
+"""
+Management command que popula as opções de múltipla escolha do perfil da empresa.
+As listas abaixo são a declaração do catálogo: rodar de novo cria só o que falta,
+em poucas consultas por tabela (web.semeadura). Opções removidas da lista não são
+apagadas, pois podem estar ligadas a perfis.
+
+Exemplos:
+    python manage.py popular_perfil_opcoes
+    python manage.py popular_perfil_opcoes --dry-run
+"""
 from django.core.management.base import BaseCommand
+
+from perfil.catalogo_opcoes import invalidar_catalogo_opcoes
 from perfil.models import CanalAquisicaoCliente, SistemaUtilizado, ObjetivoProximo12Meses, RestricaoCritica
+from web.semeadura import Semente, descrever, semear
+
+CANAIS = [
+    "LinkedIn", "Instagram", "Facebook", "Google Ads", 
+    "YouTube", "TikTok", "Indicação / Boca-a-boca", 
+    "Eventos / Feiras", "Prospecção Ativa (Outbound)", 
+    "SEO / Blog", "E-mail Marketing", "Parcerias / Afiliados", "Outros"
+]
+SISTEMAS = [
+    "ERP (Gestão Integrada)", "CRM (Gestão de Clientes)", 
+    "Mensageiros (WhatsApp / Telegram)", "Planilhas (Excel / Sheets)", 
+    "E-mail Corporativo", "Ferramenta de E-mail Marketing", 
+    "Plataforma de E-commerce", "Sistema de PDV", 
+    "Software de Gestão Financeira", "Software de Gestão de Projetos",
+    "Software de BI / Analytics", "Ferramentas de IA (ChatGPT etc.)", 
+    "Sistemas Legados / Próprios", "Outros"
+]
+OBJETIVOS = [
+    "Aumentar faturamento / vendas", "Reduzir custos operacionais", 
+    "Melhorar a experiência do cliente", "Automatizar processos manuais", 
+    "Melhorar a qualidade dos dados", "Escalar a operação", 
+    "Expansão geográfica / novas unidades", "Lançar novos produtos/serviços",
+    "Melhorar a governança / conformidade"
+]
+RESTRICOES = [
+    "Orçamento limitado", "Falta de pessoal qualificado", 
+    "Resistência cultural à mudança", "Sistemas atuais limitados/antigos", 
+    "Falta de tempo da diretoria", "Dificuldade em integrar dados",
+    "Insegurança com novas tecnologias", "Ausência de processos definidos"
+]
+
+
+def sementes():
+    return [
+        Semente(modelo, 'nome', [{'nome': nome} for nome in nomes], ao_alterar=invalidar_catalogo_opcoes)
+        for modelo, nomes in (
+            (CanalAquisicaoCliente, CANAIS),
+            (SistemaUtilizado, SISTEMAS),
+            (ObjetivoProximo12Meses, OBJETIVOS),
+            (RestricaoCritica, RESTRICOES),
+        )
+    ]
+
 
 class Command(BaseCommand):
     help = 'Popula as opções de múltipla escolha do perfil da empresa'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Apenas mostra o que seria criado')
+
     def handle(self, *args, **options):
-        canais = [
-            "LinkedIn", "Instagram", "Facebook", "Google Ads", 
-            "YouTube", "TikTok", "Indicação / Boca-a-boca", 
-            "Eventos / Feiras", "Prospecção Ativa (Outbound)", 
-            "SEO / Blog", "E-mail Marketing", "Parcerias / Afiliados", "Outros"
-        ]
-        sistemas = [
-            "ERP (Gestão Integrada)", "CRM (Gestão de Clientes)", 
-            "Mensageiros (WhatsApp / Telegram)", "Planilhas (Excel / Sheets)", 
-            "E-mail Corporativo", "Ferramenta de E-mail Marketing", 
-            "Plataforma de E-commerce", "Sistema de PDV", 
-            "Software de Gestão Financeira", "Software de Gestão de Projetos",
-            "Software de BI / Analytics", "Ferramentas de IA (ChatGPT etc.)", 
-            "Sistemas Legados / Próprios", "Outros"
-        ]
-        objetivos = [
-            "Aumentar faturamento / vendas", "Reduzir custos operacionais", 
-            "Melhorar a experiência do cliente", "Automatizar processos manuais", 
-            "Melhorar a qualidade dos dados", "Escalar a operação", 
-            "Expansão geográfica / novas unidades", "Lançar novos produtos/serviços",
-            "Melhorar a governança / conformidade"
-        ]
-        restricoes = [
-            "Orçamento limitado", "Falta de pessoal qualificado", 
-            "Resistência cultural à mudança", "Sistemas atuais limitados/antigos", 
-            "Falta de tempo da diretoria", "Dificuldade em integrar dados",
-            "Insegurança com novas tecnologias", "Ausência de processos definidos"
-        ]
-
-        def populate(model, items):
-            count = 0
-            for item in items:
-                obj, created = model.objects.get_or_create(nome=item)
-                if created:
-                    count += 1
-            return count
-
-        c_canais = populate(CanalAquisicaoCliente, canais)
-        c_sistemas = populate(SistemaUtilizado, sistemas)
-        c_objetivos = populate(ObjetivoProximo12Meses, objetivos)
-        c_restricoes = populate(RestricaoCritica, restricoes)
-
-        self.stdout.write(self.style.SUCCESS(
-            f'Sucesso: {c_canais} canais, {c_sistemas} sistemas, '
-            f'{c_objetivos} objetivos e {c_restricoes} restrições criados.'
-        ))
+        for semente in sementes():
+            resultado = semear(semente, dry_run=options['dry_run'])
+            self.stdout.write(descrever(resultado))
+            for nome in resultado.criados:
+                self.stdout.write(f'  + {nome}')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry-run: nada foi gravado.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('[OK] Opções do perfil sincronizadas.'))
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfil', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalisePerfil',
+            fields=[
+                ('perfil_empresa', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='analise', serialize=False, to='perfil.perfilempresa', verbose_name='Perfil da empresa')),
+                ('chaves', models.JSONField(default=list, verbose_name='Chaves contadas')),
+                ('completude', models.PositiveSmallIntegerField(default=0, verbose_name='Completude (%)')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Análise do perfil',
+                'verbose_name_plural': 'Análises dos perfis',
+                'db_table': 'perfil_empresa_analise',
+            },
+        ),
+        migrations.CreateModel(
+            name='AgregadoPerfil',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimensao', models.CharField(choices=[('setor', 'Setor de atuação'), ('fase', 'Fase do negócio'), ('faturamento', 'Faturamento anual'), ('canal', 'Canal de aquisição'), ('objetivo', 'Objetivo (12 meses)'), ('completude', 'Completude do perfil')], max_length=16, verbose_name='Dimensão')),
+                ('valor', models.CharField(blank=True, help_text='Código da escolha ou pk da opção; vazio = não informado.', max_length=80, verbose_name='Valor')),
+                ('total', models.IntegerField(default=0, verbose_name='Perfis')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Análise de perfis',
+                'verbose_name_plural': 'Análise de perfis',
+                'db_table': 'perfil_agregado',
+                'constraints': [models.UniqueConstraint(fields=('dimensao', 'valor'), name='perfil_agregado_dimensao_valor_unico')],
+            },
+        ),
+    ]
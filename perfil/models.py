@@ -626,3 +626,59 @@ class PerfilEmpresaRestricoes(models.Model):
         verbose_name_plural = "Restrições dos perfis"
         db_table = "perfil_empresa_restricoes"
         unique_together = ("perfil_empresa", "restricao")
+
+
+class AnalisePerfil(models.Model):
+    """
+    Com que chaves "dimensao:valor" o perfil está contado em AgregadoPerfil, e sua
+    completude. Permite atualizar os agregados pela diferença (ver perfil/analise.py).
+    """
+
+    perfil_empresa = models.OneToOneField(
+        PerfilEmpresa,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="analise",
+        verbose_name="Perfil da empresa",
+    )
+    chaves = models.JSONField("Chaves contadas", default=list)
+    completude = models.PositiveSmallIntegerField("Completude (%)", default=0)
+    atualizado_em = models.DateTimeField("Atualizado em", auto_now=True)
+
+    class Meta:
+        verbose_name = "Análise do perfil"
+        verbose_name_plural = "Análises dos perfis"
+        db_table = "perfil_empresa_analise"
+
+
+class AgregadoPerfil(models.Model):
+    """
+    Contagem materializada de perfis por dimensão e valor (setor, fase, faturamento,
+    canais, objetivos e faixa de completude), lida pelo painel de análise do admin.
+    Mantida por perfil.analise: incrementalmente ao salvar um perfil e por inteiro pelo
+    comando atualizar_analise_perfis.
+    """
+
+    class Dimensao(models.TextChoices):
+        SETOR = "setor", "Setor de atuação"
+        FASE = "fase", "Fase do negócio"
+        FATURAMENTO = "faturamento", "Faturamento anual"
+        CANAL = "canal", "Canal de aquisição"
+        OBJETIVO = "objetivo", "Objetivo (12 meses)"
+        COMPLETUDE = "completude", "Completude do perfil"
+
+    dimensao = models.CharField("Dimensão", max_length=16, choices=Dimensao.choices)
+    valor = models.CharField("Valor", max_length=80, blank=True, help_text="Código da escolha ou pk da opção; vazio = não informado.")
+    total = models.IntegerField("Perfis", default=0)
+    atualizado_em = models.DateTimeField("Atualizado em", auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.dimensao}:{self.valor} = {self.total}"
+
+    class Meta:
+        verbose_name = "Análise de perfis"
+        verbose_name_plural = "Análise de perfis"
+        db_table = "perfil_agregado"
+        constraints = [
+            models.UniqueConstraint(fields=["dimensao", "valor"], name="perfil_agregado_dimensao_valor_unico"),
+        ]
@@ -0,0 +1,141 @@
+"""
+Catálogo de setores/segmentos servido como asset JSON versionado.
+
+O perfil embutia json.dumps(SETORES_SEGMENTOS) (~35 KB) em toda renderização. Agora o
+catálogo é compilado uma vez por processo em:
+- um JSON completo, com o hash do conteúdo na URL (/perfil/segmentos/<hash>.json);
+- um fragmento por setor (/perfil/segmentos/<hash>/<SETOR>.json), que a página busca
+  só quando o usuário troca de setor.
+Como a URL muda quando o conteúdo muda, as respostas vão com Cache-Control imutável de
+um ano. A página recebe só a URL base, a lista de setores com fragmento e os segmentos
+padrão (pequenos).
+
+CatalogoSegmentos é o índice imutável do mesmo catálogo, montado uma vez por processo
+(catalogo_segmentos()): código -> rótulo, rótulo -> código, segmento -> setores, choices
+pré-montadas e conjuntos de códigos válidos por setor. Formulário, admin e o filtro de
+template rotulo_segmento consultam o índice em vez de percorrer as listas de constants.py.
+Medição: python manage.py medir_catalogo_segmentos.
+"""
+import hashlib
+import json
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+from django.urls import reverse
+
+from .constants import DEFAULT_SEGMENTS, SETORES_SEGMENTOS
+
+OPCAO_VAZIA = ('', '---------')
+
+AssetSegmentos = namedtuple('AssetSegmentos', ['versao', 'conteudo', 'fragmentos'])
+
+_catalogo = None
+_asset = None
+_trava = threading.Lock()
+
+
+class CatalogoSegmentos:
+    """Índices somente leitura sobre SETORES_SEGMENTOS e DEFAULT_SEGMENTS."""
+    __slots__ = ('setores', 'padrao', 'rotulos', 'codigos', 'setores_do_segmento', 'agrupadas', '_escolhas', '_validos')
+
+    def __init__(self, setores=SETORES_SEGMENTOS, padrao=DEFAULT_SEGMENTS, nomes_setores=None):
+        setores = {setor: tuple(map(tuple, segmentos)) for setor, segmentos in setores.items()}
+        padrao = tuple(map(tuple, padrao))
+
+        rotulos, codigos, setores_do_segmento = {}, {}, {}
+        for setor, segmentos in setores.items():
+            for codigo, rotulo in segmentos:
+                rotulos.setdefault(codigo, rotulo)
+                # Há rótulos repetidos entre setores com códigos diferentes: vale o primeiro
+                codigos.setdefault(rotulo, codigo)
+                setores_do_segmento.setdefault(codigo, []).append(setor)
+        for codigo, rotulo in padrao:
+            rotulos.setdefault(codigo, rotulo)
+            codigos.setdefault(rotulo, codigo)
+
+        listas = {**setores, None: padrao}
+        atribuir = object.__setattr__
+        atribuir(self, 'setores', MappingProxyType(setores))
+        atribuir(self, 'padrao', padrao)
+        atribuir(self, 'rotulos', MappingProxyType(rotulos))
+        atribuir(self, 'codigos', MappingProxyType(codigos))
+        atribuir(self, 'setores_do_segmento', MappingProxyType(
+            {codigo: tuple(lista) for codigo, lista in setores_do_segmento.items()}
+        ))
+        # Todos os segmentos agrupados por setor (optgroups), para o admin
+        nomes_setores = nomes_setores or {}
+        atribuir(self, 'agrupadas', (
+            OPCAO_VAZIA,
+            *((nomes_setores.get(setor, setor), segmentos) for setor, segmentos in setores.items()),
+            ('Setores sem lista própria', padrao),
+        ))
+        atribuir(self, '_escolhas', MappingProxyType(
+            {setor: (OPCAO_VAZIA, *segmentos) for setor, segmentos in listas.items()}
+        ))
+        atribuir(self, '_validos', MappingProxyType(
+            {setor: frozenset(codigo for codigo, _ in segmentos) for setor, segmentos in listas.items()}
+        ))
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError('CatalogoSegmentos é imutável')
+
+    def rotulo(self, codigo, padrao=''):
+        return self.rotulos.get(codigo, padrao)
+
+    def codigo(self, rotulo, padrao=None):
+        return self.codigos.get(rotulo, padrao)
+
+    def escolhas(self, setor):
+        """Choices (com a opção vazia) do setor; segmentos padrão se o setor não tem lista."""
+        return self._escolhas.get(setor, self._escolhas[None])
+
+    def segmento_valido(self, setor, codigo):
+        """O código está entre as choices do setor (mesma regra de escolhas())."""
+        return codigo in self._validos.get(setor, self._validos[None])
+
+
+def catalogo_segmentos():
+    """Catálogo indexado do processo (montado na primeira chamada)."""
+    global _catalogo
+    if _catalogo is None:
+        with _trava:
+            if _catalogo is None:
+                from .models import PerfilEmpresa
+                _catalogo = CatalogoSegmentos(nomes_setores=dict(PerfilEmpresa.Setor.choices))
+    return _catalogo
+
+
+def _json(dados):
+    return json.dumps(dados, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def compilar_segmentos(setores=SETORES_SEGMENTOS, padrao=DEFAULT_SEGMENTS):
+    """Monta o JSON completo, os fragmentos por setor e a versão (hash do conteúdo)."""
+    conteudo = _json({'setores': setores, 'padrao': padrao})
+    return AssetSegmentos(
+        versao=hashlib.sha256(conteudo).hexdigest()[:12],
+        conteudo=conteudo,
+        fragmentos={setor: _json(segmentos) for setor, segmentos in setores.items()},
+    )
+
+
+def asset_segmentos():
+    """Asset compilado do processo (montado na primeira chamada)."""
+    global _asset
+    if _asset is None:
+        with _trava:
+            if _asset is None:
+                _asset = compilar_segmentos()
+    return _asset
+
+
+def config_segmentos():
+    """Dados que a página do perfil precisa para buscar os fragmentos sob demanda."""
+    asset = asset_segmentos()
+    url_setor = reverse('perfil_segmentos_setor', args=[asset.versao, 'SETOR'])
+    return {
+        'url_setor': url_setor.replace('SETOR.json', '{setor}.json'),
+        'setores': sorted(asset.fragmentos),
+        'padrao': catalogo_segmentos().padrao,
+    }
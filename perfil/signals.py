@@ -0,0 +1,40 @@
+"""
+Sinais do app de perfil.
+Invalidam o catálogo de opções do formulário sempre que uma opção é criada, editada ou excluída,
+e mantêm os agregados da análise de perfis (perfil.analise) quando um perfil muda.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import analise
+from .catalogo_opcoes import invalidar_catalogo_opcoes
+from .models import (
+    AnalisePerfil, CanalAquisicaoCliente, ObjetivoProximo12Meses, PerfilEmpresa, RestricaoCritica, SistemaUtilizado,
+)
+
+
+@receiver(post_save, sender=CanalAquisicaoCliente)
+@receiver(post_delete, sender=CanalAquisicaoCliente)
+@receiver(post_save, sender=SistemaUtilizado)
+@receiver(post_delete, sender=SistemaUtilizado)
+@receiver(post_save, sender=ObjetivoProximo12Meses)
+@receiver(post_delete, sender=ObjetivoProximo12Meses)
+@receiver(post_save, sender=RestricaoCritica)
+@receiver(post_delete, sender=RestricaoCritica)
+def invalidar_catalogo(sender, instance, **kwargs):
+    invalidar_catalogo_opcoes()
+
+
+@receiver(post_save, sender=PerfilEmpresa)
+def atualizar_analise(sender, instance, **kwargs):
+    # Depois do commit: o formulário e o admin gravam as ligações N:N após salvar o perfil
+    transaction.on_commit(partial(analise.atualizar_perfil, instance.pk))
+
+
+@receiver(post_delete, sender=AnalisePerfil)
+def descontar_analise(sender, instance, **kwargs):
+    # Apagada em cascata com o perfil
+    analise.remover_chaves(instance.chaves)
@@ -0,0 +1,11 @@
+from django import template
+
+from ..segmentos import catalogo_segmentos
+
+register = template.Library()
+
+
+@register.filter
+def rotulo_segmento(codigo):
+    """Rótulo do segmento pelo código (o próprio código se não estiver no catálogo)."""
+    return catalogo_segmentos().rotulo(codigo, codigo)
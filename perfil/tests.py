@@ -1,3 +1,254 @@
-from django.test import TestCase
+"""
+Testes do app perfil.
+"""
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from web.fabricas import criar_assinante
+from web.orcamento_views import OrcamentoViewsMixin
+from web.sincronizacao_m2m import sincronizar_ligacoes
+from . import analise, catalogo_opcoes
+from .constants import DEFAULT_SEGMENTS, SETORES_SEGMENTOS
+from .forms import PerfilEmpresaForm, perfis_para_formulario
+from .segmentos import CatalogoSegmentos, asset_segmentos, catalogo_segmentos
+from .models import (
+    AgregadoPerfil, CanalAquisicaoCliente, ObjetivoProximo12Meses, PerfilEmpresaCanaisAquisicao, PerfilEmpresaObjetivos,
+    PerfilEmpresaSistemasUtilizados, SistemaUtilizado,
+)
+
+
+class OrcamentoViewsPerfilTest(OrcamentoViewsMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('popular_perfil_opcoes', stdout=StringIO())
+        cls.usuario = criar_assinante()
+        perfil = cls.usuario.perfil_empresa
+        for canal in CanalAquisicaoCliente.objects.all()[:5]:
+            PerfilEmpresaCanaisAquisicao.objects.create(perfil_empresa=perfil, canal_aquisicao=canal)
+        for sistema in SistemaUtilizado.objects.all()[:5]:
+            PerfilEmpresaSistemasUtilizados.objects.create(perfil_empresa=perfil, sistema_utilizado=sistema)
+
+    def test_perfil(self):
+        self.client.force_login(self.usuario)
+        self.assertDentroDoOrcamento('perfil')
+
+
+def _escritas(queries):
+    return [q['sql'] for q in queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+
+
+class SincronizacaoLigacoesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('popular_perfil_opcoes', stdout=StringIO())
+        cls.perfil = criar_assinante().perfil_empresa
+        cls.canais = list(CanalAquisicaoCliente.objects.order_by('pk'))
+
+    def _canais_atuais(self):
+        return dict(
+            PerfilEmpresaCanaisAquisicao.objects.filter(perfil_empresa=self.perfil)
+            .values_list('canal_aquisicao_id', 'pk')
+        )
+
+    def test_diferenca_com_um_delete_e_um_insert(self):
+        sincronizar_ligacoes(PerfilEmpresaCanaisAquisicao, self.perfil, 'perfil_empresa', 'canal_aquisicao', self.canais[:5])
+        antes = self._canais_atuais()
+
+        with CaptureQueriesContext(connection) as ctx:
+            resultado = sincronizar_ligacoes(
+                PerfilEmpresaCanaisAquisicao, self.perfil, 'perfil_empresa', 'canal_aquisicao', self.canais[2:9],
+            )
+
+        escritas = _escritas(ctx.captured_queries)
+        self.assertEqual(resultado, (4, 2))
+        self.assertEqual([sql.split()[0] for sql in escritas], ['DELETE', 'INSERT'])
+        depois = self._canais_atuais()
+        self.assertEqual(set(depois), {c.pk for c in self.canais[2:9]})
+        # Ligações mantidas preservam a pk
+        self.assertTrue(all(depois[c.pk] == antes[c.pk] for c in self.canais[2:5]))
+
+    def test_sem_mudanca_nao_escreve(self):
+        sincronizar_ligacoes(PerfilEmpresaCanaisAquisicao, self.perfil, 'perfil_empresa', 'canal_aquisicao', self.canais[:3])
+        with CaptureQueriesContext(connection) as ctx:
+            resultado = sincronizar_ligacoes(
+                PerfilEmpresaCanaisAquisicao, self.perfil, 'perfil_empresa', 'canal_aquisicao', [c.pk for c in self.canais[:3]],
+            )
+        self.assertEqual(resultado, (0, 0))
+        self.assertEqual(_escritas(ctx.captured_queries), [])
+
+    def test_formulario_sincroniza_as_quatro_ligacoes(self):
+        objetivos = list(ObjetivoProximo12Meses.objects.all()[:2])
+        form = PerfilEmpresaForm(instance=self.perfil)
+        form.cleaned_data = {
+            'canais_aquisicao_selecionados': self.canais[:3],
+            'sistemas_utilizados_selecionados': SistemaUtilizado.objects.none(),
+            'objetivos_selecionados': objetivos,
+            'restricoes_selecionadas': [],
+        }
+
+        with CaptureQueriesContext(connection) as ctx:
+            form._save_custom_m2m(self.perfil)
+
+        self.assertEqual(len(_escritas(ctx.captured_queries)), 2)  # um INSERT por tabela com novidades
+        self.assertEqual(len(self._canais_atuais()), 3)
+        self.assertEqual(PerfilEmpresaObjetivos.objects.filter(perfil_empresa=self.perfil).count(), 2)
+
+
+class FormularioPerfilCatalogoTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('popular_perfil_opcoes', stdout=StringIO())
+        cls.perfil = criar_assinante().perfil_empresa
+        cls.canais = list(CanalAquisicaoCliente.objects.order_by('pk')[:3])
+        for canal in cls.canais:
+            PerfilEmpresaCanaisAquisicao.objects.create(perfil_empresa=cls.perfil, canal_aquisicao=canal)
+
+    def test_valores_iniciais_pre_carregados(self):
+        perfil = perfis_para_formulario().get(pk=self.perfil.pk)
+        with self.assertNumQueries(0):
+            form = PerfilEmpresaForm(instance=perfil)
+        self.assertEqual(form.fields['canais_aquisicao_selecionados'].initial, [c.pk for c in self.canais])
+        self.assertEqual(form.fields['restricoes_selecionadas'].initial, [])
+
+    def test_opcoes_em_cache_ate_mudar_o_catalogo(self):
+        list(PerfilEmpresaForm().fields['canais_aquisicao_selecionados'].choices)
+        with self.assertNumQueries(0):
+            opcoes = list(PerfilEmpresaForm().fields['canais_aquisicao_selecionados'].choices)
+        self.assertEqual(len(opcoes), CanalAquisicaoCliente.objects.count())
+
+        CanalAquisicaoCliente.objects.create(nome='Marketplace')
+        nomes = [nome for _, nome in PerfilEmpresaForm().fields['canais_aquisicao_selecionados'].choices]
+        self.assertIn('Marketplace', nomes)
+
+
+    def test_opcoes_em_memoria_expiram_sem_troca_de_versao(self):
+        catalogo_opcoes.obter_opcoes(CanalAquisicaoCliente)
+        # Outro worker alterou a tabela; a versão local (cache por processo) não mudou
+        CanalAquisicaoCliente.objects.bulk_create([CanalAquisicaoCliente(nome='Feira')])
+        self.assertNotIn('Feira', dict(catalogo_opcoes.obter_opcoes(CanalAquisicaoCliente)).values())
+
+        with override_settings(CATALOGO_OPCOES_TTL=0):
+            self.assertIn('Feira', dict(catalogo_opcoes.obter_opcoes(CanalAquisicaoCliente)).values())
+
+
+class AssetSegmentosTest(TestCase):
+    def setUp(self):
+        self.asset = asset_segmentos()
+
+    def test_json_completo_com_cache_imutavel(self):
+        resposta = self.client.get(reverse('perfil_segmentos', args=[self.asset.versao]))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('immutable', resposta['Cache-Control'])
+        self.assertEqual(resposta.json()['setores']['AGRO'][0], list(SETORES_SEGMENTOS['AGRO'][0]))
+
+        revalidacao = self.client.get(
+            reverse('perfil_segmentos', args=[self.asset.versao]), HTTP_IF_NONE_MATCH=resposta['ETag'],
+        )
+        self.assertEqual(revalidacao.status_code, 304)
+
+    def test_fragmento_por_setor_e_versao_antiga(self):
+        url = reverse('perfil_segmentos_setor', args=[self.asset.versao, 'AGRO'])
+        self.assertEqual(len(self.client.get(url).json()), len(SETORES_SEGMENTOS['AGRO']))
+
+        antiga = self.client.get(reverse('perfil_segmentos_setor', args=['000000000000', 'AGRO']))
+        self.assertRedirects(antiga, url)
+        self.assertEqual(self.client.get(reverse('perfil_segmentos_setor', args=[self.asset.versao, 'XYZ'])).status_code, 404)
+
+    def test_escolhas_do_formulario_e_pagina_sem_catalogo_embutido(self):
+        form = PerfilEmpresaForm(data={'setor_atuacao': 'AGRO'})
+        self.assertEqual(len(form.fields['segmento_especifico'].choices), len(SETORES_SEGMENTOS['AGRO']) + 1)
+        form = PerfilEmpresaForm()
+        self.assertEqual(len(form.fields['segmento_especifico'].choices), len(DEFAULT_SEGMENTS) + 1)
+
+        usuario = criar_assinante()
+        self.client.force_login(usuario)
+        html = self.client.get(reverse('perfil')).content.decode()
+        self.assertIn(self.asset.versao, html)
+        self.assertNotIn(SETORES_SEGMENTOS['AGRO'][1][1], html)
+
+
+class CatalogoSegmentosTest(TestCase):
+    def test_indices(self):
+        catalogo = catalogo_segmentos()
+        self.assertIs(catalogo, catalogo_segmentos())
+        self.assertEqual(catalogo.rotulo('CAFE'), 'Café')
+        self.assertEqual(catalogo.codigo('Café'), 'CAFE')
+        self.assertEqual(catalogo.setores_do_segmento['CAFE'], ('AGRO',))
+        self.assertIn('AGRO', catalogo.setores_do_segmento['OUTRO'])
+        self.assertTrue(catalogo.segmento_valido('AGRO', 'CAFE'))
+        self.assertFalse(catalogo.segmento_valido('TI', 'CAFE'))
+        self.assertTrue(catalogo.segmento_valido('SETOR_SEM_LISTA', 'SERVICOS'))
+
+    def test_imutavel(self):
+        catalogo = CatalogoSegmentos()
+        with self.assertRaises(AttributeError):
+            catalogo.rotulos = {}
+        with self.assertRaises(TypeError):
+            catalogo.rotulos['CAFE'] = 'Chá'
+
+    def test_formulario_rejeita_segmento_de_outro_setor(self):
+        form = PerfilEmpresaForm(data={'setor_atuacao': 'TI', 'segmento_especifico': 'CAFE'})
+        form.is_valid()
+        self.assertIn('segmento_especifico', form.errors)
+        form = PerfilEmpresaForm(data={'setor_atuacao': 'AGRO', 'segmento_especifico': 'CAFE'})
+        form.is_valid()
+        self.assertNotIn('segmento_especifico', form.errors)
+
+
+class AnalisePerfisTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('popular_perfil_opcoes', stdout=StringIO())
+        cls.canais = list(CanalAquisicaoCliente.objects.order_by('pk')[:3])
+
+    def _totais(self, dimensao):
+        return dict(AgregadoPerfil.objects.filter(dimensao=dimensao, total__gt=0).values_list('valor', 'total'))
+
+    def _salvar(self, perfil, canais):
+        with self.captureOnCommitCallbacks(execute=True):
+            perfil.save()
+            sincronizar_ligacoes(PerfilEmpresaCanaisAquisicao, perfil, 'perfil_empresa', 'canal_aquisicao', canais)
+
+    def test_incremental_ao_salvar_e_excluir(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            perfil = criar_assinante('a').perfil_empresa
+            outro = criar_assinante('b').perfil_empresa
+        self.assertEqual(self._totais('setor'), {'': 2})
+
+        perfil.setor_atuacao, perfil.fase_negocio = 'AGRO', 'CRESCIMENTO'
+        self._salvar(perfil, self.canais[:2])
+        self.assertEqual(self._totais('setor'), {'': 1, 'AGRO': 1})
+        self.assertEqual(self._totais('canal'), {str(c.pk): 1 for c in self.canais[:2]})
+
+        self._salvar(perfil, self.canais[1:3])
+        self.assertEqual(self._totais('canal'), {str(c.pk): 1 for c in self.canais[1:3]})
+
+        perfil.refresh_from_db()
+        perfil.delete()
+        self.assertEqual(self._totais('setor'), {'': 1})
+        self.assertEqual(self._totais('canal'), {})
+        self.assertEqual(sum(self._totais('completude').values()), 1)
+
+        # A reconstrução chega aos mesmos totais
+        antes = set(AgregadoPerfil.objects.filter(total__gt=0).values_list('dimensao', 'valor', 'total'))
+        self.assertEqual(analise.reconstruir(), 1)
+        self.assertEqual(set(AgregadoPerfil.objects.values_list('dimensao', 'valor', 'total')), antes)
+        self.assertIn('setor:', outro.analise.chaves)
+
+    def test_painel_no_admin(self):
+        perfil = criar_assinante().perfil_empresa
+        perfil.setor_atuacao = 'AGRO'
+        self._salvar(perfil, self.canais[:1])
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        self.client.force_login(admin)
+
+        resposta = self.client.get(reverse('admin:perfil_agregadoperfil_changelist'))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.context['analise']['total'], 1)
+        self.assertContains(resposta, self.canais[0].nome)
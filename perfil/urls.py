@@ -3,4 +3,6 @@ from . import views
 
 urlpatterns = [
     path('', views.perfil, name='perfil'),
+    path('segmentos/<str:versao>.json', views.segmentos_json, name='perfil_segmentos'),
+    path('segmentos/<str:versao>/<str:setor>.json', views.segmentos_setor_json, name='perfil_segmentos_setor'),
 ]
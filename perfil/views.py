@@ -1,18 +1,18 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .forms import PerfilEmpresaForm
-from .models import PerfilEmpresa
-from .constants import SETORES_SEGMENTOS, DEFAULT_SEGMENTS
-import json
+from .forms import PerfilEmpresaForm, perfis_para_formulario
+from .segmentos import asset_segmentos, config_segmentos
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.views.decorators.http import require_GET
 from pagamentos.decoradores_acesso import exigir_assinante_ativo
 from django.views.decorators.cache import never_cache
 
 @exigir_assinante_ativo
 @never_cache
 def perfil(request):
-    # Tenta buscar o perfil existente do usuário
-    perfil_empresa, created = PerfilEmpresa.objects.get_or_create(usuario=request.user)
+    # Tenta buscar o perfil existente do usuário (com as ligações N:N já carregadas)
+    perfil_empresa, created = perfis_para_formulario().get_or_create(usuario=request.user)
     
     if request.method == 'POST':
         # print(f"DEBUG: POST Data: {request.POST}") 
@@ -35,8 +35,7 @@ def perfil(request):
         'descricao_pagina': descricao_pagina,
         'form': form,
         'perfil_empresa': perfil_empresa,
-        'setores_segmentos_json': json.dumps(SETORES_SEGMENTOS),
-        'default_segments_json': json.dumps(DEFAULT_SEGMENTS)
+        'segmentos_config': config_segmentos(),
     }
 
     return render(
@@ -44,3 +43,36 @@ def perfil(request):
         template_name='app/perfil/perfil.html',
         context=context
     )
+
+
+# Asset de setores/segmentos: a URL leva o hash do conteúdo, então pode ficar em cache por um ano
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+
+
+def _resposta_asset(request, versao, conteudo):
+    if request.headers.get('If-None-Match') == f'"{versao}"':
+        resposta = HttpResponseNotModified()
+    else:
+        resposta = HttpResponse(conteudo, content_type='application/json; charset=utf-8')
+    resposta['ETag'] = f'"{versao}"'
+    resposta['Cache-Control'] = CACHE_IMUTAVEL
+    return resposta
+
+
+@require_GET
+def segmentos_json(request, versao):
+    asset = asset_segmentos()
+    if versao != asset.versao:
+        # Página antiga em cache pedindo uma versão que não existe mais
+        return redirect('perfil_segmentos', asset.versao)
+    return _resposta_asset(request, asset.versao, asset.conteudo)
+
+
+@require_GET
+def segmentos_setor_json(request, versao, setor):
+    asset = asset_segmentos()
+    if setor not in asset.fragmentos:
+        raise Http404('Setor sem segmentos')
+    if versao != asset.versao:
+        return redirect('perfil_segmentos_setor', asset.versao, setor)
+    return _resposta_asset(request, asset.versao, asset.fragmentos[setor])
@@ -0,0 +1,135 @@
+"""
+Listagens do admin para tabelas grandes.
+
+- PaginadorContagemEstimada: na listagem sem filtros, usa a estimativa de linhas do
+  banco (pg_class.reltuples no PostgreSQL, sqlite_stat1 no SQLite após ANALYZE) em vez
+  de um COUNT(*) que percorre a tabela inteira. Com filtro/busca, conta normalmente.
+- FiltroAutocomplete: filtro lateral para ForeignKey que mostra um campo de busca
+  (autocomplete do próprio admin) em vez de listar todos os objetos relacionados.
+  O ModelAdmin do modelo relacionado precisa de search_fields.
+- FiltroTexto: filtro por valor exato digitado, para campos texto de alta cardinalidade.
+- ListaGrandeMixin: junta o paginador estimado, show_full_result_count = False (evita
+  o segundo COUNT(*) com filtros ativos) e o media do autocomplete.
+"""
+from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+# Abaixo disso o COUNT(*) é barato e a contagem exata vale mais que a estimativa
+LIMIAR_ESTIMATIVA = 10000
+
+
+def estimar_linhas(modelo, using='default'):
+    """Estimativa de linhas da tabela segundo as estatísticas do banco, ou None."""
+    conexao = connections[using]
+    tabela = modelo._meta.db_table
+    if conexao.vendor == 'postgresql':
+        sql, params = "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", [tabela]
+    elif conexao.vendor == 'sqlite':
+        sql, params = "SELECT stat FROM sqlite_stat1 WHERE tbl = %s ORDER BY idx IS NULL DESC LIMIT 1", [tabela]
+    elif conexao.vendor == 'mysql':
+        sql, params = "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s", [tabela]
+    else:
+        return None
+
+    try:
+        with conexao.cursor() as cursor:
+            cursor.execute(sql, params)
+            linha = cursor.fetchone()
+    except DatabaseError:
+        # sqlite_stat1 só existe depois de um ANALYZE
+        return None
+    if not linha or linha[0] is None:
+        return None
+    try:
+        estimativa = int(str(linha[0]).split()[0])
+    except ValueError:
+        return None
+    return estimativa if estimativa >= 0 else None
+
+
+class PaginadorContagemEstimada(Paginator):
+    """Paginator que troca o COUNT(*) da listagem sem filtros pela estimativa do banco."""
+
+    @cached_property
+    def count(self):
+        object_list = self.object_list
+        if isinstance(object_list, QuerySet) and not object_list.query.where:
+            estimativa = estimar_linhas(object_list.model, object_list.db)
+            if estimativa is not None and estimativa >= LIMIAR_ESTIMATIVA:
+                return estimativa
+        return super().count
+
+
+class FiltroAutocomplete(admin.FieldListFilter):
+    """Filtro de ForeignKey com busca (select2 do admin) em vez da lista de todos os objetos."""
+    template = 'admin/filtros/autocomplete.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.parametro = f"{field_path}__{field.target_field.name}__exact"
+        super().__init__(field, request, params, model, model_admin, field_path)
+        valor = self.used_parameters.get(self.parametro)
+        self.valor = valor[-1] if isinstance(valor, list) else valor
+        self.admin_site = model_admin.admin_site
+
+    def expected_parameters(self):
+        return [self.parametro]
+
+    def choices(self, changelist):
+        self.campo_renderizado = self.campo(changelist)
+        yield {
+            'selected': self.valor is None,
+            'query_string': changelist.get_query_string(remove=[self.parametro]),
+            'display': 'Todos',
+        }
+
+    def campo(self, changelist):
+        """Select renderizado pelo widget de autocomplete do admin (só consulta o valor escolhido)."""
+        formfield = self.field.formfield(widget=AutocompleteSelect(self.field, self.admin_site))
+        return formfield.widget.render(self.parametro, self.valor, attrs={
+            'id': f'filtro_{self.parametro}',
+            'data-url-base': changelist.get_query_string(remove=[self.parametro, PAGE_VAR]),
+            'data-parametro': self.parametro,
+        })
+
+
+class FiltroTexto(admin.FieldListFilter):
+    """Filtro por valor exato digitado (usa o índice, sem listar os valores distintos)."""
+    template = 'admin/filtros/texto.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.parametro = f"{field_path}__exact"
+        super().__init__(field, request, params, model, model_admin, field_path)
+        valor = self.used_parameters.get(self.parametro)
+        self.valor = valor[-1] if isinstance(valor, list) else valor
+
+    def expected_parameters(self):
+        return [self.parametro]
+
+    def choices(self, changelist):
+        # GET de formulário descarta a query string do action: os demais filtros vão como hidden
+        self.parametros_mantidos = [
+            (nome, valor) for nome, valor in changelist.params.items() if nome not in (self.parametro, PAGE_VAR)
+        ]
+        yield {
+            'selected': self.valor is None,
+            'query_string': changelist.get_query_string(remove=[self.parametro]),
+            'display': 'Todos',
+        }
+
+
+class ListaGrandeMixin:
+    """ModelAdmin para tabelas grandes: contagem estimada e filtros sem listar relacionados."""
+    paginator = PaginadorContagemEstimada
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        media = super().media
+        if any(isinstance(filtro, tuple) and filtro[1] is FiltroAutocomplete for filtro in self.list_filter):
+            media += AutocompleteSelect(None, self.admin_site).media
+        return media
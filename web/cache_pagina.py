@@ -0,0 +1,47 @@
+"""
+Cache de página inteira para visitantes anônimos.
+
+Só é usado quando a requisição não traz cookie de sessão: nesse caso o usuário é
+anônimo sem precisar carregar a sessão, e a resposta pronta sai do cache sem tocar
+no banco. Usuários logados seguem para a view normalmente, com os fragmentos
+por usuário (navbar, links de checkout) renderizados a cada requisição.
+
+As páginas ficam no cache 'default' (locmem, por processo). A invalidação vem da
+`versao` na chave: ela só alcança todos os workers se a versão estiver num cache
+compartilhado (ex.: o alias 'catalogo' de catalogo_planos); caso contrário, cada
+worker serve sua cópia até o timeout.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _anonimo_sem_sessao(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+    )
+
+
+def cache_pagina_anonima(prefixo, versao=None, timeout=600):
+    """
+    Decorador de view. prefixo identifica a página; versao é um callable opcional
+    cujo valor entra na chave (ex.: versao_catalogo), invalidando as cópias antigas.
+    """
+    def decorador(view_func):
+        @wraps(view_func)
+        def wrapped_view(request, *args, **kwargs):
+            if not _anonimo_sem_sessao(request):
+                return view_func(request, *args, **kwargs)
+
+            sufixo = versao() if versao else ''
+            chave = f'pagina:{prefixo}:{sufixo}:{request.get_full_path()}'
+            response = cache.get(chave)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+                if response.status_code == 200 and not response.cookies and not response.streaming:
+                    cache.set(chave, response, timeout)
+            return response
+        return wrapped_view
+    return decorador
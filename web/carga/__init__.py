@@ -0,0 +1 @@
+# Testes de carga da camada web (ver executor.py)
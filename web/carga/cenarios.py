@@ -0,0 +1,147 @@
+"""
+Cenários dos testes de carga: o que cada usuário virtual faz até o fim da execução.
+
+- assinante: entra pelo formulário de login (com CSRF) e alterna, com pesos, entre a
+  lista de leads (ver_leads), o polling de uma coleta (leads_stream, 3 consultas
+  seguidas avançando since_id, como a página faz) e a exportação CSV; entre ações,
+  espera um tempo de "leitura" exponencial com média `pensar_s`;
+- remetente de webhooks: envia notificações de pagamento da massa, cada uma
+  `duplicatas` vezes em paralelo (conexões separadas), como o Mercado Pago faz ao
+  reentregar.
+
+As respostas vão para o Registro, por nome de URL.
+"""
+import asyncio
+import json
+import random
+import time
+from collections import Counter, defaultdict
+
+from django.urls import reverse
+
+from web.relatorio_desempenho import resumo_latencias
+
+from .cliente import ClienteHttp, ErroConexao
+from .massa import SENHA
+
+ACOES_ASSINANTE = {'ver_leads': 5, 'leads_stream': 4, 'export_leads_csv': 1}
+CONSULTAS_POLLING = 3
+
+
+class Registro:
+    """Latências e status por endpoint. Usado só pela thread do event loop."""
+
+    def __init__(self):
+        self.latencias = defaultdict(list)
+        self.status = defaultdict(Counter)
+        self.erros = Counter()
+
+    def registrar(self, nome, resposta, esperados=(200,)):
+        if isinstance(resposta, ErroConexao):
+            self.status[nome]['conexao'] += 1
+            self.erros[nome] += 1
+            return
+        self.latencias[nome].append(resposta.duracao_ms)
+        self.status[nome][str(resposta.status)] += 1
+        if resposta.status not in esperados:
+            self.erros[nome] += 1
+
+    def resumo(self, duracao_s):
+        """{'total': {...}, 'endpoints': {nome: {requisicoes, erros, por_segundo, status, latencia_ms}}}."""
+        endpoints = {}
+        for nome in sorted(self.status):
+            requisicoes = sum(self.status[nome].values())
+            endpoints[nome] = {
+                'requisicoes': requisicoes,
+                'erros': self.erros[nome],
+                'por_segundo': round(requisicoes / duracao_s, 2) if duracao_s else None,
+                'status': dict(self.status[nome]),
+                'latencia_ms': resumo_latencias(self.latencias[nome]),
+            }
+        todas = [valor for valores in self.latencias.values() for valor in valores]
+        requisicoes = sum(e['requisicoes'] for e in endpoints.values())
+        return {
+            'total': {
+                'requisicoes': requisicoes,
+                'erros': sum(self.erros.values()),
+                'por_segundo': round(requisicoes / duracao_s, 2) if duracao_s else None,
+                'latencia_ms': resumo_latencias(todas),
+            },
+            'endpoints': endpoints,
+        }
+
+
+async def _pedir(registro, nome, chamada, esperados=(200,)):
+    try:
+        resposta = await chamada
+    except ErroConexao as exc:
+        registro.registrar(nome, exc)
+        return None
+    registro.registrar(nome, resposta, esperados)
+    return resposta
+
+
+async def entrar(cliente, registro, username):
+    """Login pelo formulário. True se o servidor redirecionou (credenciais aceitas)."""
+    url = reverse('login')
+    if await _pedir(registro, 'login (formulário)', cliente.get(url)) is None:
+        return False
+    resposta = await _pedir(registro, 'login', cliente.post_formulario(url, {
+        'username': username, 'password': SENHA, 'csrfmiddlewaretoken': cliente.cookies.get('csrftoken', ''),
+    }), esperados=(302,))
+    return resposta is not None and resposta.status == 302
+
+
+async def _polling(cliente, registro, coleta_id, pensar_s):
+    since_id = 0
+    url = reverse('leads_stream', args=[coleta_id])
+    for _ in range(CONSULTAS_POLLING):
+        resposta = await _pedir(registro, 'leads_stream', cliente.get(url, {'since_id': since_id}))
+        if resposta is None or resposta.status != 200:
+            return
+        leads = json.loads(resposta.corpo).get('leads') or []
+        if leads:
+            since_id = leads[-1]['id']
+        await asyncio.sleep(pensar_s / CONSULTAS_POLLING)
+
+
+async def assinante(alvo, massa, indice, registro, fim, pensar_s):
+    username = massa.usuarios[indice % len(massa.usuarios)]
+    coletas = massa.coletas[username]
+    aleatorio = random.Random(indice)
+    nomes, pesos = zip(*ACOES_ASSINANTE.items())
+    async with ClienteHttp(*alvo) as cliente:
+        if not await entrar(cliente, registro, username):
+            return
+        while time.monotonic() < fim:
+            acao = aleatorio.choices(nomes, pesos)[0]
+            if acao == 'leads_stream':
+                await _polling(cliente, registro, aleatorio.choice(coletas), pensar_s)
+            elif acao == 'ver_leads':
+                await _pedir(registro, acao, cliente.get(reverse(acao), {'coleta': aleatorio.choice(coletas)}))
+            else:
+                await _pedir(registro, acao, cliente.get(reverse(acao)))
+            await asyncio.sleep(aleatorio.expovariate(1 / pensar_s) if pensar_s else 0)
+
+
+async def remetente_webhooks(alvo, massa, indice, remetentes, registro, fim, pensar_s, duplicatas):
+    pagamentos = massa.pagamentos[indice::remetentes]
+    if not pagamentos:
+        return
+    url = reverse('mercadopago_webhook')
+    clientes = [ClienteHttp(*alvo) for _ in range(duplicatas)]
+    enviados = 0
+    try:
+        while time.monotonic() < fim:
+            pagamento_id = pagamentos[enviados % len(pagamentos)]['id']
+            caminho = f'{url}?type=payment&data.id={pagamento_id}'
+            corpo = json.dumps({'type': 'payment', 'action': 'payment.updated',
+                                'data': {'id': str(pagamento_id)}}).encode('utf-8')
+            await asyncio.gather(*(
+                _pedir(registro, 'mercadopago_webhook', cliente.post_json(caminho, corpo)) for cliente in clientes
+            ))
+            enviados += 1
+            await asyncio.sleep(pensar_s)
+    finally:
+        for cliente in clientes:
+            await cliente.fechar()
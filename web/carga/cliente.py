@@ -0,0 +1,133 @@
+"""
+Cliente HTTP/1.1 mínimo sobre asyncio, um por usuário virtual.
+
+Mantém uma conexão keep-alive (reaberta se o servidor fechar) e os cookies da sessão,
+como um navegador. Lê corpos com Content-Length, chunked ou até o fim da conexão
+(respostas em streaming). Não segue redirecionamentos: 302 é a resposta medida.
+"""
+import asyncio
+import time
+from collections import namedtuple
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+Resposta = namedtuple('Resposta', ['status', 'cabecalhos', 'corpo', 'duracao_ms'])
+
+
+class ErroConexao(Exception):
+    pass
+
+
+class ClienteHttp:
+    def __init__(self, host, porta, tempo_limite=30):
+        self.host = host
+        self.porta = porta
+        self.tempo_limite = tempo_limite
+        self.cookies = {}
+        self._leitor = None
+        self._escritor = None
+
+    async def _conectar(self):
+        self._leitor, self._escritor = await asyncio.open_connection(self.host, self.porta)
+
+    async def fechar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+            try:
+                await self._escritor.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            self._leitor = self._escritor = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.fechar()
+
+    def _cabecalhos(self, metodo, caminho, corpo, extras):
+        linhas = [f'{metodo} {caminho} HTTP/1.1', f'Host: {self.host}:{self.porta}', 'Connection: keep-alive']
+        if self.cookies:
+            linhas.append('Cookie: ' + '; '.join(f'{nome}={valor}' for nome, valor in self.cookies.items()))
+        if corpo or metodo == 'POST':
+            linhas.append(f'Content-Length: {len(corpo)}')
+        linhas += [f'{nome}: {valor}' for nome, valor in (extras or {}).items()]
+        return ('\r\n'.join(linhas) + '\r\n\r\n').encode('latin-1')
+
+    async def _ler_corpo(self, cabecalhos):
+        if 'content-length' in cabecalhos:
+            return await self._leitor.readexactly(int(cabecalhos['content-length']))
+        if cabecalhos.get('transfer-encoding', '').lower() == 'chunked':
+            partes = []
+            while True:
+                tamanho = int((await self._leitor.readline()).split(b';')[0], 16)
+                if tamanho == 0:
+                    await self._leitor.readline()
+                    return b''.join(partes)
+                partes.append(await self._leitor.readexactly(tamanho))
+                await self._leitor.readline()
+        corpo = await self._leitor.read()  # até o servidor fechar a conexão
+        await self.fechar()
+        return corpo
+
+    async def _trocar(self, pedido):
+        self._escritor.write(pedido)
+        await self._escritor.drain()
+        linha_status = await self._leitor.readline()
+        if not linha_status:
+            raise ConnectionResetError('conexão fechada pelo servidor')
+        status = int(linha_status.split()[1])
+        cabecalhos, cookies = {}, []
+        while True:
+            linha = (await self._leitor.readline()).decode('latin-1').rstrip('\r\n')
+            if not linha:
+                break
+            nome, _, valor = linha.partition(':')
+            nome, valor = nome.strip().lower(), valor.strip()
+            if nome == 'set-cookie':
+                cookies.append(valor)
+            cabecalhos[nome] = valor
+        corpo = await self._ler_corpo(cabecalhos)
+        for valor in cookies:
+            for nome, morsel in SimpleCookie(valor).items():
+                if morsel['max-age'] == '0' or not morsel.value:
+                    self.cookies.pop(nome, None)
+                else:
+                    self.cookies[nome] = morsel.value
+        if cabecalhos.get('connection', '').lower() == 'close':
+            await self.fechar()
+        return status, cabecalhos, corpo
+
+    async def requisitar(self, metodo, caminho, corpo=b'', cabecalhos=None):
+        """Envia a requisição e retorna Resposta; ErroConexao se o servidor não responder."""
+        pedido = self._cabecalhos(metodo, caminho, corpo, cabecalhos) + corpo
+        inicio = time.perf_counter()
+        for tentativa in range(2):
+            reaproveitada = self._escritor is not None
+            try:
+                if not reaproveitada:
+                    await self._conectar()
+                status, cabecalhos_resposta, corpo_resposta = await asyncio.wait_for(
+                    self._trocar(pedido), self.tempo_limite,
+                )
+                break
+            except (ConnectionError, asyncio.IncompleteReadError, OSError, asyncio.TimeoutError) as exc:
+                await self.fechar()
+                # Keep-alive ocioso fechado pelo servidor: uma nova tentativa em conexão nova
+                if reaproveitada and tentativa == 0 and not isinstance(exc, asyncio.TimeoutError):
+                    continue
+                raise ErroConexao(f'{metodo} {caminho}: {type(exc).__name__}: {exc}') from exc
+        return Resposta(status, cabecalhos_resposta, corpo_resposta, (time.perf_counter() - inicio) * 1000)
+
+    async def get(self, caminho, parametros=None):
+        if parametros:
+            caminho = f'{caminho}?{urlencode(parametros)}'
+        return await self.requisitar('GET', caminho)
+
+    async def post_formulario(self, caminho, dados):
+        return await self.requisitar('POST', caminho, urlencode(dados).encode('utf-8'), {
+            'Content-Type': 'application/x-www-form-urlencoded',
+        })
+
+    async def post_json(self, caminho, corpo):
+        return await self.requisitar('POST', caminho, corpo, {'Content-Type': 'application/json'})
@@ -0,0 +1,101 @@
+"""
+Testes de carga da camada web: quantos assinantes simultâneos um worker atende.
+
+Um cliente HTTP em asyncio (cliente.py) simula N assinantes (login, ver_leads,
+polling do leads_stream, exportação CSV) e remetentes de webhooks duplicados
+(cenarios.py) contra:
+- um servidor local: o servidor WSGI multithread do runserver, em uma thread deste
+  processo, sobre um banco SQLite de teste em arquivo, com a massa de massa.py e as
+  APIs externas no stub local (web.servidores_stub);
+- ou um servidor já em execução (--url), com a massa semeada antes (--semear).
+
+O resultado traz, por endpoint, requisições, erros, requisições/s e percentis de
+latência (web.relatorio_desempenho). No modo local, a caixa de entrada dos webhooks é
+processada no fim: cada pagamento deve confirmar uma compra só uma vez.
+Comando: python manage.py testar_carga.
+"""
+import asyncio
+import threading
+import time
+from collections import Counter
+
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+
+from .cenarios import Registro, assinante, remetente_webhooks
+
+
+class _ManipuladorSilencioso(WSGIRequestHandler):
+    def log_message(self, formato, *args):
+        pass
+
+
+class ServidorLocal:
+    """Servidor WSGI do Django (o do runserver, uma thread por requisição) em 127.0.0.1."""
+
+    def __init__(self):
+        self._servidor = None
+        self._thread = None
+
+    def __enter__(self):
+        self._servidor = ThreadedWSGIServer(('127.0.0.1', 0), _ManipuladorSilencioso, allow_reuse_address=False)
+        self._servidor.set_app(get_wsgi_application())
+        self._thread = threading.Thread(target=self._servidor.serve_forever, name='servidor-carga', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+        self._thread.join()
+
+    @property
+    def endereco(self):
+        return self._servidor.server_address[:2]
+
+
+async def _executar(alvo, massa, usuarios, remetentes, duplicatas, duracao_s, pensar_s, rampa_s):
+    registro = Registro()
+    inicio = time.monotonic()
+    fim = inicio + rampa_s + duracao_s
+
+    async def com_atraso(atraso, corrotina):
+        await asyncio.sleep(atraso)
+        await corrotina
+
+    tarefas = [
+        com_atraso(rampa_s * i / max(usuarios, 1), assinante(alvo, massa, i, registro, fim, pensar_s))
+        for i in range(usuarios)
+    ]
+    tarefas += [
+        remetente_webhooks(alvo, massa, i, remetentes, registro, fim, pensar_s, duplicatas)
+        for i in range(remetentes)
+    ]
+    await asyncio.gather(*tarefas)
+    return registro.resumo(time.monotonic() - inicio)
+
+
+def executar_carga(alvo, massa, usuarios=20, remetentes=2, duplicatas=3, duracao_s=30, pensar_s=0.5, rampa_s=0):
+    """Roda os cenários contra alvo=(host, porta) e retorna o resumo por endpoint."""
+    return asyncio.run(_executar(alvo, massa, usuarios, remetentes, duplicatas, duracao_s, pensar_s, rampa_s))
+
+
+def verificar_webhooks(massa):
+    """
+    Processa a caixa de entrada (com o Mercado Pago no stub) e confere a idempotência:
+    cada pagamento recebido confirma uma compra no máximo uma vez.
+    """
+    from pagamentos.models import Compra, EventoMercadoPago, NotificacaoWebhook
+    from pagamentos.servicos.webhook_inbox import processar_pendentes
+
+    while processar_pendentes():
+        pass
+    recebidos = set(NotificacaoWebhook.objects.values_list('recurso_id', flat=True).distinct())
+    referencias = [p['external_reference'] for p in massa.pagamentos if str(p['id']) in recebidos]
+    return {
+        'notificacoes': NotificacaoWebhook.objects.count(),
+        'pagamentos_distintos': len(recebidos),
+        'resultados': dict(Counter(NotificacaoWebhook.objects.values_list('resultado', flat=True))),
+        'eventos_aplicados': EventoMercadoPago.objects.count(),
+        'compras_pagas': Compra.objects.filter(pk__in=referencias, status='paga').count(),
+    }
@@ -0,0 +1,72 @@
+"""
+Massa de dados dos testes de carga: assinantes com coletas e leads, e compras
+pendentes cujos pagamentos chegam pelo webhook.
+
+Gravada em lote (web.fabricas), com a senha dos usuários hasheada uma única vez. A
+Massa (usuários, coletas de cada um, ids de pagamento) é o que os cenários precisam
+saber do banco; para um servidor externo, ela vai para um arquivo JSON
+(testar_carga --semear) e é lida de volta na execução (--url --massa).
+"""
+import json
+from collections import namedtuple
+from pathlib import Path
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from web.fabricas import criar_leads
+
+SENHA = 'carga-senha-123'
+PAGAMENTO_ID_BASE = 900000
+PREFIXO = 'carga'
+
+Massa = namedtuple('Massa', ['usuarios', 'coletas', 'pagamentos'])
+Massa.__doc__ = "usuarios: [username]; coletas: {username: [coleta_id]}; pagamentos: [{id, external_reference, ...}]"
+
+
+def semear_massa(usuarios=20, coletas_por_usuario=2, leads_por_coleta=500, compras=50):
+    """Cria a massa no banco atual e retorna a Massa."""
+    from pagamentos.models import AcessoUsuario, Compra, Oferta
+    from perfil.models import PerfilEmpresa
+
+    senha = make_password(SENHA)
+    with transaction.atomic():
+        criados = User.objects.bulk_create([
+            User(username=f'{PREFIXO}{i}', email=f'{PREFIXO}{i}@example.com', password=senha)
+            for i in range(usuarios)
+        ])
+        AcessoUsuario.objects.bulk_create([
+            AcessoUsuario(usuario=u, nivel='profissional', status='ativo', leads_limite_mensal=100000)
+            for u in criados
+        ])
+        PerfilEmpresa.objects.bulk_create([PerfilEmpresa(usuario=u) for u in criados])
+        coletas = {
+            u.username: [c.pk for c in criar_leads(u, coletas=coletas_por_usuario, leads_por_coleta=leads_por_coleta)]
+            for u in criados
+        }
+
+        oferta, _ = Oferta.objects.get_or_create(
+            slug='basico_mensal',
+            defaults={'nome_exibicao': 'Básico - Mensal', 'valor_centavos': 11900, 'leads_mensais': 300},
+        )
+        pendentes = Compra.objects.bulk_create([
+            Compra(usuario=criados[i % len(criados)] if criados else None, oferta=oferta)
+            for i in range(compras)
+        ])
+    pagamentos = [
+        {
+            'id': PAGAMENTO_ID_BASE + i, 'external_reference': str(compra.pk), 'status': 'approved',
+            'date_last_updated': '2026-01-01T00:00:00Z',
+        }
+        for i, compra in enumerate(pendentes)
+    ]
+    return Massa([u.username for u in criados], coletas, pagamentos)
+
+
+def salvar_massa(massa, caminho):
+    Path(caminho).write_text(json.dumps(massa._asdict(), indent=2), encoding='utf-8')
+
+
+def carregar_massa(caminho):
+    return Massa(**json.loads(Path(caminho).read_text(encoding='utf-8')))
@@ -0,0 +1,30 @@
+"""
+Executor da suíte de testes rápida (TEST_RUNNER de web.settings_testes).
+
+Igual ao DiscoverRunner, mas paralelo por padrão: sem --parallel na linha de comando,
+usa um processo por CPU (ou DJANGO_TEST_PROCESSES, se definido). --parallel=1 volta
+à execução serial, útil com --pdb ou para depurar um teste isolado.
+
+Os processos devolvem falhas e erros ao processo principal com pickle, e o traceback
+só é serializável com o pacote tblib. Sem ele, o padrão é serial (um erro derrubaria
+a execução paralela inteira); --parallel explícito é sempre respeitado.
+"""
+import importlib.util
+import sys
+
+from django.test.runner import DiscoverRunner, get_max_test_processes
+
+
+def processos_padrao():
+    if importlib.util.find_spec('tblib') is None:
+        return 1
+    return get_max_test_processes()
+
+
+class ExecutorTestesParalelo(DiscoverRunner):
+    def __init__(self, parallel=0, **kwargs):
+        if not parallel:
+            parallel = processos_padrao()
+            if parallel == 1 and get_max_test_processes() > 1:
+                sys.stderr.write('tblib não instalado: testes em série (pip install tblib para paralelizar)\n')
+        super().__init__(parallel=parallel, **kwargs)
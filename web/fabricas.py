@@ -0,0 +1,96 @@
+"""
+Fábricas de massas de dados para os testes (e para os comandos de medição).
+
+Tudo é gravado em lote (bulk_create), para que milhares de leads ou visitantes custem
+poucas consultas. Os TestCases devem criar a massa uma vez por classe, em
+setUpTestData: o Django envolve a classe em uma transação e devolve a cada teste uma
+cópia dos atributos, então os testes podem alterá-los sem afetar os seguintes.
+DadosAssinanteTestCase faz isso para o caso comum (assinante com coletas e leads).
+"""
+import uuid
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+TAMANHO_LOTE = 500
+
+BAIRROS = ('Boa Viagem', 'Casa Forte', 'Espinheiro', 'Graças', 'Pina')
+PAGINAS = ('/', '/planos/', '/crm/', '/perfil/', '/dashboard/')
+
+
+def criar_assinante(username='assinante', nivel='profissional', leads_limite=1000, com_perfil=True):
+    """Usuário com acesso manual ativo (pagamento em dia) e, opcionalmente, perfil da empresa."""
+    from pagamentos.models import AcessoUsuario
+    from perfil.models import PerfilEmpresa
+
+    usuario = User.objects.create_user(username, f'{username}@example.com', 'senha')
+    AcessoUsuario.objects.create(
+        usuario=usuario, nivel=nivel, status='ativo', leads_limite_mensal=leads_limite,
+    )
+    if com_perfil:
+        PerfilEmpresa.objects.create(usuario=usuario)
+    return usuario
+
+
+def criar_leads(usuario, coletas=5, leads_por_coleta=200, cidade='Recife', tamanho_lote=TAMANHO_LOTE):
+    """Coletas concluídas com leads, gravadas em bulk. Retorna a lista de coletas."""
+    from crm.models import Coleta, Lead
+
+    criadas = Coleta.objects.bulk_create([
+        Coleta(usuario=usuario, keyword=f'categoria {c}', cidade=cidade, status='concluida')
+        for c in range(coletas)
+    ])
+    Lead.objects.bulk_create(
+        (
+            Lead(
+                usuario=usuario, coleta=coleta, place_id=f'{coleta.pk}-{i}', categoria=coleta.keyword,
+                cidade=cidade, bairro=BAIRROS[i % len(BAIRROS)], nome=f'Empresa {coleta.pk}-{i}',
+                telefone='(81) 3000-0000', endereco='Av. Boa Viagem, 1000', total_avaliacoes=i,
+            )
+            for coleta in criadas
+            for i in range(leads_por_coleta)
+        ),
+        batch_size=tamanho_lote,
+    )
+    return criadas
+
+
+def criar_visitantes(quantidade, usuario=None, tamanho_lote=TAMANHO_LOTE):
+    """Acessos registrados (dados_acesso.Visitor), de um usuário ou anônimos. Retorna a quantidade."""
+    from dados_acesso.models import Visitor
+
+    username = usuario.username if usuario else 'Visitante'
+    Visitor.objects.bulk_create(
+        (
+            Visitor(
+                ip_address=f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}',
+                user_agent='Mozilla/5.0 (testes)', page_visited=PAGINAS[i % len(PAGINAS)],
+                machine_key=uuid.UUID(int=i), username=username,
+            )
+            for i in range(quantidade)
+        ),
+        batch_size=tamanho_lote,
+    )
+    return quantidade
+
+
+class DadosAssinanteTestCase(TestCase):
+    """
+    TestCase com um assinante (cls.usuario) e, se declarado na classe, coletas com
+    leads (cls.coletas) e visitantes, criados uma única vez em setUpTestData.
+    """
+    nivel = 'profissional'
+    leads_limite = 1000
+    massa_coletas = 0
+    massa_leads_por_coleta = 200
+    massa_visitantes = 0
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.usuario = criar_assinante(nivel=cls.nivel, leads_limite=cls.leads_limite)
+        cls.coletas = criar_leads(
+            cls.usuario, coletas=cls.massa_coletas, leads_por_coleta=cls.massa_leads_por_coleta,
+        ) if cls.massa_coletas else []
+        if cls.massa_visitantes:
+            criar_visitantes(cls.massa_visitantes, usuario=cls.usuario)
@@ -0,0 +1,175 @@
+"""
+Exportação em streaming e importação em lotes para os ModelResources do admin.
+
+O fluxo padrão do django-import-export monta um tablib.Dataset inteiro em memória
+antes de responder, o que estoura tempo/memória em tabelas grandes (Visitor, Lead...).
+Aqui o queryset é percorrido em blocos no servidor e cada linha é escrita assim que
+é gerada (CSV) ou enviada para um arquivo temporário em modo write-only (XLSX).
+"""
+import csv
+import tempfile
+from datetime import date, datetime
+from itertools import islice
+
+import tablib
+from django.contrib import admin
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+TAMANHO_LOTE_PADRAO = 1000
+
+CONTENT_TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class _Echo:
+    """Pseudo-buffer: csv.writer escreve e a linha é devolvida ao gerador."""
+
+    def write(self, value):
+        return value
+
+
+def _nome_arquivo(queryset, extensao):
+    modelo = queryset.model._meta.model_name
+    return f"{modelo}-{timezone.now().strftime('%Y-%m-%d_%H%M')}.{extensao}"
+
+
+def iterar_linhas_exportacao(resource, queryset):
+    """
+    Gera o cabeçalho e depois uma linha por objeto do queryset.
+    O queryset é lido em blocos de Meta.chunk_size (iterator do Django).
+    """
+    queryset = resource.filter_export(queryset)
+    yield resource.get_export_headers()
+    for obj in resource.iter_queryset(queryset):
+        yield resource.export_resource(obj)
+
+
+def exportar_csv_streaming(resource, queryset, nome_arquivo=None):
+    """Retorna StreamingHttpResponse com o CSV gerado linha a linha."""
+    writer = csv.writer(_Echo(), delimiter=';')
+
+    def conteudo():
+        yield '\ufeff'
+        for linha in iterar_linhas_exportacao(resource, queryset):
+            yield writer.writerow(linha)
+
+    response = StreamingHttpResponse(conteudo(), content_type='text/csv; charset=utf-8')
+    nome = nome_arquivo or _nome_arquivo(queryset, 'csv')
+    response['Content-Disposition'] = f'attachment; filename="{nome}"'
+    return response
+
+
+def exportar_xlsx_streaming(resource, queryset, nome_arquivo=None):
+    """
+    Retorna FileResponse com o XLSX montado em modo write-only.
+    As linhas vão direto para disco, então a memória não cresce com o tamanho da tabela.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=queryset.model._meta.model_name[:31])
+    for linha in iterar_linhas_exportacao(resource, queryset):
+        ws.append([_valor_xlsx(v) for v in linha])
+
+    arquivo = tempfile.TemporaryFile(suffix='.xlsx')
+    wb.save(arquivo)
+    arquivo.seek(0)
+    nome = nome_arquivo or _nome_arquivo(queryset, 'xlsx')
+    return FileResponse(arquivo, as_attachment=True, filename=nome, content_type=CONTENT_TYPE_XLSX)
+
+
+def _valor_xlsx(valor):
+    # openpyxl não aceita datetimes com timezone nem objetos arbitrários (UUID, Decimal...)
+    if isinstance(valor, datetime) and timezone.is_aware(valor):
+        return timezone.localtime(valor).replace(tzinfo=None)
+    if valor is None or isinstance(valor, (str, int, float, bool, date)):
+        return valor
+    return str(valor)
+
+
+class ExportacaoStreamingMixin:
+    """
+    Mixin para ImportExportModelAdmin que adiciona ações de exportação em streaming.
+    Com "selecionar todos" no changelist a ação cobre a tabela inteira sem montar
+    o Dataset em memória.
+    """
+
+    actions = ['exportar_csv_streaming', 'exportar_xlsx_streaming']
+
+    def _resource_streaming(self, request):
+        resource_class = self.get_export_resource_classes(request)[0]
+        return resource_class(**self.get_export_resource_kwargs(request))
+
+    @admin.action(description='Exportar selecionados em CSV (streaming)')
+    def exportar_csv_streaming(self, request, queryset):
+        return exportar_csv_streaming(self._resource_streaming(request), queryset.order_by('pk'))
+
+    @admin.action(description='Exportar selecionados em XLSX (streaming)')
+    def exportar_xlsx_streaming(self, request, queryset):
+        return exportar_xlsx_streaming(self._resource_streaming(request), queryset.order_by('pk'))
+
+
+def iterar_lotes_arquivo(caminho, tamanho_lote=TAMANHO_LOTE_PADRAO, delimitador=None):
+    """
+    Lê um CSV ou XLSX de forma incremental e gera tablib.Datasets de até tamanho_lote linhas.
+    """
+    if str(caminho).lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+
+        wb = load_workbook(caminho, read_only=True, data_only=True)
+        try:
+            linhas = wb.active.iter_rows(values_only=True)
+            yield from _agrupar_em_datasets(linhas, tamanho_lote)
+        finally:
+            wb.close()
+        return
+
+    with open(caminho, newline='', encoding='utf-8-sig') as arquivo:
+        if delimitador is None:
+            amostra = arquivo.read(4096)
+            arquivo.seek(0)
+            try:
+                delimitador = csv.Sniffer().sniff(amostra, delimiters=',;\t').delimiter
+            except csv.Error:
+                delimitador = ','
+        yield from _agrupar_em_datasets(csv.reader(arquivo, delimiter=delimitador), tamanho_lote)
+
+
+def _agrupar_em_datasets(linhas, tamanho_lote):
+    linhas = iter(linhas)
+    cabecalho = next(linhas, None)
+    if not cabecalho:
+        return
+    cabecalho = [str(c) for c in cabecalho]
+    while True:
+        bloco = list(islice(linhas, tamanho_lote))
+        if not bloco:
+            return
+        yield tablib.Dataset(*bloco, headers=cabecalho)
+
+
+def importar_em_lotes(resource, lotes, dry_run=False, progresso=None):
+    """
+    Importa uma sequência de Datasets, um lote por transação.
+    Resources com Meta.use_bulk gravam cada lote com bulk_create/bulk_update.
+    progresso(linhas_processadas, totais) é chamado ao fim de cada lote.
+    Retorna (totais, erros), onde erros é uma lista de (linha_global, mensagem).
+    """
+    totais = {}
+    erros = []
+    processadas = 0
+    for lote in lotes:
+        result = resource.import_data(lote, dry_run=dry_run, use_transactions=True, raise_errors=False)
+        for tipo, quantidade in result.totals.items():
+            totais[tipo] = totais.get(tipo, 0) + quantidade
+        for numero, linha_erros in result.row_errors():
+            for erro in linha_erros:
+                erros.append((processadas + numero, str(erro.error)))
+        for invalida in result.invalid_rows:
+            erros.append((processadas + invalida.number, str(invalida.error)))
+        for erro in result.base_errors:
+            erros.append((processadas, str(erro.error)))
+        processadas += len(lote)
+        if progresso:
+            progresso(processadas, totais)
+    return totais, erros
@@ -0,0 +1,208 @@
+"""
+Instrumentação do caminho quente: em cada requisição, quanto foi banco, quanto foram
+chamadas externas (Google Places, Mercado Pago) e quanto foi renderização de template.
+
+- InstrumentacaoMiddleware (logo após o SecurityMiddleware) abre uma Medicao no
+  contextvar da requisição e instala um execute_wrapper nas conexões de banco. Na
+  resposta, grava:
+  - o cabeçalho Server-Timing (db, render, http por host, total), exibido pelo
+    DevTools do navegador na aba Network;
+  - uma linha de log estruturada (chave=valor) no logger 'web.instrumentacao', INFO;
+  - o histograma 'http_requisicao_ms' por rota e fase (web.metricas).
+- chamada_externa(host) envolve as chamadas HTTP de places_collector e de
+  mercadopago_cliente: soma na Medicao da requisição corrente, se houver (a coleta
+  roda em thread própria, sem requisição), e no histograma 'http_externo_ms' por host.
+- DjangoTemplatesInstrumentado (TEMPLATES['BACKEND']) mede a renderização dos templates
+  de nível superior. O tempo de render inclui as consultas feitas durante a
+  renderização, que também aparecem em db.
+- metricas: view de /metrics no formato texto do Prometheus, ligada por
+  METRICAS_HABILITADAS e, se METRICAS_TOKEN estiver definido, protegida por
+  "Authorization: Bearer <token>".
+
+Em respostas em streaming, o Server-Timing sai com o que foi medido até os cabeçalhos;
+a linha de log e os histogramas incluem a geração do corpo.
+"""
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.template.backends.django import DjangoTemplates
+from django.utils.crypto import constant_time_compare
+
+from .metricas import histogramas, texto_prometheus
+
+logger = logging.getLogger(__name__)
+
+METRICA_REQUISICAO = 'http_requisicao_ms'
+METRICA_EXTERNA = 'http_externo_ms'
+
+_medicao_atual = ContextVar('medicao_requisicao', default=None)
+
+
+class Medicao:
+    """Tempos acumulados de uma requisição (ms)."""
+    __slots__ = ('consultas', 'db_ms', 'render_ms', 'http', 'renderizando')
+
+    def __init__(self):
+        self.consultas = 0
+        self.db_ms = 0.0
+        self.render_ms = 0.0
+        self.http = {}  # host -> [chamadas, ms]
+        self.renderizando = False
+
+    def registrar_http(self, host, duracao_ms):
+        chamadas = self.http.setdefault(host, [0, 0.0])
+        chamadas[0] += 1
+        chamadas[1] += duracao_ms
+
+    @property
+    def http_chamadas(self):
+        return sum(chamadas for chamadas, _ in self.http.values())
+
+    @property
+    def http_ms(self):
+        return sum(ms for _, ms in self.http.values())
+
+
+def medicao_atual():
+    """Medicao da requisição em andamento nesta thread/contexto, ou None."""
+    return _medicao_atual.get()
+
+
+@contextmanager
+def chamada_externa(host):
+    """Mede uma chamada HTTP de saída para `host`."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        histogramas.observar(METRICA_EXTERNA, duracao_ms, {'host': host})
+        medicao = _medicao_atual.get()
+        if medicao is not None:
+            medicao.registrar_http(host, duracao_ms)
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicao.consultas += 1
+        medicao.db_ms += (time.perf_counter() - inicio) * 1000
+
+
+@contextmanager
+def _medindo(medicao):
+    """Torna `medicao` a corrente e mede as consultas de todas as conexões."""
+    token = _medicao_atual.set(medicao)
+    try:
+        with ExitStack() as pilha:
+            for conexao in connections.all():
+                pilha.enter_context(conexao.execute_wrapper(_medir_consulta))
+            yield
+    finally:
+        _medicao_atual.reset(token)
+
+
+def server_timing(medicao, total_ms):
+    """Valor do cabeçalho Server-Timing."""
+    entradas = [
+        f'db;dur={medicao.db_ms:.1f};desc="{medicao.consultas} consultas"',
+        f'render;dur={medicao.render_ms:.1f}',
+    ]
+    entradas += [
+        f'http;dur={ms:.1f};desc="{host} ({chamadas})"'
+        for host, (chamadas, ms) in sorted(medicao.http.items())
+    ]
+    entradas.append(f'total;dur={total_ms:.1f}')
+    return ', '.join(entradas)
+
+
+def _registrar(request, response, medicao, total_ms):
+    rota = getattr(request.resolver_match, 'view_name', None) or 'sem_rota'
+    for fase, valor in (('total', total_ms), ('db', medicao.db_ms), ('render', medicao.render_ms),
+                        ('http', medicao.http_ms)):
+        histogramas.observar(METRICA_REQUISICAO, valor, {'rota': rota, 'fase': fase})
+    logger.info(
+        "requisicao metodo=%s rota=%s status=%s total_ms=%.1f db_consultas=%s db_ms=%.1f "
+        "http_chamadas=%s http_ms=%.1f http_hosts=%s render_ms=%.1f",
+        request.method, rota, response.status_code, total_ms, medicao.consultas, medicao.db_ms,
+        medicao.http_chamadas, medicao.http_ms,
+        ','.join(f'{host}:{chamadas}' for host, (chamadas, _) in sorted(medicao.http.items())) or '-',
+        medicao.render_ms,
+    )
+
+
+class InstrumentacaoMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        medicao = Medicao()
+        inicio = time.perf_counter()
+        with _medindo(medicao):
+            response = self.get_response(request)
+        response['Server-Timing'] = server_timing(medicao, (time.perf_counter() - inicio) * 1000)
+
+        if response.streaming and not getattr(response, 'is_async', False):
+            response.streaming_content = self._corpo_medido(request, response, medicao, inicio)
+        else:
+            _registrar(request, response, medicao, (time.perf_counter() - inicio) * 1000)
+        return response
+
+    @staticmethod
+    def _corpo_medido(request, response, medicao, inicio):
+        conteudo = response.streaming_content
+        try:
+            with _medindo(medicao):
+                yield from conteudo
+        finally:
+            _registrar(request, response, medicao, (time.perf_counter() - inicio) * 1000)
+
+
+class TemplateMedido:
+    """Template do backend com a renderização somada à Medicao corrente."""
+
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, nome):
+        return getattr(self._template, nome)
+
+    def render(self, context=None, request=None):
+        medicao = _medicao_atual.get()
+        if medicao is None or medicao.renderizando:  # aninhado: já medido pelo externo
+            return self._template.render(context, request)
+        medicao.renderizando = True
+        inicio = time.perf_counter()
+        try:
+            return self._template.render(context, request)
+        finally:
+            medicao.renderizando = False
+            medicao.render_ms += (time.perf_counter() - inicio) * 1000
+
+
+class DjangoTemplatesInstrumentado(DjangoTemplates):
+    def from_string(self, template_code):
+        return TemplateMedido(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TemplateMedido(super().get_template(template_name))
+
+
+def metricas(request):
+    """Histogramas do processo (web.metricas) no formato texto do Prometheus."""
+    if not getattr(settings, 'METRICAS_HABILITADAS', False):
+        raise Http404
+    token = getattr(settings, 'METRICAS_TOKEN', '')
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(texto_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,125 @@
+"""
+Histogramas de latência em memória, por processo.
+
+Cada série é identificada por um nome e rótulos (ex.: nome='mercadopago_http_ms',
+rotulos={'endpoint': 'GET /v1/payments/{id}', 'fase': 'total'}) e conta as
+observações em baldes fixos de milissegundos, no formato dos histogramas Prometheus.
+Observar é O(log baldes) sob um lock curto; não há I/O nem banco.
+texto_prometheus() exporta o registro no formato texto do Prometheus (endpoint /metrics,
+ver web.instrumentacao).
+"""
+import bisect
+import threading
+
+LIMITES_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histograma:
+    """Contagens por balde (limite superior em ms), soma e total de observações."""
+
+    def __init__(self, limites=LIMITES_MS):
+        self.limites = tuple(limites)
+        self.contagens = [0] * (len(self.limites) + 1)  # último balde: acima do maior limite
+        self.soma_ms = 0.0
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def observar(self, valor_ms):
+        indice = bisect.bisect_left(self.limites, valor_ms)
+        with self._lock:
+            self.contagens[indice] += 1
+            self.soma_ms += valor_ms
+            self.total += 1
+
+    def percentil(self, p):
+        """Limite superior do balde que contém o percentil p (0-100); None sem dados."""
+        with self._lock:
+            contagens, total = list(self.contagens), self.total
+        if not total:
+            return None
+        alvo = total * p / 100
+        acumulado = 0
+        for limite, contagem in zip(self.limites + (float('inf'),), contagens):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return limite
+        return float('inf')
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'limites_ms': self.limites,
+                'contagens': list(self.contagens),
+                'soma_ms': self.soma_ms,
+                'total': self.total,
+            }
+
+
+class RegistroHistogramas:
+    """Registro thread-safe de histogramas por (nome, rótulos)."""
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _chave(nome, rotulos):
+        return nome, tuple(sorted((rotulos or {}).items()))
+
+    def histograma(self, nome, rotulos=None):
+        chave = self._chave(nome, rotulos)
+        serie = self._series.get(chave)
+        if serie is None:
+            with self._lock:
+                serie = self._series.setdefault(chave, Histograma())
+        return serie
+
+    def observar(self, nome, valor_ms, rotulos=None):
+        self.histograma(nome, rotulos).observar(valor_ms)
+
+    def series(self, nome=None):
+        """Lista de (nome, rotulos, snapshot), opcionalmente filtrada pelo nome."""
+        with self._lock:
+            itens = list(self._series.items())
+        return [
+            (n, dict(rotulos), h.snapshot())
+            for (n, rotulos), h in sorted(itens)
+            if nome is None or n == nome
+        ]
+
+    def limpar(self):
+        with self._lock:
+            self._series.clear()
+
+
+histogramas = RegistroHistogramas()
+
+
+def _escapar_rotulo(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _rotulos_prometheus(rotulos):
+    if not rotulos:
+        return ''
+    return '{' + ','.join(f'{nome}="{_escapar_rotulo(valor)}"' for nome, valor in rotulos) + '}'
+
+
+def texto_prometheus(registro=None):
+    """Todas as séries do registro como histogramas no formato texto do Prometheus 0.0.4."""
+    registro = histogramas if registro is None else registro
+    linhas = []
+    nome_atual = None
+    for nome, rotulos, snapshot in registro.series():
+        if nome != nome_atual:
+            linhas.append(f'# TYPE {nome} histogram')
+            nome_atual = nome
+        rotulos = sorted(rotulos.items())
+        acumulado = 0
+        limites = [*(f'{limite:g}' for limite in snapshot['limites_ms']), '+Inf']
+        for limite, contagem in zip(limites, snapshot['contagens']):
+            acumulado += contagem
+            linhas.append(f"{nome}_bucket{_rotulos_prometheus([*rotulos, ('le', limite)])} {acumulado}")
+        linhas.append(f"{nome}_sum{_rotulos_prometheus(rotulos)} {snapshot['soma_ms']:g}")
+        linhas.append(f"{nome}_count{_rotulos_prometheus(rotulos)} {snapshot['total']}")
+    return '\n'.join(linhas) + '\n'
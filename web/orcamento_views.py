@@ -0,0 +1,119 @@
+"""
+Orçamento de consultas e tempo por view, verificado nos testes.
+
+Cada nome de URL em ORCAMENTOS declara o máximo de consultas SQL, de consultas
+duplicadas (mesmo SQL com os mesmos parâmetros) e de tempo de parede da requisição.
+Os testes de cada app medem a view com OrcamentoViewsMixin.assertDentroDoOrcamento
+sobre massas de dados de tamanho realista (web.fabricas): uma
+regressão N+1 estoura o orçamento e derruba a suíte antes do deploy.
+
+As contagens incluem os middlewares (sessão, autenticação, VisitorMiddleware), como
+em produção, e são sempre verificadas. O tempo de parede varia com a máquina, então só
+é verificado quando settings.ORCAMENTO_TEMPO_FATOR (env ORCAMENTO_TEMPO_FATOR) é maior
+que 0: o limite é multiplicado por ele (ex.: 1 numa máquina dedicada, 3 num CI lento).
+O padrão 0 desliga a checagem de tempo.
+"""
+import re
+import time
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+Orcamento = namedtuple('Orcamento', ['consultas', 'duplicadas', 'tempo_ms'], defaults=[0, 1000])
+Medicao = namedtuple('Medicao', ['resposta', 'consultas', 'duplicadas', 'tempo_ms', 'sql'])
+
+ORCAMENTOS = {
+    # crm
+    'crm': Orcamento(consultas=4),
+    'coletar_leads': Orcamento(consultas=4),
+    'ver_leads': Orcamento(consultas=6),
+    'leads_stream': Orcamento(consultas=7),
+    'export_leads_csv': Orcamento(consultas=5),
+    # perfil / dashboard
+    'perfil': Orcamento(consultas=8),
+    'dashboard': Orcamento(consultas=5),
+    # pagamentos
+    'planos': Orcamento(consultas=5),
+    'plataforma_inicio': Orcamento(consultas=6),
+    'mercadopago_webhook': Orcamento(consultas=2, tempo_ms=200),
+}
+
+_LITERAIS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def formato_sql(sql):
+    """SQL com literais trocados por '?': agrupa as consultas de um mesmo N+1."""
+    return _LITERAIS.sub('?', sql)
+
+
+def consultas_duplicadas(sqls):
+    """Quantas execuções repetem exatamente um SQL já executado na mesma requisição."""
+    return sum(n - 1 for n in Counter(sqls).values() if n > 1)
+
+
+def medir(client, metodo, url, **kwargs):
+    """Executa a requisição com o test client e mede consultas, duplicadas e tempo."""
+    with CaptureQueriesContext(connection) as ctx:
+        inicio = time.perf_counter()
+        resposta = getattr(client, metodo)(url, **kwargs)
+        if getattr(resposta, 'streaming', False):
+            b''.join(resposta.streaming_content)  # o corpo faz parte do custo da view
+        tempo_ms = (time.perf_counter() - inicio) * 1000
+    sqls = [q['sql'] for q in ctx.captured_queries]
+    return Medicao(resposta, len(sqls), consultas_duplicadas(sqls), tempo_ms, sqls)
+
+
+def _relatorio(nome_url, medicao, orcamento):
+    repetidas = Counter(formato_sql(sql) for sql in medicao.sql).most_common(3)
+    linhas = [
+        f"{nome_url}: {medicao.consultas} consultas (orçamento {orcamento.consultas}), "
+        f"{medicao.duplicadas} duplicadas (orçamento {orcamento.duplicadas}), "
+        f"{medicao.tempo_ms:.0f} ms ({_orcamento_tempo(orcamento)})",
+        "Consultas mais repetidas:",
+    ]
+    linhas += [f"  {n}x {sql[:200]}" for sql, n in repetidas]
+    return '\n'.join(linhas)
+
+
+def fator_tempo():
+    """Multiplicador do orçamento de tempo; 0 (padrão) desliga a checagem."""
+    return getattr(settings, 'ORCAMENTO_TEMPO_FATOR', 0) or 0
+
+
+def _orcamento_tempo(orcamento):
+    if not fator_tempo():
+        return "tempo não verificado"
+    return f"orçamento {orcamento.tempo_ms * fator_tempo():.0f} ms"
+
+
+class OrcamentoViewsMixin:
+    """Mixin de TestCase com a asserção de orçamento por nome de URL."""
+
+    def assertDentroDoOrcamento(self, nome_url, args=None, metodo='get', aquecer=True, **kwargs):
+        """
+        Mede a view `nome_url` contra ORCAMENTOS[nome_url] e retorna a Medicao.
+        `aquecer` faz uma requisição antes (caches de content types, sessão, direitos),
+        para medir o regime estável e não a primeira requisição do processo.
+        """
+        orcamento = ORCAMENTOS.get(nome_url)
+        if orcamento is None:
+            self.fail(f"Sem orçamento declarado para '{nome_url}' em web.orcamento_views.ORCAMENTOS")
+
+        url = reverse(nome_url, args=args)
+        if aquecer:
+            getattr(self.client, metodo)(url, **kwargs)
+        medicao = medir(self.client, metodo, url, **kwargs)
+        self.assertLess(medicao.resposta.status_code, 400, f"{nome_url} respondeu {medicao.resposta.status_code}")
+
+        estourou = (
+            medicao.consultas > orcamento.consultas
+            or medicao.duplicadas > orcamento.duplicadas
+            or (fator_tempo() > 0 and medicao.tempo_ms > orcamento.tempo_ms * fator_tempo())
+        )
+        if estourou:
+            self.fail(_relatorio(nome_url, medicao, orcamento))
+        return medicao
+
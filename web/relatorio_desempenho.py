@@ -0,0 +1,95 @@
+"""
+Resultados de medições de desempenho (comandos medir_*), gravados em JSON.
+
+Cada resultado leva o commit, a data e a versão do Python, para comparar execuções
+entre commits: `comparar(atual, anterior)` devolve a variação percentual de cada
+métrica numérica presente nos dois.
+"""
+import json
+import math
+import platform
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+DIRETORIO_PADRAO = 'medicoes'
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por interpolação linear; None sem valores."""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return None
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior, superior = math.floor(posicao), math.ceil(posicao)
+    fracao = posicao - inferior
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * fracao
+
+
+def resumo_latencias(valores_ms):
+    """{'n', 'media', 'p50', 'p95', 'p99', 'max'} em ms, arredondados."""
+    if not valores_ms:
+        return {'n': 0}
+    return {
+        'n': len(valores_ms),
+        'media': round(sum(valores_ms) / len(valores_ms), 2),
+        'p50': round(percentil(valores_ms, 50), 2),
+        'p95': round(percentil(valores_ms, 95), 2),
+        'p99': round(percentil(valores_ms, 99), 2),
+        'max': round(max(valores_ms), 2),
+    }
+
+
+def commit_atual():
+    """Hash curto do commit do código medido, ou 'desconhecido' fora de um repositório git."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconhecido'
+
+
+def salvar_resultado(nome, dados, caminho=None):
+    """Grava {'medicao', 'commit', 'data', 'python', **dados} em JSON e retorna o Path."""
+    commit = commit_atual()
+    resultado = {
+        'medicao': nome,
+        'commit': commit,
+        'data': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        **dados,
+    }
+    caminho = Path(caminho or Path(settings.BASE_DIR) / DIRETORIO_PADRAO / f'{nome}-{commit}.json')
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    caminho.write_text(json.dumps(resultado, ensure_ascii=False, indent=2), encoding='utf-8')
+    return caminho
+
+
+def carregar_resultado(caminho):
+    return json.loads(Path(caminho).read_text(encoding='utf-8'))
+
+
+def _numericos(dados, prefixo=''):
+    for chave, valor in dados.items():
+        if isinstance(valor, bool):
+            continue
+        if isinstance(valor, (int, float)):
+            yield f'{prefixo}{chave}', valor
+        elif isinstance(valor, dict):
+            yield from _numericos(valor, f'{prefixo}{chave}.')
+
+
+def comparar(atual, anterior):
+    """[(métrica, anterior, atual, variação %)] das métricas numéricas comuns aos dois resultados."""
+    antes = dict(_numericos(anterior))
+    linhas = []
+    for metrica, valor in _numericos(atual):
+        if metrica in antes:
+            base = antes[metrica]
+            variacao = round((valor - base) * 100 / base, 1) if base else None
+            linhas.append((metrica, base, valor, variacao))
+    return linhas
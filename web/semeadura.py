@@ -0,0 +1,113 @@
+"""
+Semeadura declarativa de catálogos (tabelas de opções, planos).
+
+Cada catálogo é declarado como uma Semente: o modelo, o campo que identifica a linha
+(ex.: 'nome', 'slug') e a lista de linhas desejadas. semear() lê a tabela inteira em uma
+consulta, calcula a diferença e grava em lote:
+- linhas novas: um bulk_create;
+- linhas com algum campo diferente: um bulk_update só com os campos alterados;
+- linhas do banco fora da declaração: um UPDATE com `desativar` (se declarado).
+O número de idas ao banco não depende do tamanho do catálogo, e rodar de novo sem
+mudanças não escreve nada (idempotente).
+
+Operações em lote não disparam post_save/post_delete: quem depende desses sinais
+(ex.: invalidação de cache) declara `ao_alterar`, chamado uma vez se algo mudou.
+"""
+from collections import namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+
+Semente = namedtuple(
+    'Semente',
+    ['modelo', 'chave', 'linhas', 'padroes_criacao', 'desativar', 'ao_alterar'],
+    defaults=[None, None, None],
+)
+Semente.__doc__ = """
+Declaração de um catálogo.
+- chave: campo único que identifica cada linha;
+- linhas: dicts com a chave e os campos mantidos pela semente;
+- padroes_criacao: campos gravados só ao criar (não sobrescrevem edições do admin);
+- desativar: campos aplicados às linhas do banco que não estão em `linhas`;
+- ao_alterar: função chamada (sem argumentos) se a semeadura mudou alguma linha.
+"""
+
+ResultadoSemeadura = namedtuple('ResultadoSemeadura', ['modelo', 'criados', 'atualizados', 'desativados', 'inalterados'])
+ResultadoSemeadura.__doc__ = "Chaves criadas, atualizadas, desativadas e inalteradas por semear()."
+
+
+def _mudou(resultado):
+    return bool(resultado.criados or resultado.atualizados or resultado.desativados)
+
+
+def semear(semente, dry_run=False, tamanho_lote=1000):
+    """Aplica a semente ao banco (ou só calcula a diferença, com dry_run). Retorna ResultadoSemeadura."""
+    modelo, chave = semente.modelo, semente.chave
+    desejadas = {linha[chave]: linha for linha in semente.linhas}
+    campos_auto_now = [
+        campo.name for campo in modelo._meta.concrete_fields if getattr(campo, 'auto_now', False)
+    ]
+
+    with transaction.atomic():
+        existentes = {getattr(objeto, chave): objeto for objeto in modelo.objects.select_for_update()}
+
+        novos = [
+            modelo(**{**(semente.padroes_criacao or {}), **linha})
+            for valor, linha in desejadas.items() if valor not in existentes
+        ]
+
+        alterados, campos_alterados, inalterados = [], set(), []
+        agora = timezone.now()
+        for valor, linha in desejadas.items():
+            objeto = existentes.get(valor)
+            if objeto is None:
+                continue
+            diferentes = [campo for campo, novo in linha.items() if getattr(objeto, campo) != novo]
+            if not diferentes:
+                inalterados.append(valor)
+                continue
+            for campo in diferentes:
+                setattr(objeto, campo, linha[campo])
+            for campo in campos_auto_now:
+                setattr(objeto, campo, agora)
+            campos_alterados.update(diferentes)
+            alterados.append(objeto)
+
+        a_desativar = []
+        if semente.desativar:
+            a_desativar = [
+                valor for valor, objeto in existentes.items()
+                if valor not in desejadas
+                and any(getattr(objeto, campo) != novo for campo, novo in semente.desativar.items())
+            ]
+
+        resultado = ResultadoSemeadura(
+            modelo=modelo._meta.verbose_name_plural,
+            criados=[getattr(objeto, chave) for objeto in novos],
+            atualizados=[getattr(objeto, chave) for objeto in alterados],
+            desativados=a_desativar,
+            inalterados=inalterados,
+        )
+        if dry_run:
+            return resultado
+
+        if novos:
+            modelo.objects.bulk_create(novos, batch_size=tamanho_lote)
+        if alterados:
+            modelo.objects.bulk_update(alterados, [*sorted(campos_alterados), *campos_auto_now], batch_size=tamanho_lote)
+        if a_desativar:
+            valores = dict(semente.desativar)
+            valores.update({campo: agora for campo in campos_auto_now})
+            modelo.objects.filter(**{f'{chave}__in': a_desativar}).update(**valores)
+
+    if semente.ao_alterar and _mudou(resultado):
+        semente.ao_alterar()
+    return resultado
+
+
+def descrever(resultado):
+    """Resumo de uma linha para a saída dos comandos."""
+    return (
+        f"{resultado.modelo}: {len(resultado.criados)} criados, {len(resultado.atualizados)} atualizados, "
+        f"{len(resultado.desativados)} desativados, {len(resultado.inalterados)} inalterados"
+    )
@@ -0,0 +1,270 @@
+"""
+Servidor HTTP local que imita as APIs externas usadas pelo projeto:
+- Google Places (New): POST /v1/places:searchText (paginado por nextPageToken) e
+  GET /v1/places/<id>; Geocoding: GET /maps/api/geocode/json;
+- Mercado Pago: POST/GET /preapproval, GET /preapproval/search, GET /v1/payments/<id>,
+  GET /v1/payments/search e POST /checkout/preferences.
+
+Roda em uma thread daemon, em 127.0.0.1 com porta escolhida pelo sistema, e registra
+cada chamada recebida. configuracoes() devolve os settings que apontam a coleta
+(crm.services.places_collector) e o cliente do Mercado Pago para o stub, sem pausas:
+
+    with ServidorStub(lugares=45) as stub, override_settings(**stub.configuracoes()):
+        run_coleta(coleta.pk)
+    stub.chamadas_para('/v1/places/')  # quantas buscas de detalhes
+
+Para medições, o stub simula as condições da rede e das cotas, em todas as rotas:
+- latencia_ms (+ variacao_ms, uniforme): espera antes de cada resposta;
+- taxa_erros: fração das chamadas que responde 500;
+- limite_por_segundo: acima dele, responde 429 RESOURCE_EXHAUSTED (janela de 1 s);
+- tamanho_pagina: lugares por página do searchText.
+A aleatoriedade usa `semente`, para que duas medições vejam a mesma sequência de erros.
+stub.respostas conta as respostas por status.
+
+Nada aqui usa o banco: o mesmo servidor serve aos testes, às medições e aos testes de carga.
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+TAMANHO_PAGINA_PLACES = 20
+LOCALIZACAO_PADRAO = {'lat': -8.0476, 'lng': -34.877}  # Recife
+
+
+def gerar_lugares(quantidade, prefixo='stub'):
+    """Lugares sintéticos com os campos que a coleta lê dos detalhes."""
+    return [
+        {
+            'id': f'{prefixo}-{i}',
+            'displayName': {'text': f'Empresa {prefixo} {i}', 'languageCode': 'pt-BR'},
+            'formattedAddress': f'Rua {i}, Recife - PE',
+            'nationalPhoneNumber': f'(81) 3{i:03d}-0000',
+            'websiteUri': f'https://empresa{i}.example.com',
+            'rating': round(3 + (i % 20) / 10, 1),
+            'userRatingCount': i * 3,
+        }
+        for i in range(quantidade)
+    ]
+
+
+class _Manipulador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, como as APIs reais
+
+    def _atender(self, metodo):
+        partes = urlsplit(self.path)
+        tamanho = int(self.headers.get('Content-Length') or 0)
+        corpo = json.loads(self.rfile.read(tamanho) or b'null') if tamanho else None
+        status, dados = self.server.stub.responder(metodo, partes.path, dict(parse_qsl(partes.query)), corpo)
+        conteudo = json.dumps(dados).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(conteudo)))
+        self.end_headers()
+        self.wfile.write(conteudo)
+
+    def do_GET(self):
+        self._atender('GET')
+
+    def do_POST(self):
+        self._atender('POST')
+
+    def log_message(self, formato, *args):
+        pass
+
+
+class ServidorStub:
+    """Stub das APIs do Google e do Mercado Pago; use como context manager."""
+
+    def __init__(self, lugares=60, preapprovals=None, pagamentos=None, localizacao=LOCALIZACAO_PADRAO,
+                 latencia_ms=0, variacao_ms=0, taxa_erros=0.0, limite_por_segundo=None,
+                 tamanho_pagina=TAMANHO_PAGINA_PLACES, semente=0):
+        self.latencia_ms = latencia_ms
+        self.variacao_ms = variacao_ms
+        self.taxa_erros = taxa_erros
+        self.limite_por_segundo = limite_por_segundo
+        self.tamanho_pagina = tamanho_pagina
+        self.respostas = Counter()
+        self._aleatorio = random.Random(semente)
+        self._janela = deque()
+        self.lugares = gerar_lugares(lugares) if isinstance(lugares, int) else list(lugares)
+        self.detalhes = {lugar['id']: lugar for lugar in self.lugares}
+        self.localizacao = localizacao
+        self.preapprovals = list(preapprovals or [])
+        self.pagamentos = list(pagamentos or [])
+        self.chamadas = []
+        self._lock = threading.Lock()
+        self._servidor = None
+        self._thread = None
+        self._rotas = [
+            ('POST', re.compile(r'^/v1/places:searchText$'), self.buscar_texto),
+            ('GET', re.compile(r'^/v1/places/(?P<id>[^/]+)$'), self.detalhes_lugar),
+            ('GET', re.compile(r'^/maps/api/geocode/json$'), self.geocodificar),
+            ('POST', re.compile(r'^/preapproval/?$'), self.criar_preapproval),
+            ('GET', re.compile(r'^/preapproval/search$'), self.buscar_preapprovals),
+            ('GET', re.compile(r'^/preapproval/(?P<id>[^/]+)$'), self.obter_preapproval),
+            ('GET', re.compile(r'^/v1/payments/search$'), self.buscar_pagamentos),
+            ('GET', re.compile(r'^/v1/payments/(?P<id>[^/]+)$'), self.obter_pagamento),
+            ('POST', re.compile(r'^/checkout/preferences/?$'), self.criar_preferencia),
+        ]
+
+    # -- ciclo de vida -------------------------------------------------------
+
+    def iniciar(self):
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', 0), _Manipulador)
+        self._servidor.daemon_threads = True
+        self._servidor.stub = self
+        self._thread = threading.Thread(target=self._servidor.serve_forever, name='servidor-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._thread.join()
+            self._servidor = None
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    @property
+    def url(self):
+        host, porta = self._servidor.server_address[:2]
+        return f'http://{host}:{porta}'
+
+    def configuracoes(self):
+        """Settings para override_settings: APIs apontadas para o stub e coleta sem pausas."""
+        return {
+            'GOOGLE_PLACES_API_KEY': 'chave-stub',
+            'GOOGLE_PLACES_API_URL': self.url,
+            'GOOGLE_GEOCODING_API_URL': self.url,
+            'GOOGLE_PLACES_PAUSA_PAGINA': 0,
+            'GOOGLE_PLACES_PAUSA_LEAD': 0,
+            'MERCADOPAGO_API_URL': self.url,
+        }
+
+    # -- despacho ------------------------------------------------------------
+
+    def responder(self, metodo, caminho, consulta, corpo):
+        """(status, dados) da rota que atende metodo + caminho; 404 se nenhuma atende."""
+        with self._lock:
+            self.chamadas.append((metodo, caminho))
+        status, dados = self._simular_rede() or self._despachar(metodo, caminho, consulta, corpo)
+        with self._lock:
+            self.respostas[status] += 1
+        return status, dados
+
+    def _despachar(self, metodo, caminho, consulta, corpo):
+        for metodo_rota, padrao, funcao in self._rotas:
+            encontrado = padrao.match(caminho)
+            if metodo_rota == metodo and encontrado:
+                return funcao(consulta, corpo, **encontrado.groupdict())
+        return 404, {'error': 'not_found', 'message': f'{metodo} {caminho}'}
+
+    def _simular_rede(self):
+        """Aplica a latência e devolve (status, dados) de uma falha simulada, ou None."""
+        with self._lock:
+            sorteio = self._aleatorio.random()
+            espera_ms = self.latencia_ms + self._aleatorio.uniform(0, self.variacao_ms)
+            excedeu = False
+            if self.limite_por_segundo:
+                agora = time.monotonic()
+                while self._janela and agora - self._janela[0] >= 1:
+                    self._janela.popleft()
+                excedeu = len(self._janela) >= self.limite_por_segundo
+                if not excedeu:
+                    self._janela.append(agora)
+        if espera_ms:
+            time.sleep(espera_ms / 1000)
+        if excedeu:
+            return 429, {'error': {'code': 429, 'status': 'RESOURCE_EXHAUSTED', 'message': 'Quota exceeded'}}
+        if sorteio < self.taxa_erros:
+            return 500, {'error': {'code': 500, 'status': 'INTERNAL', 'message': 'Simulated failure'}}
+        return None
+
+    def chamadas_para(self, prefixo):
+        with self._lock:
+            return sum(1 for _, caminho in self.chamadas if caminho.startswith(prefixo))
+
+    # -- Google --------------------------------------------------------------
+
+    def buscar_texto(self, consulta, corpo, **_):
+        corpo = corpo or {}
+        inicio = int(corpo.get('pageToken') or 0)
+        fim = inicio + min(int(corpo.get('maxResultCount') or self.tamanho_pagina), self.tamanho_pagina)
+        dados = {'places': [
+            {'id': lugar['id'], 'displayName': lugar['displayName']} for lugar in self.lugares[inicio:fim]
+        ]}
+        if fim < len(self.lugares):
+            dados['nextPageToken'] = str(fim)
+        return 200, dados
+
+    def detalhes_lugar(self, consulta, corpo, id):
+        lugar = self.detalhes.get(id)
+        if lugar is None:
+            return 404, {'error': {'code': 404, 'status': 'NOT_FOUND'}}
+        return 200, {chave: valor for chave, valor in lugar.items() if chave != 'id'}
+
+    def geocodificar(self, consulta, corpo, **_):
+        if self.localizacao is None:
+            return 200, {'status': 'ZERO_RESULTS', 'results': []}
+        return 200, {'status': 'OK', 'results': [{'geometry': {'location': self.localizacao}}]}
+
+    # -- Mercado Pago --------------------------------------------------------
+
+    def _busca(self):
+        from pagamentos.servicos.mercadopago_stub import MercadoPagoStub
+        return MercadoPagoStub(self.preapprovals, self.pagamentos)
+
+    @staticmethod
+    def _paginacao(consulta):
+        filtros = dict(consulta)
+        return filtros, int(filtros.pop('offset', 0)), int(filtros.pop('limit', 50))
+
+    def criar_preapproval(self, consulta, corpo, **_):
+        with self._lock:
+            preapproval = {
+                **(corpo or {}),
+                'id': f'PRE{len(self.preapprovals) + 1}',
+                'status': 'pending',
+                'init_point': f'{self.url}/checkout/preapproval/PRE{len(self.preapprovals) + 1}',
+                'last_modified': '2026-01-01T00:00:00Z',
+            }
+            self.preapprovals.append(preapproval)
+        return 201, preapproval
+
+    def obter_preapproval(self, consulta, corpo, id):
+        for preapproval in self.preapprovals:
+            if preapproval['id'] == id:
+                return 200, preapproval
+        return 404, {'message': 'Preapproval not found', 'status': 404}
+
+    def buscar_preapprovals(self, consulta, corpo, **_):
+        filtros, offset, limit = self._paginacao(consulta)
+        return 200, self._busca().buscar_preapprovals(filtros, offset, limit)
+
+    def obter_pagamento(self, consulta, corpo, id):
+        for pagamento in self.pagamentos:
+            if str(pagamento['id']) == id:
+                return 200, pagamento
+        return 404, {'message': 'Payment not found', 'status': 404}
+
+    def buscar_pagamentos(self, consulta, corpo, **_):
+        filtros, offset, limit = self._paginacao(consulta)
+        return 200, self._busca().buscar_pagamentos(filtros, offset, limit)
+
+    def criar_preferencia(self, consulta, corpo, **_):
+        preferencia_id = f'PREF{self.chamadas_para("/checkout/preferences")}'
+        return 201, {
+            **(corpo or {}),
+            'id': preferencia_id,
+            'init_point': f'{self.url}/checkout/{preferencia_id}',
+        }
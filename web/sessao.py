@@ -0,0 +1,41 @@
+"""
+Middleware de sessão com renovação periódica da expiração.
+
+Com SESSION_SAVE_EVERY_REQUEST = True o Django regrava a sessão (UPDATE em django_session)
+a cada requisição, inclusive em cada polling de leads_stream. Aqui a sessão só é regravada
+quando foi modificada ou quando a última renovação ficou mais antiga que
+SESSAO_JANELA_RENOVACAO segundos, mantendo a expiração deslizante com poucas escritas.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+
+CHAVE_RENOVACAO = '_sessao_renovada_em'
+
+JANELA_RENOVACAO_PADRAO = 86400  # 1 dia
+
+
+def janela_renovacao():
+    """Intervalo mínimo (segundos) entre duas renovações de uma sessão não modificada."""
+    janela = getattr(settings, 'SESSAO_JANELA_RENOVACAO', JANELA_RENOVACAO_PADRAO)
+    # Nunca renovar depois que a sessão já teria expirado
+    return max(0, min(janela, settings.SESSION_COOKIE_AGE))
+
+
+class SessaoRenovacaoPeriodicaMiddleware(SessionMiddleware):
+    """
+    Substitui django.contrib.sessions.middleware.SessionMiddleware.
+    Deve ser usado com SESSION_SAVE_EVERY_REQUEST = False.
+    """
+
+    def process_response(self, request, response):
+        session = getattr(request, 'session', None)
+        if session is not None and session.accessed and not session.is_empty():
+            agora = int(time.time())
+            renovada_em = session.get(CHAVE_RENOVACAO) or 0
+            if session.modified or agora - renovada_em >= janela_renovacao():
+                # Alterar a chave marca a sessão como modificada: o SessionMiddleware
+                # salva e reenvia o cookie com a nova expiração.
+                session[CHAVE_RENOVACAO] = agora
+        return super().process_response(request, response)
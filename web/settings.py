@@ -56,7 +56,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    # Server-Timing, log e histogramas por requisição (web.instrumentacao)
+    'web.instrumentacao.InstrumentacaoMiddleware',
+    'web.sessao.SessaoRenovacaoPeriodicaMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -70,7 +72,9 @@ ROOT_URLCONF = 'web.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates com o tempo de renderização medido (web.instrumentacao)
+        'BACKEND': 'web.instrumentacao.DjangoTemplatesInstrumentado',
+        'NAME': 'django',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -79,6 +83,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'pagamentos.context_processors.direitos',
             ],
         },
     },
@@ -148,17 +153,84 @@ LOGOUT_REDIRECT_URL = 'pagina_inicial'
 MERCADOPAGO_ACCESS_TOKEN = config('MERCADOPAGO_ACCESS_TOKEN')
 MERCADOPAGO_PUBLIC_KEY = config('MERCADOPAGO_PUBLIC_KEY')
 MERCADOPAGO_WEBHOOK_SECRET = config('MERCADOPAGO_WEBHOOK_SECRET', default='')
+# Sessão HTTP compartilhada com a API (pagamentos.servicos.mercadopago_cliente)
+MERCADOPAGO_TIMEOUT_CONEXAO = config('MERCADOPAGO_TIMEOUT_CONEXAO', default=3.05, cast=float)
+MERCADOPAGO_TIMEOUT_LEITURA = config('MERCADOPAGO_TIMEOUT_LEITURA', default=20, cast=float)
+MERCADOPAGO_POOL_CONEXOES = config('MERCADOPAGO_POOL_CONEXOES', default=10, cast=int)
+# Base da API (vazio = https://api.mercadopago.com); testes apontam para web.servidores_stub
+MERCADOPAGO_API_URL = config('MERCADOPAGO_API_URL', default='')
+# Reaproveita o link de checkout pendente do mesmo usuário/oferta (pagamentos.servicos.checkout_assinatura)
+CHECKOUT_REUTILIZAR_PREAPPROVAL = config('CHECKOUT_REUTILIZAR_PREAPPROVAL', default=True, cast=bool)
+CHECKOUT_VALIDADE_PENDENTE = config('CHECKOUT_VALIDADE_PENDENTE', default=86400, cast=int)
 DOMINIO_BASE = config('DOMINIO_BASE')  # TODO: Após deploy trocar por domínio no pythonanywhere
 
 # Session Configuration
 SESSION_COOKIE_AGE = 86400 * 7  # 7 dias
-SESSION_SAVE_EVERY_REQUEST = True
+# A expiração deslizante é feita por web.sessao.SessaoRenovacaoPeriodicaMiddleware:
+# a sessão só é regravada quando muda ou uma vez por SESSAO_JANELA_RENOVACAO.
+# Medição (web/tests.py, 1.000 requisições autenticadas): 1.000 escritas antes, 1 depois.
+SESSION_SAVE_EVERY_REQUEST = False
+SESSAO_JANELA_RENOVACAO = config('SESSAO_JANELA_RENOVACAO', default=86400, cast=int)  # 1 dia
+# Backend opcional: 'django.contrib.sessions.backends.cached_db' (leituras via cache)
+# ou 'django.contrib.sessions.backends.signed_cookies' (nenhuma escrita no banco).
+SESSION_ENGINE = config('SESSION_ENGINE', default='django.contrib.sessions.backends.db')
+
+# Cache
+# 'direitos' guarda o snapshot de plano/status/pagamento/cota por usuário
+# (pagamentos.direitos), invalidado por sinais. O locmem é por processo: com vários
+# workers use um backend compartilhado, ex.:
+#   DIREITOS_CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+#   DIREITOS_CACHE_LOCATION=/var/tmp/direitos_cache
+# ou django.core.cache.backends.db.DatabaseCache (requer `manage.py createcachetable`).
+# 'catalogo' guarda só as versões do catálogo de planos (pagamentos.servicos.catalogo_planos)
+# e das opções do perfil (perfil.catalogo_opcoes); idem: com locmem, salvar uma Oferta ou
+# uma opção do perfil só invalida o catálogo do próprio worker, e os demais esperam o TTL.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'direitos': {
+        'BACKEND': config('DIREITOS_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('DIREITOS_CACHE_LOCATION', default='direitos'),
+        'TIMEOUT': config('DIREITOS_CACHE_TTL', default=300, cast=int),
+    },
+    'catalogo': {
+        'BACKEND': config('CATALOGO_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CATALOGO_CACHE_LOCATION', default='catalogo'),
+    },
+}
+
+# Catálogo de planos e páginas públicas cacheadas (pagamentos.servicos.catalogo_planos).
+# Com o cache 'catalogo' em locmem (por processo), os outros workers só veem uma Oferta
+# alterada quando este TTL expira.
+CATALOGO_PLANOS_TTL = 600
+# Opções do formulário de perfil em memória no processo (perfil.catalogo_opcoes): mesmo limite
+CATALOGO_OPCOES_TTL = config('CATALOGO_OPCOES_TTL', default=600, cast=int)
+
+# Webhooks do Mercado Pago: gravados na caixa de entrada e processados por
+# `python manage.py processar_webhooks --continuo` (pagamentos.servicos.webhook_inbox)
+WEBHOOK_MAX_TENTATIVAS = config('WEBHOOK_MAX_TENTATIVAS', default=8, cast=int)
 
 # LLM Configuration
 GROQ_API_KEY = config('GROQ_API_KEY')
 
 # Google Places API (Geocoding + Places New)
 GOOGLE_PLACES_API_KEY = config('GOOGLE_PLACES_API_KEY', default='')
+# Bases das APIs (vazio = servidores do Google) e pausas da coleta, em segundos (crm.services.places_collector)
+GOOGLE_PLACES_API_URL = config('GOOGLE_PLACES_API_URL', default='')
+GOOGLE_GEOCODING_API_URL = config('GOOGLE_GEOCODING_API_URL', default='')
+GOOGLE_PLACES_PAUSA_PAGINA = config('GOOGLE_PLACES_PAUSA_PAGINA', default=2, cast=float)
+GOOGLE_PLACES_PAUSA_LEAD = config('GOOGLE_PLACES_PAUSA_LEAD', default=0.2, cast=float)
+# Leads somados à cota e ao livro de uso a cada lote da coleta (pagamentos.servicos.cota_mensal)
+LEADS_LOTE_CONSUMO = config('LEADS_LOTE_CONSUMO', default=10, cast=int)
+
+# Endpoint /metrics (Prometheus) com os histogramas do processo (web.instrumentacao)
+METRICAS_HABILITADAS = config('METRICAS_HABILITADAS', default=False, cast=bool)
+METRICAS_TOKEN = config('METRICAS_TOKEN', default='')
+
+# Orçamento de tempo das views nos testes (web.orcamento_views): multiplicador do limite.
+# 0 (padrão) desliga a checagem de tempo; as contagens de consultas valem sempre.
+ORCAMENTO_TEMPO_FATOR = config('ORCAMENTO_TEMPO_FATOR', default=0, cast=float)
 
 # Django Sites
 SITE_ID = 1
@@ -0,0 +1,37 @@
+"""
+Perfil de settings da suíte de testes rápida.
+
+    python manage.py test --settings=web.settings_testes
+    DJANGO_TEST_PROCESSES=4 python manage.py test --settings=web.settings_testes
+    python manage.py test --settings=web.settings_testes --parallel=1 crm
+
+Em relação a web.settings:
+- SQLite em memória (um banco por processo do executor paralelo);
+- hash de senha MD5: create_user/login custam microssegundos em vez de ~100 ms;
+- sem VisitorMiddleware: nenhuma requisição do test client grava Visitor;
+- coleta sem pausas e APIs externas apontadas para uma porta fechada, para que nenhum
+  teste chegue ao Google ou ao Mercado Pago por acidente (use web.servidores_stub);
+- executor paralelo por padrão (web.executor_testes).
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import MIDDLEWARE
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+MIDDLEWARE = [m for m in MIDDLEWARE if m != 'dados_acesso.middleware.VisitorMiddleware']
+
+# Porta 9 (discard) em 127.0.0.1: a conexão é recusada na hora
+GOOGLE_PLACES_API_URL = 'http://127.0.0.1:9'
+GOOGLE_GEOCODING_API_URL = 'http://127.0.0.1:9'
+MERCADOPAGO_API_URL = 'http://127.0.0.1:9'
+GOOGLE_PLACES_PAUSA_PAGINA = 0
+GOOGLE_PLACES_PAUSA_LEAD = 0
+
+TEST_RUNNER = 'web.executor_testes.ExecutorTestesParalelo'
@@ -0,0 +1,41 @@
+"""
+Sincronização de tabelas de ligação N:N explícitas (modelos "through" próprios).
+
+Em vez de apagar todas as linhas do dono e recriá-las uma a uma, calcula a diferença
+entre o que está gravado e o que foi escolhido: as removidas saem em um único DELETE
+e as novas entram em um único bulk_create, na mesma transação. Linhas mantidas não
+são tocadas (preservam a pk e não geram escrita).
+"""
+from django.db import transaction
+
+
+def _pk(valor):
+    return getattr(valor, 'pk', valor)
+
+
+def sincronizar_ligacoes(modelo, dono, campo_dono, campo_alvo, alvos):
+    """
+    Deixa em `modelo` exatamente uma linha (dono, alvo) para cada item de `alvos`
+    (instâncias ou pks). Retorna (adicionados, removidos) em número de linhas.
+
+    Ex.: sincronizar_ligacoes(PerfilEmpresaObjetivos, perfil, 'perfil_empresa', 'objetivo', objetivos)
+    """
+    coluna_alvo = modelo._meta.get_field(campo_alvo).attname
+    desejados = {_pk(alvo) for alvo in alvos}
+
+    with transaction.atomic():
+        linhas = modelo.objects.filter(**{campo_dono: dono})
+        atuais = set(linhas.values_list(coluna_alvo, flat=True))
+
+        removidos = 0
+        if atuais - desejados:
+            removidos, _ = linhas.filter(**{f'{coluna_alvo}__in': atuais - desejados}).delete()
+
+        novos = desejados - atuais
+        if novos:
+            # ignore_conflicts: outro salvamento simultâneo pode ter criado a mesma ligação
+            modelo.objects.bulk_create(
+                [modelo(**{campo_dono: dono, coluna_alvo: pk}) for pk in sorted(novos)],
+                ignore_conflicts=True,
+            )
+    return len(novos), removidos
@@ -0,0 +1,363 @@
+"""
+Testes dos módulos compartilhados do projeto (web/).
+"""
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import HttpResponse
+from django.test import LiveServerTestCase, TestCase, override_settings
+from django.template import engines
+from django.test.utils import CaptureQueriesContext
+from django.urls import path
+
+from .carga.executor import executar_carga, verificar_webhooks
+from .carga.massa import semear_massa
+from .fabricas import criar_leads, criar_visitantes
+from .instrumentacao import METRICA_EXTERNA, METRICA_REQUISICAO
+from .metricas import histogramas
+from .relatorio_desempenho import comparar, percentil, resumo_latencias
+from .semeadura import Semente, semear
+from .servidores_stub import ServidorStub
+from .orcamento_views import ORCAMENTOS, Orcamento, OrcamentoViewsMixin, consultas_duplicadas, formato_sql
+
+
+def _polling(request):
+    return HttpResponse('ok' if request.user.is_authenticated else 'anon')
+
+
+def _instrumentada(request):
+    from pagamentos.servicos.mercadopago_cliente import requisitar, url_api
+
+    usuarios = User.objects.count()
+    requisitar('GET', url_api('https://api.mercadopago.com/v1/payments/10'))
+    return HttpResponse(engines['django'].from_string('{{ n }} usuários').render({'n': usuarios}))
+
+
+urlpatterns = [
+    path('polling/', _polling),
+    path('instrumentada/', _instrumentada, name='instrumentada'),
+]
+
+MIDDLEWARE_BASE = [
+    'django.middleware.common.CommonMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+]
+
+
+def _escritas_sessao(queries):
+    return [
+        q for q in queries
+        if 'django_session' in q['sql'] and q['sql'].lstrip().upper().startswith(('UPDATE', 'INSERT'))
+    ]
+
+
+@override_settings(ROOT_URLCONF='web.tests', SESSAO_JANELA_RENOVACAO=3600)
+class SessaoRenovacaoPeriodicaTest(TestCase):
+    REQUISICOES = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('sessao', password='x')
+
+    def _medir(self, n):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(n):
+                self.client.get('/polling/')
+        return len(_escritas_sessao(ctx.captured_queries))
+
+    @override_settings(
+        SESSION_SAVE_EVERY_REQUEST=True,
+        MIDDLEWARE=['django.contrib.sessions.middleware.SessionMiddleware'] + MIDDLEWARE_BASE,
+    )
+    def test_referencia_save_every_request(self):
+        self.assertEqual(self._medir(self.REQUISICOES), self.REQUISICOES)
+
+    @override_settings(
+        SESSION_SAVE_EVERY_REQUEST=False,
+        MIDDLEWARE=['web.sessao.SessaoRenovacaoPeriodicaMiddleware'] + MIDDLEWARE_BASE,
+    )
+    def test_renovacao_periodica_grava_uma_vez_por_janela(self):
+        self.assertEqual(self._medir(self.REQUISICOES), 1)
+
+        # Passada a janela, a próxima requisição renova a expiração uma única vez
+        with mock.patch('web.sessao.time.time', return_value=time.time() + 3601):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get('/polling/')
+                self.client.get('/polling/')
+        self.assertEqual(len(_escritas_sessao(ctx.captured_queries)), 1)
+        self.assertIn('sessionid', response.cookies)
+
+    @override_settings(
+        SESSION_SAVE_EVERY_REQUEST=False,
+        MIDDLEWARE=['web.sessao.SessaoRenovacaoPeriodicaMiddleware'] + MIDDLEWARE_BASE,
+    )
+    def test_anonimo_sem_sessao_nao_grava(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/polling/')
+        self.assertEqual(_escritas_sessao(ctx.captured_queries), [])
+
+
+class AdminListasTest(TestCase):
+    """Changelists do admin com número de consultas constante e contagem estimada."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from pagamentos.models import Oferta
+
+        cls.admin = User.objects.create_superuser('admin_listas', 'admin@example.com', 'senha')
+        cls.oferta = Oferta.objects.create(slug='basico_mensal', nome_exibicao='Básico', valor_centavos=11900)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _criar(self, modelo, i):
+        from crm.models import Coleta, Lead
+        from dados_acesso.models import Visitor
+        from pagamentos.models import AcessoUsuario, Assinatura, Compra, TransicaoEstado
+
+        usuario = User.objects.create(username=f'{modelo.__name__.lower()}{i}')
+        if modelo is Lead:
+            coleta = Coleta.objects.create(usuario=usuario, keyword='padaria', cidade='Recife')
+            Lead.objects.create(usuario=usuario, coleta=coleta, place_id=f'p{i}', nome=f'Lead {i}', cidade='Recife')
+        elif modelo is Coleta:
+            Coleta.objects.create(usuario=usuario, keyword='padaria', cidade='Recife')
+        elif modelo in (Assinatura, Compra):
+            modelo.objects.create(usuario=usuario, oferta=self.oferta)
+        elif modelo is AcessoUsuario:
+            AcessoUsuario.objects.create(usuario=usuario, nivel='basico')
+        elif modelo is TransicaoEstado:
+            TransicaoEstado.objects.create(entidade='acesso', objeto_id=i, usuario=usuario, estado_novo='ativo')
+        elif modelo is Visitor:
+            Visitor.objects.create(ip_address=f'10.0.0.{i}', user_agent='ua', page_visited='/', username=usuario.username)
+
+    def _consultas(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_consultas_constantes_por_pagina(self):
+        from crm.models import Coleta, Lead
+        from dados_acesso.models import Visitor
+        from pagamentos.models import AcessoUsuario, Assinatura, Compra, TransicaoEstado
+
+        for modelo in (Lead, Coleta, Assinatura, Compra, AcessoUsuario, TransicaoEstado, Visitor):
+            with self.subTest(modelo=modelo.__name__):
+                url = f'/admin/{modelo._meta.app_label}/{modelo._meta.model_name}/'
+                for i in range(2):
+                    self._criar(modelo, i)
+                self._consultas(url)  # aquece caches (content types, sessão)
+                poucos = self._consultas(url)
+                for i in range(2, 12):
+                    self._criar(modelo, i)
+                self.assertEqual(self._consultas(url), poucos)
+
+    def test_filtro_autocomplete_nao_lista_relacionados(self):
+        from crm.models import Lead
+
+        for i in range(3):
+            self._criar(Lead, i)
+        lead = Lead.objects.first()
+
+        resposta = self.client.get(f'/admin/crm/lead/?coleta__id__exact={lead.coleta_id}')
+
+        self.assertContains(resposta, 'id="filtro_coleta__id__exact"')
+        self.assertEqual(resposta.context['cl'].result_count, 1)
+        # Só a coleta escolhida aparece: na linha do resultado e como opção selecionada do filtro
+        self.assertContains(resposta, 'Coleta #', count=2)
+
+    def test_contagem_estimada_so_sem_filtros(self):
+        from crm.models import Lead
+
+        for i in range(3):
+            self._criar(Lead, i)
+        with mock.patch('web.admin_listas.estimar_linhas', return_value=50000):
+            sem_filtro = self.client.get('/admin/crm/lead/')
+            com_filtro = self.client.get('/admin/crm/lead/?cidade__exact=Recife')
+
+        self.assertEqual(sem_filtro.context['cl'].result_count, 50000)
+        self.assertEqual(com_filtro.context['cl'].result_count, 3)
+        self.assertIsNone(com_filtro.context['cl'].full_result_count)
+
+
+class OrcamentoViewsTest(OrcamentoViewsMixin, TestCase):
+    """O próprio harness de orçamento: duplicadas e falha ao estourar."""
+
+    def test_conta_duplicadas_exatas(self):
+        sqls = ['SELECT 1', 'SELECT 1', 'SELECT 2', 'SELECT 1']
+        self.assertEqual(consultas_duplicadas(sqls), 2)
+        self.assertEqual(formato_sql("SELECT * FROM t WHERE id = 7 AND nome = 'x'"), 'SELECT * FROM t WHERE id = ? AND nome = ?')
+
+    def test_estouro_de_orcamento_falha(self):
+        with mock.patch.dict(ORCAMENTOS, {'mercadopago_webhook': Orcamento(consultas=0)}):
+            # 2 consultas com o VisitorMiddleware, 1 no perfil web.settings_testes
+            with self.assertRaisesRegex(AssertionError, r'mercadopago_webhook: \d consultas \(orçamento 0\)'):
+                self.assertDentroDoOrcamento('mercadopago_webhook', metodo='post', data='{}',
+                                             content_type='application/json')
+
+    def test_url_sem_orcamento_falha(self):
+        with self.assertRaisesRegex(AssertionError, 'Sem orçamento'):
+            self.assertDentroDoOrcamento('pagina_inicial')
+
+
+    def test_tempo_so_verificado_com_fator(self):
+        dados = {'metodo': 'post', 'data': '{}', 'content_type': 'application/json'}
+        with mock.patch.dict(ORCAMENTOS, {'mercadopago_webhook': Orcamento(consultas=10, tempo_ms=0)}):
+            with override_settings(ORCAMENTO_TEMPO_FATOR=0):
+                self.assertDentroDoOrcamento('mercadopago_webhook', **dados)
+            with override_settings(ORCAMENTO_TEMPO_FATOR=1), \
+                    self.assertRaisesRegex(AssertionError, r'ms \(orçamento 0 ms\)'):
+                self.assertDentroDoOrcamento('mercadopago_webhook', **dados)
+
+
+class SemeaduraTest(TestCase):
+    def _semente(self, nomes):
+        from perfil.models import RestricaoCritica
+        return Semente(RestricaoCritica, 'nome', [{'nome': nome} for nome in nomes])
+
+    def test_idas_ao_banco_constantes_e_idempotente(self):
+        from pagamentos.models import Oferta
+
+        for tamanho, criados in ((5, 5), (200, 195)):
+            with CaptureQueriesContext(connection) as ctx:
+                resultado = semear(self._semente([f'Restrição {i}' for i in range(tamanho)]))
+            self.assertEqual(len(resultado.criados), criados)
+            # Um SELECT e um INSERT, qualquer que seja o tamanho (fora os savepoints)
+            self.assertEqual(len([q for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]), 2)
+
+        with CaptureQueriesContext(connection) as ctx:
+            resultado = semear(self._semente([f'Restrição {i}' for i in range(200)]))
+        self.assertEqual((resultado.criados, resultado.atualizados, len(resultado.inalterados)), ([], [], 200))
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))])
+
+        Oferta.objects.create(slug='a', nome_exibicao='A', valor_centavos=100)
+        Oferta.objects.create(slug='legado', nome_exibicao='Legado', valor_centavos=50)
+        chamadas = []
+        semente = Semente(
+            Oferta, 'slug', [{'slug': 'a', 'nome_exibicao': 'A', 'valor_centavos': 200}],
+            desativar={'ativo': False}, ao_alterar=lambda: chamadas.append(1),
+        )
+        resultado = semear(semente)
+        self.assertEqual((resultado.atualizados, resultado.desativados), (['a'], ['legado']))
+        self.assertEqual(Oferta.objects.get(slug='a').valor_centavos, 200)
+        self.assertFalse(Oferta.objects.get(slug='legado').ativo)
+        self.assertEqual(chamadas, [1])
+
+        semear(semente)
+        self.assertEqual(chamadas, [1])
+
+
+class FabricasTest(TestCase):
+    def test_massas_gravadas_em_lote(self):
+        from crm.models import Lead
+        from dados_acesso.models import Visitor
+
+        usuario = User.objects.create(username='massa')
+        with CaptureQueriesContext(connection) as ctx:
+            criar_leads(usuario, coletas=2, leads_por_coleta=1500)
+            criar_visitantes(2000, usuario=usuario)
+
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+        # O SQLite limita os parâmetros por consulta (lotes menores que tamanho_lote), mas
+        # continua sendo uma fração das 5.002 inserções linha a linha
+        self.assertLess(len(inserts), 100)
+        self.assertEqual(Lead.objects.filter(usuario=usuario).count(), 3000)
+        self.assertEqual(Visitor.objects.filter(username='massa').count(), 2000)
+
+
+class ServidorStubMercadoPagoTest(TestCase):
+    def test_servico_conversa_com_o_stub(self):
+        from pagamentos.servicos.mercadopago_servico import MercadoPagoServico
+
+        pagamentos = [{'id': 10, 'external_reference': '7', 'status': 'approved',
+                       'date_last_updated': '2026-01-01T00:00:00Z'}]
+        with ServidorStub(preapprovals=[{'id': 'PRE9', 'external_reference': 'ass_1', 'status': 'authorized',
+                                         'last_modified': '2026-01-01T00:00:00Z'}],
+                          pagamentos=pagamentos) as stub, override_settings(**stub.configuracoes()):
+            self.assertEqual(MercadoPagoServico.get_preapproval_info('PRE9')['status'], 'authorized')
+            self.assertEqual(MercadoPagoServico.get_payment_info(10)['response']['status'], 'approved')
+            busca = MercadoPagoServico.buscar_pagamentos({'external_reference': '7'})
+            self.assertIsNone(MercadoPagoServico.get_preapproval_info('NAO-EXISTE'))
+
+        self.assertEqual(busca['paging']['total'], 1)
+        self.assertEqual(stub.chamadas_para('/preapproval/'), 2)
+
+
+class RelatorioDesempenhoTest(TestCase):
+    def test_percentis_e_comparacao(self):
+        valores = list(range(1, 101))
+        self.assertEqual(percentil(valores, 50), 50.5)
+        self.assertEqual(resumo_latencias(valores)['p95'], 95.05)
+        self.assertEqual(resumo_latencias([]), {'n': 0})
+
+        linhas = comparar({'leads_por_segundo': 150, 'lat': {'p95': 10}, 'novo': 1},
+                          {'leads_por_segundo': 100, 'lat': {'p95': 20}})
+        self.assertEqual(linhas, [('leads_por_segundo', 100, 150, 50.0), ('lat.p95', 20, 10, -50.0)])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class CargaTest(LiveServerTestCase):
+    """Os cenários de carga contra o servidor do LiveServerTestCase, em escala mínima."""
+
+    def test_cenarios_e_webhooks_duplicados(self):
+        massa = semear_massa(usuarios=2, coletas_por_usuario=1, leads_por_coleta=20, compras=2)
+        resultado = executar_carga(
+            (self.server_thread.host, self.server_thread.port), massa,
+            usuarios=2, remetentes=1, duplicatas=3, duracao_s=1, pensar_s=0.05,
+        )
+
+        self.assertEqual(resultado['total']['erros'], 0, resultado['endpoints'])
+        self.assertEqual(resultado['endpoints']['login']['requisicoes'], 2)
+        acoes = set(resultado['endpoints']) & {'ver_leads', 'leads_stream', 'export_leads_csv'}
+        self.assertTrue(acoes)
+        self.assertEqual(resultado['endpoints']['mercadopago_webhook']['requisicoes'] % 3, 0)
+
+        with ServidorStub(pagamentos=massa.pagamentos) as stub, override_settings(**stub.configuracoes()):
+            webhooks = verificar_webhooks(massa)
+        self.assertEqual(webhooks['eventos_aplicados'], webhooks['pagamentos_distintos'])
+        self.assertEqual(webhooks['compras_pagas'], webhooks['pagamentos_distintos'])
+
+
+class InstrumentacaoTest(TestCase):
+    def setUp(self):
+        histogramas.limpar()
+
+    @override_settings(ROOT_URLCONF='web.tests')
+    def test_server_timing_e_log_por_requisicao(self):
+        pagamentos = [{'id': 10, 'external_reference': '7', 'status': 'approved',
+                       'date_last_updated': '2026-01-01T00:00:00Z'}]
+        with ServidorStub(pagamentos=pagamentos) as stub, override_settings(**stub.configuracoes()):
+            with self.assertLogs('web.instrumentacao', 'INFO') as logs, \
+                    CaptureQueriesContext(connection) as consultas:
+                response = self.client.get('/instrumentada/')
+
+        self.assertEqual(response.content.decode(), '0 usuários')
+        timing = response['Server-Timing']
+        self.assertRegex(timing, rf'db;dur=[\d.]+;desc="{len(consultas)} consultas"')
+        self.assertRegex(timing, r'render;dur=[\d.]+')
+        self.assertRegex(timing, r'http;dur=[\d.]+;desc="127\.0\.0\.1 \(1\)"')
+        self.assertRegex(timing, r'total;dur=[\d.]+$')
+        self.assertRegex(logs.output[0], rf'rota=instrumentada status=200 .*db_consultas={len(consultas)} .*'
+                                         r'http_chamadas=1 .*http_hosts=127\.0\.0\.1:1 ')
+        externas = histogramas.series(METRICA_EXTERNA)
+        self.assertEqual([(r, s['total']) for _, r, s in externas], [({'host': '127.0.0.1'}, 1)])
+        fases = {r['fase'] for _, r, _s in histogramas.series(METRICA_REQUISICAO) if r['rota'] == 'instrumentada'}
+        self.assertEqual(fases, {'total', 'db', 'render', 'http'})
+
+    def test_metrics_desligado_por_padrao(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @override_settings(METRICAS_HABILITADAS=True, METRICAS_TOKEN='segredo')
+    def test_metrics_formato_prometheus_com_token(self):
+        histogramas.observar(METRICA_EXTERNA, 7, {'host': 'places.googleapis.com'})
+
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer segredo'})
+        self.assertEqual(response.status_code, 200)
+        texto = response.content.decode()
+        self.assertIn('# TYPE http_externo_ms histogram', texto)
+        self.assertIn('http_externo_ms_bucket{host="places.googleapis.com",le="10"} 1', texto)
+        self.assertIn('http_externo_ms_count{host="places.googleapis.com"} 1', texto)
@@ -20,6 +20,7 @@ from django.views.generic import TemplateView
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.sitemaps.views import sitemap
+from .instrumentacao import metricas
 from .sitemaps import StaticSitemap
 
 sitemaps = {
@@ -35,6 +36,7 @@ urlpatterns = [
     path('perfil/', include('perfil.urls')),
     path('crm/', include('crm.urls')),
     path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
+    path('metrics', metricas, name='metricas'),
     path('robots.txt', TemplateView.as_view(template_name="robots.txt", content_type="text/plain")),
 ]
 